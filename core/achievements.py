@@ -0,0 +1,150 @@
+"""
+Автоматическая выдача достижений.
+
+Правила описаны данными (модель Achievement: тип правила и параметры), а
+проверяются функциями из ``RULES``. Проверка инкрементальная: сигнал
+m2m_changed на completed_lessons передаёт только новые отметки — профиль и
+id уроков, — и проверяются лишь правила, на которые они могли повлиять:
+«вся тема пройдена» — только для тем этих уроков, счётчики — по индексу
+(userprofile, completed_at) одного профиля. Весь прогресс не пересматривается.
+
+Проверка выполняется задачей Celery после фиксации транзакции, вне запроса;
+без брокера задача выполняется сразу (CELERY_TASK_ALWAYS_EAGER). Снятая
+отметка о прохождении полученное достижение не отнимает.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Achievement, Lesson, LessonCompletion, UserAchievement
+
+
+class _Progress:
+    """Прогресс одного профиля; каждый показатель читается из БД не больше раза."""
+
+    def __init__(self, profile_id, lesson_ids):
+        self.profile_id = profile_id
+        self.theme_ids = set(
+            Lesson.objects.filter(pk__in=lesson_ids).values_list('theme_id', flat=True)
+        )
+        self._theme_counts = None
+        self._total = None
+        self._recent = {}
+
+    def completions(self):
+        return LessonCompletion.objects.filter(userprofile_id=self.profile_id)
+
+    def completed_in_theme(self, theme_id):
+        if self._theme_counts is None:
+            self._theme_counts = dict(
+                self.completions().filter(lesson__theme_id__in=self.theme_ids)
+                .values_list('lesson__theme_id').annotate(total=Count('pk'))
+            )
+        return self._theme_counts.get(theme_id, 0)
+
+    def total(self):
+        if self._total is None:
+            self._total = self.completions().count()
+        return self._total
+
+    def completed_in_last_days(self, days):
+        if days not in self._recent:
+            since = timezone.now() - timedelta(days=days)
+            self._recent[days] = self.completions().filter(completed_at__gte=since).count()
+        return self._recent[days]
+
+
+def _theme_completed(achievement, progress):
+    lessons = achievement.theme.lesson_count
+    return lessons > 0 and progress.completed_in_theme(achievement.theme_id) >= lessons
+
+
+def _lessons_completed(achievement, progress):
+    return progress.total() >= achievement.lesson_count
+
+
+def _lessons_in_days(achievement, progress):
+    return progress.completed_in_last_days(achievement.days) >= achievement.lesson_count
+
+
+RULES = {
+    Achievement.THEME_COMPLETED: _theme_completed,
+    Achievement.LESSONS_COMPLETED: _lessons_completed,
+    Achievement.LESSONS_IN_DAYS: _lessons_in_days,
+}
+
+
+def evaluate(profile_id, lesson_ids):
+    """Проверить правила после отметки ``lesson_ids``; вернуть список выданных достижений."""
+    progress = _Progress(profile_id, lesson_ids)
+    candidates = (
+        Achievement.objects.filter(is_active=True)
+        .filter(
+            Q(rule=Achievement.THEME_COMPLETED, theme_id__in=progress.theme_ids)
+            | Q(rule__in=[Achievement.LESSONS_COMPLETED, Achievement.LESSONS_IN_DAYS])
+        )
+        .exclude(awards__userprofile_id=profile_id)
+        .select_related('theme')
+    )
+    earned = [achievement for achievement in candidates if RULES[achievement.rule](achievement, progress)]
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(userprofile_id=profile_id, achievement=achievement) for achievement in earned],
+        ignore_conflicts=True,
+    )
+    return earned
+
+
+def schedule_evaluation(profile_id, lesson_ids):
+    """Поставить проверку в очередь после фиксации транзакции."""
+    from .tasks import evaluate_achievements
+
+    lesson_ids = sorted(lesson_ids)
+    transaction.on_commit(lambda: evaluate_achievements.delay(profile_id, lesson_ids))
+
+
+def split_legacy(text):
+    """Достижения из старого текстового поля: через запятую."""
+    return [item.strip() for item in (text or '').split(',') if item.strip()]
+
+
+def manual_achievement(title, known):
+    """
+    Ручное достижение с таким названием (создаётся при необходимости);
+    ``known`` — словарь название → id, общий для вызовов одной загрузки.
+    """
+    title = title[:200]
+    if title not in known:
+        achievement = Achievement.objects.filter(rule=Achievement.MANUAL, title=title).first()
+        if achievement is None:
+            base = slugify(title, allow_unicode=True)[:200].strip('-') or 'achievement'
+            slug, number = base, 1
+            while Achievement.objects.filter(slug=slug).exists():
+                number += 1
+                slug = f'{base}-{number}'
+            achievement = Achievement.objects.create(slug=slug, title=title, rule=Achievement.MANUAL)
+        known[title] = achievement.pk
+    return known[title]
+
+
+def qualified_profiles(achievement):
+    """
+    id профилей, уже выполнивших правило, — один запрос с GROUP BY по всем
+    отметкам. Нужен только для новых правил и переноса (backfill_achievements);
+    «N уроков за D дней» проверяется по последним D дням.
+    """
+    completions = LessonCompletion.objects.all()
+    threshold = achievement.lesson_count
+    if achievement.rule == Achievement.THEME_COMPLETED:
+        completions = completions.filter(lesson__theme_id=achievement.theme_id)
+        threshold = achievement.theme.lesson_count
+    elif achievement.rule == Achievement.LESSONS_IN_DAYS:
+        completions = completions.filter(completed_at__gte=timezone.now() - timedelta(days=achievement.days))
+    if not threshold:
+        return completions.none().values_list('userprofile_id', flat=True)
+    return (
+        completions.values('userprofile_id').annotate(total=Count('pk'))
+        .filter(total__gte=threshold).values_list('userprofile_id', flat=True)
+    )
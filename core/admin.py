@@ -1,37 +1,178 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Theme, Lesson, Task, UserProfile, ResearchArticle
+from django.urls import reverse
+from django.utils.html import format_html
+from .admin_performance import (
+    FastChangeListMixin, PaginatedInlineMixin, SelectedOnlyRelatedFilter,
+)
+from .models import (
+    Theme, Lesson, Task, UserProfile, LessonCompletion, ResearchArticle, Achievement, UserAchievement,
+)
+from . import audit, search
+
+
+def _changelist_link(model, lookup, pk, label):
+    """Ссылка на список ``model``, отфильтрованный по родителю (SelectedOnlyRelatedFilter)."""
+    url = reverse(f'admin:core_{model._meta.model_name}_changelist')
+    return format_html('<a href="{}?{}={}">{}</a>', url, lookup, pk, label)
+
+
+class IndexedSearchMixin:
+    """Поиск в списке через индексированный бэкенд core.search вместо ILIKE по TextField."""
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term or not search.get_backend(queryset.db).indexed:
+            return super().get_search_results(request, queryset, search_term)
+        return search.filter_queryset(self.model, queryset, search_term), False
+
+
+class AuditedAdminMixin:
+    """Правки через админку попадают в журнал аудита (core/audit.py)."""
+
+    def save_model(self, request, obj, form, change):
+        old = audit.snapshot(type(obj).objects.get(pk=obj.pk)) if change else None
+        super().save_model(request, obj, form, change)
+        new = audit.snapshot(obj)
+        if change:
+            old, new = audit.diff(old, new)
+            if not new:
+                return
+        audit.record(audit.UPDATE if change else audit.CREATE, instance=obj,
+                     old=old, new=new, request=request)
+
+    def delete_model(self, request, obj):
+        old, pk = audit.snapshot(obj), obj.pk
+        super().delete_model(request, obj)
+        audit.record(audit.DELETE, instance=obj, record_id=pk, old=old, request=request)
+
+    def delete_queryset(self, request, queryset):
+        deleted = [(obj, obj.pk, audit.snapshot(obj)) for obj in queryset]
+        super().delete_queryset(request, queryset)
+        for obj, pk, old in deleted:
+            audit.record(audit.DELETE, instance=obj, record_id=pk, old=old, request=request)
+
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
     can_delete = False
+    # Пройденные уроки — постраничный inline на странице профиля, а не
+    # список выбора со всеми уроками каталога
+    exclude = ['completed_lessons']
+    readonly_fields = ['progress']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
 
-class CustomUserAdmin(UserAdmin):
+    @admin.display(description='Прогресс')
+    def progress(self, obj):
+        if not obj.pk:
+            return '—'
+        url = reverse('admin:core_userprofile_change', args=[obj.pk])
+        return format_html('<a href="{}">Пройдено уроков: {}</a>', url, obj.completions.count())
+
+class CustomUserAdmin(FastChangeListMixin, UserAdmin):
     inlines = [UserProfileInline]
 
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
 
+
+class LessonCompletionInline(PaginatedInlineMixin, admin.TabularInline):
+    """
+    Пройденные уроки профиля, новые сверху, по странице. Отметки ставит сам
+    пользователь на сайте; здесь их можно только снять.
+    """
+    model = LessonCompletion
+    fields = ['lesson', 'completed_at']
+    readonly_fields = ['lesson', 'completed_at']
+    extra = 0
+    per_page = 25
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('lesson').only(
+            'userprofile', 'completed_at', 'lesson__title',
+        ).order_by('-completed_at', '-id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(UserProfile)
+class UserProfileAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ['user', 'phone', 'birth_date']
+    list_select_related = ['user']
+    list_only = ['user__username', 'phone', 'birth_date']
+    search_fields = ['user__username']
+    exclude = ['completed_lessons']
+    raw_id_fields = ['user']
+    inlines = [LessonCompletionInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not LessonCompletion:
+            return super().save_formset(request, form, formset, change)
+        # Через связь, а не delete() строк: m2m_changed обновляет рейтинг,
+        # достижения и журнал аудита
+        formset.save(commit=False)
+        removed = [completion.lesson_id for completion in formset.deleted_objects]
+        if removed:
+            form.instance.completed_lessons.remove(*removed)
+
 @admin.register(Theme)
-class ThemeAdmin(admin.ModelAdmin):
-    list_display = ['title', 'order', 'created_at']
+class ThemeAdmin(FastChangeListMixin, AuditedAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['title', 'lessons', 'order', 'created_at']
+    list_only = ['title', 'lesson_count', 'order', 'created_at']
     search_fields = ['title', 'description']
     list_filter = ['created_at']
 
+    @admin.display(description='Уроки', ordering='lesson_count')
+    def lessons(self, obj):
+        return _changelist_link(Lesson, 'theme__id__exact', obj.pk, obj.lesson_count)
+
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
-    list_display = ['title', 'theme', 'order', 'created_at']
+class LessonAdmin(FastChangeListMixin, AuditedAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['title', 'theme', 'tasks', 'order', 'created_at']
+    list_select_related = ['theme']
+    list_only = ['title', 'theme__title', 'task_count', 'order', 'created_at']
     search_fields = ['title', 'content']
-    list_filter = ['theme', 'created_at']
+    list_filter = [('theme', SelectedOnlyRelatedFilter), 'created_at']
+    autocomplete_fields = ['theme']
+
+    @admin.display(description='Задания', ordering='task_count')
+    def tasks(self, obj):
+        return _changelist_link(Task, 'lesson__id__exact', obj.pk, obj.task_count)
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FastChangeListMixin, AuditedAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'lesson', 'created_at']
+    list_select_related = ['lesson']
+    list_only = ['title', 'lesson__title', 'created_at']
     search_fields = ['title', 'description']
+    list_filter = [('lesson', SelectedOnlyRelatedFilter)]
+    autocomplete_fields = ['lesson']
 
 @admin.register(ResearchArticle)
-class ResearchArticleAdmin(admin.ModelAdmin):
+class ResearchArticleAdmin(FastChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'created_at', 'is_published']
+    list_only = ['title', 'created_at', 'is_published']
     search_fields = ['title', 'content']
-    list_filter = ['is_published', 'created_at']
\ No newline at end of file
+    list_filter = ['is_published', 'created_at']
+@admin.register(Achievement)
+class AchievementAdmin(admin.ModelAdmin):
+    list_display = ['title', 'rule', 'theme', 'lesson_count', 'days', 'is_active']
+    list_filter = ['rule', 'is_active']
+    list_select_related = ['theme']
+    search_fields = ['title']
+    prepopulated_fields = {'slug': ('title',)}
+    raw_id_fields = ['theme']
+
+@admin.register(UserAchievement)
+class UserAchievementAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ['achievement', 'userprofile', 'awarded_at']
+    list_filter = ['achievement']
+    list_select_related = ['achievement', 'userprofile__user']
+    list_only = ['achievement__title', 'userprofile__user__username', 'awarded_at']
+    raw_id_fields = ['userprofile']
@@ -0,0 +1,137 @@
+"""
+Админка на больших таблицах.
+
+Списки админки по умолчанию считают ``COUNT(*)`` по всей выборке (и ещё раз
+по всей таблице при фильтре), загружают строки целиком, а фильтры и виджеты
+внешних ключей — все записи справочника. Здесь собраны замены:
+
+* ``EstimatedCountPaginator`` — в PostgreSQL число строк берётся из
+  статистики (``pg_class.reltuples`` для таблицы целиком, оценка
+  планировщика для выборки с фильтром); точный COUNT — только пока оценка
+  меньше ``ADMIN_EXACT_COUNT_LIMIT``;
+* ``FastChangeListMixin`` — этот пагинатор, без полного счётчика и с
+  ``.only(*list_only)`` для строк страницы (действия над выбранными записями
+  получают записи целиком);
+* ``SelectedOnlyRelatedFilter`` — фильтр по внешнему ключу, который не
+  загружает весь справочник;
+* ``PaginatedInlineFormSet`` — inline с постраничным выводом строк.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк ``queryset`` по статистике PostgreSQL; None — если
+    оценки нет (другая СУБД или таблица ещё не анализировалась).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+    # reltuples = -1 — таблица ни разу не анализировалась
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор со счётчиком по статистике для больших выборок. Оценка может
+    отличаться от точного числа: последняя страница бывает неполной или
+    пустой — для навигации по миллионам строк это приемлемо.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return self.object_list.count()
+        return estimate
+
+
+class FastChangeList(ChangeList):
+    """Строки страницы — только поля ``list_only``; cl.get_queryset() для действий не меняется."""
+
+    def get_results(self, request):
+        queryset = self.queryset
+        if self.model_admin.list_only:
+            self.queryset = queryset.only(*self.model_admin.list_only)
+        try:
+            super().get_results(request)
+        finally:
+            self.queryset = queryset
+
+
+class FastChangeListMixin:
+    """Список без точных счётчиков; ``list_only`` — поля, загружаемые для строк страницы."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_only = ()
+
+    def get_changelist(self, request, **kwargs):
+        return FastChangeList
+
+
+class SelectedOnlyRelatedFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по внешнему ключу на большой справочник: в панели только «Все» и
+    выбранное значение. Значение выбирают ссылкой из списка родителя
+    (например, «уроки» в списке тем) или параметром URL.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        return field.get_choices(include_blank=False, limit_choices_to={'pk__in': [self.lookup_val]})
+
+    def has_output(self):
+        return True
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Формы inline только для одной страницы строк. Номер страницы — параметр
+    ``<prefix>-page`` адреса страницы редактирования (его передаёт
+    ``PaginatedInlineMixin.get_formset``).
+    """
+    per_page = 20
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            self.paginator = Paginator(queryset, self.per_page)
+            self.page = self.paginator.get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+
+class PaginatedInlineMixin:
+    """Inline c ``PaginatedInlineFormSet``; ``per_page`` — строк на странице."""
+    formset = PaginatedInlineFormSet
+    template = 'admin/core/edit_inline/paginated_tabular.html'
+    per_page = 20
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        prefix = formset.get_default_prefix()
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_number': request.GET.get(f'{prefix}-page', 1),
+        })
@@ -0,0 +1,118 @@
+"""
+Async-варианты публичных страниц каталога (только чтение).
+
+Используются, когда приложение запущено через ASGI (serve_ready/asgi.py,
+воркеры uvicorn): пока запрос ждёт БД или медленного клиента, воркер
+обслуживает другие соединения. Данные читаются асинхронным ORM (``aget``,
+``async for``); кеш, ETag и шаблоны — общие с синхронными views, ключи
+фрагментов совпадают, так что WSGI- и ASGI-процессы делят один кеш.
+
+Шаблон рендерится через sync_to_async: контекстные процессоры обращаются к
+ленивым ``request.user`` и сессии, а это синхронные запросы к БД.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from . import caching, conditional, db_router, progress
+from .models import Theme, Lesson, Task, ResearchArticle
+from .pagination import KeysetPaginator
+from .views import (
+    ARTICLE_LIST_DEFERRED, ARTICLE_ORDERING, ARTICLES_PER_PAGE, LESSON_LIST_DEFERRED, LESSON_ORDERING,
+    LESSON_PAGE_DEFERRED, LESSONS_PER_PAGE, SIBLING_LESSONS, THEME_LIST_DEFERRED, THEME_ORDERING,
+    THEME_PAGE_DEFERRED, THEMES_PER_PAGE,
+)
+
+arender = sync_to_async(render)
+
+
+async def _aget_object_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'{queryset.model._meta.object_name} не найден')
+
+
+@db_router.replica_reads
+@caching.cache_anonymous_page(Theme)
+async def index(request):
+    themes = [theme async for theme in Theme.objects.defer(*THEME_LIST_DEFERRED)[:4]]
+    return await arender(request, 'core/index.html', {'themes': themes})
+
+
+@db_router.replica_reads
+@conditional.research_page
+@caching.cache_anonymous_page(ResearchArticle)
+async def research_view(request):
+    articles = await KeysetPaginator(
+        ResearchArticle.objects.filter(is_published=True).defer(*ARTICLE_LIST_DEFERRED),
+        ARTICLE_ORDERING, ARTICLES_PER_PAGE,
+    ).aget_page(request.GET.get('cursor'))
+    return await arender(request, 'core/research.html', {'articles': articles})
+
+
+@db_router.replica_reads
+@conditional.themes_page
+@caching.cache_anonymous_page(Theme, Lesson)
+async def themes_view(request):
+    cursor = request.GET.get('cursor')
+    themes = await caching.acached_fragment(
+        'themes', (Theme, Lesson), (cursor,),
+        lambda: KeysetPaginator(
+            Theme.objects.defer(*THEME_LIST_DEFERRED), THEME_ORDERING, THEMES_PER_PAGE,
+        ).aget_page(cursor),
+    )
+    return await arender(request, 'core/themes.html', {'themes': themes})
+
+
+async def _theme_with_lessons(pk, cursor):
+    theme = await _aget_object_or_404(Theme.objects.defer(*THEME_PAGE_DEFERRED), pk=pk)
+    lessons = await KeysetPaginator(
+        theme.lessons.defer(*LESSON_LIST_DEFERRED), LESSON_ORDERING, LESSONS_PER_PAGE
+    ).aget_page(cursor)
+    return theme, lessons
+
+
+@db_router.replica_reads
+@conditional.theme_page
+@caching.cache_anonymous_page(Theme, Lesson, Task)
+async def theme_detail_view(request, pk):
+    cursor = request.GET.get('cursor')
+    theme, lessons = await caching.acached_fragment(
+        'theme_lessons', (Theme, Lesson, Task), (pk, cursor),
+        lambda: _theme_with_lessons(pk, cursor),
+    )
+    completed_lesson_ids = await sync_to_async(progress.completed_lesson_ids)(request)
+    return await arender(request, 'core/theme_detail.html', {
+        'theme': theme,
+        'lessons': lessons,
+        'completed_lesson_ids': completed_lesson_ids,
+    })
+
+
+async def _lesson_with_tasks(lesson_id):
+    lesson = await _aget_object_or_404(
+        Lesson.objects.select_related('theme').defer(*LESSON_PAGE_DEFERRED), id=lesson_id,
+    )
+    siblings = [
+        sibling async for sibling in
+        Lesson.objects.filter(theme_id=lesson.theme_id).only('id', 'title', 'order')[:SIBLING_LESSONS]
+    ]
+    return lesson, [task async for task in lesson.tasks.defer('search_vector')], siblings
+
+
+@db_router.replica_reads
+@conditional.lesson_page
+@caching.cache_anonymous_page(Theme, Lesson, Task)
+async def lesson_detail_view(request, lesson_id):
+    lesson, tasks, siblings = await caching.acached_fragment(
+        'lesson_page', (Theme, Lesson, Task), (lesson_id,),
+        lambda: _lesson_with_tasks(lesson_id),
+    )
+    is_completed = await sync_to_async(progress.is_lesson_completed)(request, lesson.id)
+    return await arender(request, 'core/lesson_detail.html', {
+        'lesson': lesson,
+        'tasks': tasks,
+        'sibling_lessons': siblings,
+        'is_completed': is_completed,
+    })
@@ -0,0 +1,265 @@
+"""
+Журнал аудита (таблица ``audit_log``).
+
+События не пишутся в БД на пути запроса: ``record()`` кладёт готовую
+строку в очередь процесса, а фоновый поток сбрасывает её многострочным
+INSERT (``bulk_create``), когда набирается ``AUDIT_BATCH_SIZE`` строк или
+проходит ``AUDIT_FLUSH_INTERVAL`` секунд. Остаток сбрасывается при
+завершении процесса (atexit).
+
+Если очередь заполнена (БД не успевает), вызывающий поток ждёт до
+``AUDIT_ENQUEUE_TIMEOUT`` секунд, а затем пишет своё событие сам —
+синхронно. Так запросы замедляются, но события не теряются.
+
+Событие ставится в очередь только после фиксации транзакции, в которой оно
+произошло: откаченная правка админки в журнал не попадёт.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+LOGIN = 'login'
+LESSON_COMPLETED = 'lesson_completed'
+LESSON_UNCOMPLETED = 'lesson_uncompleted'
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# Поля, которые не несут смысла в журнале
+_SKIPPED_FIELDS = {'search_vector', 'updated_at'}
+
+# Будит поток записи при остановке, чтобы не ждать конца AUDIT_FLUSH_INTERVAL
+_STOP = object()
+
+_request = contextvars.ContextVar('audit_request', default=None)
+
+
+def bind_request(request):
+    """Запомнить запрос, чтобы события из сигналов получили IP и User-Agent."""
+    return _request.set(request)
+
+
+def unbind_request(token):
+    _request.reset(token)
+
+
+def _client_ip(request):
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and settings.AUDIT_TRUST_X_FORWARDED_FOR:
+        return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def _json(values):
+    """Значения полей в виде, пригодном для JSONB (даты, Decimal, файлы — строками)."""
+    if values is None:
+        return None
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder, default=str))
+
+
+def snapshot(instance):
+    """Значения конкретных полей записи для old_values/new_values."""
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.name in _SKIPPED_FIELDS:
+            continue
+        value = getattr(instance, field.attname)
+        values[field.attname] = value.name if hasattr(value, 'name') and hasattr(value, 'storage') else value
+    return values
+
+
+def diff(old, new):
+    """Только изменившиеся поля: (старые значения, новые значения)."""
+    changed = [name for name in new if old.get(name) != new.get(name)]
+    return {name: old.get(name) for name in changed}, {name: new[name] for name in changed}
+
+
+def build_entry(action, instance=None, table_name=None, record_id=None, old=None, new=None,
+                user=None, user_id=None, request=None):
+    request = request or _request.get()
+    if user is None and request is not None:
+        user = getattr(request, 'user', None)
+    if user_id is None and user is not None and user.is_authenticated:
+        user_id = user.pk
+    if instance is not None:
+        table_name = table_name or instance._meta.db_table
+        record_id = record_id if record_id is not None else instance.pk
+    return AuditLog(
+        user_id=user_id,
+        action=action,
+        table_name=table_name,
+        record_id=record_id,
+        old_values=_json(old),
+        new_values=_json(new),
+        ip_address=_client_ip(request) if request is not None else None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:1000] if request is not None else None,
+        created_at=timezone.now(),
+    )
+
+
+def write_entries(entries):
+    """Синхронная запись пачки одним многострочным INSERT."""
+    AuditLog.objects.using(settings.AUDIT_DATABASE).bulk_create(entries)
+
+
+class AuditWriter:
+    """
+    Очередь событий и фоновый поток, который пишет их пачками через
+    ``flush_func(entries)``. Поток запускается при первом событии и заново
+    после fork (воркеры gunicorn с --preload).
+    """
+
+    def __init__(self, flush_func, batch_size, flush_interval, max_queue, enqueue_timeout):
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.dropped = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # После fork очередь и поток родителя недействительны
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._stopping = threading.Event()
+                self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, entry):
+        self._ensure_started()
+        try:
+            self._queue.put(entry, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # Противодавление: пишем сами, замедляя запрос, но не теряя событие
+            logger.warning('Очередь аудита заполнена, событие записывается синхронно')
+            self._flush([entry])
+
+    def _drain(self, batch, deadline):
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                break
+            batch.append(entry)
+
+    def _run(self):
+        batch = []
+        try:
+            while not self._stopping.is_set():
+                deadline = time.monotonic() + self.flush_interval
+                self._drain(batch, deadline)
+                if batch:
+                    # Соединение потока живёт долго: уважаем CONN_MAX_AGE и рвём сломанное
+                    close_old_connections()
+                    self._flush(batch)
+                    batch = []
+            self._flush_remaining(batch)
+        finally:
+            connections.close_all()
+
+    def _flush_remaining(self, batch):
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.flush_func(batch)
+        except Exception:
+            self.dropped += len(batch)
+            logger.exception('Не удалось записать %d событий аудита', len(batch))
+            # Сбрасываем сломанное соединение, следующая пачка откроет новое
+            close_old_connections()
+
+    def close(self, timeout=5.0):
+        """Дописать очередь и остановить поток (вызывается при выходе процесса)."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass  # очередь не пуста — поток и так проснётся
+        self._thread.join(timeout)
+
+    def flush(self):
+        """Синхронно записать всё, что сейчас в очереди (для команд и тестов)."""
+        if self._pid == os.getpid() and self._queue is not None:
+            self._flush_remaining([])
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter(
+            write_entries,
+            batch_size=settings.AUDIT_BATCH_SIZE,
+            flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+            max_queue=settings.AUDIT_QUEUE_SIZE,
+            enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT,
+        )
+        atexit.register(_writer.close)
+    return _writer
+
+
+def _enqueue(entry):
+    if not settings.AUDIT_ENABLED:
+        return
+    if settings.AUDIT_ASYNC:
+        get_writer().put(entry)
+    else:
+        write_entries([entry])
+
+
+def record(action, **kwargs):
+    """
+    Записать событие аудита. Аргументы — как у :func:`build_entry`; запрос
+    берётся из контекста, если не передан явно.
+    """
+    if not settings.AUDIT_ENABLED:
+        return
+    entry = build_entry(action, **kwargs)
+    transaction.on_commit(lambda: _enqueue(entry))
@@ -0,0 +1,322 @@
+"""
+Версионированный кеш страниц и фрагментов каталога.
+
+У каждой модели каталога есть «поколение» — счётчик в кеше, который
+увеличивается сигналами post_save/post_delete. Поколения нужных моделей
+входят в ключ записи, поэтому после изменения данных старые записи просто
+перестают читаться и вытесняются по таймауту — удалять их не нужно.
+
+Целые ответы кешируются только для анонимных GET-запросов; для вошедших
+пользователей кешируются общие части страницы (например, список уроков
+темы), а персональные данные накладываются поверх при рендеринге.
+
+От «набега» (stampede) при промахе защищают два механизма:
+
+* запись хранится дольше своего срока свежести; устаревшее значение
+  отдаётся, пока один процесс пересчитывает его под блокировкой;
+* при полном промахе пересчёт выполняет владелец блокировки, остальные
+  коротко ждут появления значения и только потом считают сами.
+
+Для async-views (core/async_views.py) есть ``aget_or_build`` и
+``acached_fragment`` с асинхронным построителем, а ``cache_anonymous_page``
+оборачивает и корутины.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+
+from . import db_router, metrics
+
+GENERATION_KEY_TEMPLATE = 'catalog:gen:{label}'
+PAGE_KEY_PREFIX = 'catalog:page'
+FRAGMENT_KEY_PREFIX = 'catalog:fragment'
+
+PAGE_TIMEOUT = 5 * 60
+FRAGMENT_TIMEOUT = 15 * 60
+STALE_GRACE = 60  # сколько секунд после срока свежести запись ещё можно отдать
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.5
+LOCK_POLL_INTERVAL = 0.05
+
+CACHE_STATUS_HEADER = 'X-Cache'
+
+
+# --- Поколения ---
+
+def _generation_key(model):
+    return GENERATION_KEY_TEMPLATE.format(label=model._meta.label_lower)
+
+
+def _initial_generation():
+    # Если счётчик вытеснен из кеша, новое значение не должно совпасть со
+    # старым, иначе снова станут видны записи прошлых поколений
+    return time.time_ns() // 1000
+
+
+def get_generations(*models):
+    """Текущие поколения моделей, одним обращением к кешу."""
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    missing = {key: _initial_generation() for key in keys if key not in values}
+    for key, value in missing.items():
+        # add() не перезапишет значение, выставленное параллельным процессом
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+        values[key] = value
+    return tuple(values[key] for key in keys)
+
+
+def _bump(model):
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), None)
+
+
+def bump_generation(*models):
+    """
+    Инвалидировать кеш, зависящий от моделей.
+
+    Поколение увеличивается сразу и ещё раз после фиксации транзакции: иначе
+    параллельный запрос мог бы успеть закешировать данные, которые ещё не
+    видны вне транзакции, уже под новым поколением.
+    """
+    for model in models:
+        _bump(model)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: [_bump(model) for model in models])
+    if db_router.replicas():
+        transaction.on_commit(lambda: _bump_after_replica_lag(models))
+
+
+# Реплика отстаёт: запрос сразу после фиксации может закешировать её старые
+# данные уже под новым поколением. Поэтому поколение увеличивается ещё раз,
+# когда истекает окно прилипания к основной базе (REPLICA_PIN_SECONDS).
+_delayed = {}  # модель -> время, не раньше которого её можно увеличить
+_delayed_lock = threading.Lock()
+_delayed_timer = None
+
+
+def _bump_after_replica_lag(models):
+    global _delayed_timer
+    delay = settings.REPLICA_PIN_SECONDS
+    with _delayed_lock:
+        for model in models:
+            _delayed[model] = time.monotonic() + delay
+        if _delayed_timer is None:
+            _delayed_timer = threading.Timer(delay, _run_delayed_bumps)
+            _delayed_timer.daemon = True
+            _delayed_timer.start()
+
+
+def _run_delayed_bumps():
+    global _delayed_timer
+    now = time.monotonic()
+    with _delayed_lock:
+        due = [model for model, deadline in _delayed.items() if deadline <= now]
+        for model in due:
+            del _delayed[model]
+        if _delayed:
+            _delayed_timer = threading.Timer(max(_delayed.values()) - now, _run_delayed_bumps)
+            _delayed_timer.daemon = True
+            _delayed_timer.start()
+        else:
+            _delayed_timer = None
+    for model in due:
+        _bump(model)
+
+
+def versioned_key(prefix, name, models, *parts):
+    """Ключ, включающий поколения ``models``; длинные части хешируются."""
+    generations = '.'.join(str(generation) for generation in get_generations(*models))
+    raw = '|'.join(str(part) for part in parts)
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{prefix}:{name}:{generations}:{digest}'
+
+
+# --- Получение с защитой от набега ---
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def get_or_build(key, builder, timeout):
+    """
+    Вернуть значение по ``key`` или построить его вызовом ``builder()``.
+    Запись хранится ``timeout + STALE_GRACE`` секунд, но считается свежей
+    только ``timeout``; пересчитывает её один процесс.
+    """
+    if db_router.is_pinned():
+        # Запись могла быть построена по отстающей реплике
+        return builder()
+    entry = cache.get(key)
+    metrics.record_cache(entry is not None)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time() or not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            # Свежая запись или её уже пересчитывает другой процесс
+            return value
+    elif not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # Владелец блокировки не успел — считаем сами, без записи в кеш
+        return builder()
+
+    try:
+        value = builder()
+        cache.set(key, (value, time.time() + timeout), timeout + STALE_GRACE)
+    finally:
+        cache.delete(_lock_key(key))
+    return value
+
+
+async def aget_or_build(key, abuilder, timeout):
+    """:func:`get_or_build` для корутины ``abuilder()``; ожидание не блокирует цикл событий."""
+    if db_router.is_pinned():
+        return await abuilder()
+    entry = await cache.aget(key)
+    metrics.record_cache(entry is not None)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time() or not await cache.aadd(_lock_key(key), 1, LOCK_TIMEOUT):
+            return value
+    elif not await cache.aadd(_lock_key(key), 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry[0]
+        return await abuilder()
+
+    try:
+        value = await abuilder()
+        await cache.aset(key, (value, time.time() + timeout), timeout + STALE_GRACE)
+    finally:
+        await cache.adelete(_lock_key(key))
+    return value
+
+
+def cached_fragment(name, models, parts, builder, timeout=FRAGMENT_TIMEOUT):
+    """Общий для всех пользователей фрагмент, зависящий от ``models``."""
+    key = versioned_key(FRAGMENT_KEY_PREFIX, name, models, *parts)
+    return get_or_build(key, builder, timeout)
+
+
+async def acached_fragment(name, models, parts, abuilder, timeout=FRAGMENT_TIMEOUT):
+    """:func:`cached_fragment` с асинхронным построителем; ключи у них общие."""
+    key = await sync_to_async(versioned_key)(FRAGMENT_KEY_PREFIX, name, models, *parts)
+    return await aget_or_build(key, abuilder, timeout)
+
+
+# --- Кеш страниц для анонимных пользователей ---
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Отложенные flash-сообщения попали бы в общую копию страницы
+    return not len(messages.get_messages(request))
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not response.streaming
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+class _Uncacheable(Exception):
+    """Ответ нельзя класть в общий кеш; отдаём его как есть."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def _page_key(request, name, models):
+    """Ключ страницы или None, если запрос нельзя обслужить из общего кеша."""
+    if not _is_cacheable_request(request):
+        return None
+    return versioned_key(PAGE_KEY_PREFIX, name, models, request.get_full_path())
+
+
+def _mark_page(response, built):
+    response[CACHE_STATUS_HEADER] = 'MISS' if built else 'HIT'
+    # Вошедший пользователь с тем же URL должен получить свою версию
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def cache_anonymous_page(*models, timeout=PAGE_TIMEOUT):
+    """
+    Декоратор view: целиком кешировать ответ для анонимных пользователей.
+    Ключ зависит от имени view, пути, строки запроса и поколений ``models``.
+    """
+    def decorator(view_func):
+        name = f'{view_func.__module__}.{view_func.__name__}'
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # request.user ленивый и читает сессию из БД — только вне цикла
+                # событий; проверка и ключ — за один переход в поток
+                key = await sync_to_async(_page_key)(request, name, models)
+                if key is None:
+                    return await view_func(request, *args, **kwargs)
+
+                built = []
+
+                async def build():
+                    built.append(True)
+                    response = await view_func(request, *args, **kwargs)
+                    if not _is_cacheable_response(response):
+                        raise _Uncacheable(response)
+                    return response
+
+                try:
+                    response = await aget_or_build(key, build, timeout)
+                except _Uncacheable as exc:
+                    return exc.response
+                return _mark_page(response, built)
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = _page_key(request, name, models)
+            if key is None:
+                return view_func(request, *args, **kwargs)
+
+            built = []
+
+            def build():
+                built.append(True)
+                response = view_func(request, *args, **kwargs)
+                if not _is_cacheable_response(response):
+                    raise _Uncacheable(response)
+                return response
+
+            try:
+                response = get_or_build(key, build, timeout)
+            except _Uncacheable as exc:
+                return exc.response
+            return _mark_page(response, built)
+
+        return wrapper
+
+    return decorator
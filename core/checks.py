@@ -0,0 +1,66 @@
+"""
+Проверки готовности отдачи статики в production.
+
+При DEBUG Django и WhiteNoise берут статику прямо из приложений (finders), а
+медиа отдаёт отладочный путь. В production так нельзя: статика должна быть
+собрана ``collectstatic`` с хешами в именах и сжатыми копиями и отдаваться
+WhiteNoise из STATIC_ROOT. Проверки запускаются ``manage.py check --deploy``
+и при старте WSGI/ASGI-приложения (``fail_on_serving_errors``): с ошибкой
+сервер не стартует, а не отдаёт 404 или несжатые файлы без кеширования.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+SERVING = 'serving'
+
+WHITENOISE_MIDDLEWARE = 'whitenoise.middleware.WhiteNoiseMiddleware'
+
+
+@checks.register(SERVING, deploy=True)
+def check_static_serving(app_configs, **kwargs):
+    if settings.DEBUG:
+        return []
+    errors = []
+    if WHITENOISE_MIDDLEWARE not in settings.MIDDLEWARE:
+        errors.append(checks.Error(
+            'Статику без DEBUG никто не отдаёт.',
+            hint=f'Добавьте {WHITENOISE_MIDDLEWARE} в MIDDLEWARE сразу после SecurityMiddleware.',
+            id='core.E001',
+        ))
+    if getattr(settings, 'WHITENOISE_USE_FINDERS', False) or getattr(settings, 'WHITENOISE_AUTOREFRESH', False):
+        errors.append(checks.Error(
+            'WHITENOISE_USE_FINDERS и WHITENOISE_AUTOREFRESH — режимы разработки: '
+            'файлы ищутся и читаются с диска на каждый запрос.',
+            id='core.E002',
+        ))
+    backend = import_string(settings.STORAGES['staticfiles']['BACKEND'])
+    if not issubclass(backend, ManifestFilesMixin):
+        errors.append(checks.Error(
+            'Хранилище статики не добавляет хеш в имена файлов — их нельзя кешировать надолго.',
+            hint='Используйте whitenoise.storage.CompressedManifestStaticFilesStorage.',
+            id='core.E003',
+        ))
+    elif not settings.STATIC_ROOT:
+        errors.append(checks.Error('STATIC_ROOT не задан.', id='core.E004'))
+    elif not os.path.exists(os.path.join(settings.STATIC_ROOT, staticfiles_storage.manifest_name)):
+        errors.append(checks.Error(
+            'В STATIC_ROOT нет манифеста статики.',
+            hint='Выполните manage.py collectstatic перед запуском сервера.',
+            id='core.E005',
+        ))
+    return errors
+
+
+def fail_on_serving_errors():
+    """Остановить запуск сервера, если статика не готова к production."""
+    errors = [
+        message for message in checks.run_checks(tags=[SERVING], include_deployment_checks=True)
+        if message.is_serious()
+    ]
+    if errors:
+        raise ImproperlyConfigured('\n'.join(str(error) for error in errors))
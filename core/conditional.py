@@ -0,0 +1,195 @@
+"""
+Условные GET-запросы (ETag / Last-Modified / 304) для страниц каталога.
+
+Валидатор страницы строится из ``updated_at`` родителя и агрегата по детям
+(максимальный ``updated_at`` и количество — количество ловит удаления) одним
+запросом и кешируется по поколениям моделей (core/caching.py), так что на
+тёплом кеше проверка не обращается к БД. Для вошедшего пользователя в ETag
+добавляются его данные, меняющие разметку: id, имя, права, CSRF-секрет и
+множество пройденных уроков. Если в сессии ждут flash-сообщения, валидатор не
+выдаётся: страницу нужно отрисовать, чтобы сообщения были показаны.
+
+Last-Modified отдаётся только анонимам и только там, где удаление ребёнка
+меняет ``updated_at`` родителя (см. core/counters.py), — иначе If-Modified-Since
+мог бы подтвердить устаревшую копию.
+
+Декораторы работают и с async-views: валидатор (кеш, сессия, БД) тогда
+вычисляется в потоке через sync_to_async.
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from . import caching, progress
+from .models import Theme, Lesson, Task, ResearchArticle
+
+_REQUEST_ATTR = '_page_validator'
+
+
+class PageState:
+    """Снимок версии страницы: части ETag и время последнего изменения."""
+
+    def __init__(self, parts, last_modified=None):
+        self.parts = parts
+        self.last_modified = last_modified
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def theme_state(pk):
+    row = (
+        Theme.objects.filter(pk=pk)
+        .annotate(lessons_updated=Max('lessons__updated_at'), lesson_total=Count('lessons'))
+        .values_list('updated_at', 'lessons_updated', 'lesson_total')
+        .first()
+    )
+    if row is None:
+        return None
+    return PageState(row, last_modified=_latest(row[0], row[1]))
+
+
+def lesson_state(lesson_id):
+    # Боковая панель показывает соседние уроки темы: их переименование или
+    # перестановка тоже меняет страницу. Подзапросами — чтобы соединение с
+    # соседями не размножало строки заданий
+    siblings = Lesson.objects.filter(theme_id=OuterRef('theme_id')).order_by().values('theme_id')
+    row = (
+        Lesson.objects.filter(pk=lesson_id)
+        .annotate(
+            tasks_updated=Max('tasks__updated_at'), task_total=Count('tasks'),
+            siblings_updated=Subquery(siblings.annotate(updated=Max('updated_at')).values('updated')),
+            sibling_total=Subquery(siblings.annotate(total=Count('pk')).values('total')),
+        )
+        .values_list('updated_at', 'theme__updated_at', 'tasks_updated', 'task_total',
+                     'siblings_updated', 'sibling_total')
+        .first()
+    )
+    if row is None:
+        return None
+    return PageState(row, last_modified=_latest(row[0], row[1], row[2], row[4]))
+
+
+def _collection_state(queryset):
+    # Без Last-Modified: удаление записи не меняет максимум updated_at
+    row = queryset.aggregate(updated=Max('updated_at'), total=Count('pk'))
+    return PageState((row['updated'], row['total']))
+
+
+def themes_state():
+    return _collection_state(Theme.objects.all())
+
+
+def research_state():
+    return _collection_state(ResearchArticle.objects.filter(is_published=True))
+
+
+def _user_parts(request, with_progress):
+    user = request.user
+    if not user.is_authenticated:
+        return ()
+    parts = (user.pk, user.get_username(), user.is_staff, request.META.get('CSRF_COOKIE', ''))
+    if with_progress:
+        completed = ','.join(str(pk) for pk in sorted(progress.completed_lesson_ids(request)))
+        parts += (hashlib.md5(completed.encode('ascii')).hexdigest(),)
+    return parts
+
+
+# Поколения моделей в conditional_page должны покрывать и косвенные изменения:
+# сохранение Task меняет updated_at урока через счётчик, минуя сигналы Lesson
+
+def _page_validator(request, name, models, state_func, with_progress, kwargs):
+    """Вычислить (etag, last_modified) один раз за запрос."""
+    validator = getattr(request, _REQUEST_ATTR, None)
+    if validator is not None:
+        return validator
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        validator = (None, None)
+    else:
+        state = caching.cached_fragment(
+            f'validator:{name}', models, sorted(kwargs.items()),
+            lambda: state_func(**kwargs),
+        )
+        if state is None:
+            validator = (None, None)
+        else:
+            raw = repr((name, state.parts, _user_parts(request, with_progress)))
+            etag = hashlib.md5(raw.encode('utf-8')).hexdigest()
+            anonymous = not request.user.is_authenticated
+            validator = (etag, state.last_modified if anonymous else None)
+    setattr(request, _REQUEST_ATTR, validator)
+    return validator
+
+
+def _async_condition(validator_func):
+    """Аналог ``django.views.decorators.http.condition`` для корутин."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(validator_func)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            timestamp = None
+            if last_modified:
+                if not timezone.is_aware(last_modified):
+                    last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+                timestamp = int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if timestamp and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+def conditional_page(state_func, models, with_progress=False):
+    """
+    Декоратор view: ответить 304 без рендеринга, если клиент прислал
+    актуальные If-None-Match/If-Modified-Since. ``state_func`` получает
+    именованные аргументы view и возвращает :class:`PageState` или None.
+    ``with_progress`` — страница показывает отметки о прохождении уроков.
+    """
+    name = state_func.__name__
+
+    def validator_func(request, *args, **kwargs):
+        return _page_validator(request, name, models, state_func, with_progress, kwargs)
+
+    def etag_func(request, *args, **kwargs):
+        return validator_func(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return validator_func(request, *args, **kwargs)[1]
+
+    sync_decorator = condition(etag_func=etag_func, last_modified_func=last_modified_func)
+    async_decorator = _async_condition(validator_func)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return async_decorator(view_func)
+        return sync_decorator(view_func)
+
+    return decorator
+
+
+theme_page = conditional_page(theme_state, (Theme, Lesson, Task), with_progress=True)
+lesson_page = conditional_page(lesson_state, (Theme, Lesson, Task), with_progress=True)
+themes_page = conditional_page(themes_state, (Theme, Lesson))
+research_page = conditional_page(research_state, (ResearchArticle,))
@@ -0,0 +1,64 @@
+"""
+Денормализованные счётчики ``Theme.lesson_count`` и ``Lesson.task_count``.
+
+В штатном режиме счётчики меняются F()-обновлениями из сигналов
+(core/signals.py). Функции ниже пересчитывают их одним UPDATE с подзапросом —
+для ремонта после bulk_create, загрузки данных в обход ORM и т.п.
+
+Вместе со счётчиком обновляется ``updated_at`` родителя: число уроков и
+заданий видно на страницах, поэтому оно входит в их валидаторы (core/conditional.py).
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching
+from .models import Theme, Lesson, Task
+
+
+def _count_subquery(model, fk_name):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def _recount(queryset, field, child_model, fk_name):
+    # Строки с верным счётчиком не трогаем: их updated_at, а с ним ETag и
+    # Last-Modified страниц, остаются прежними
+    count = _count_subquery(child_model, fk_name)
+    updated = queryset.exclude(**{field: count}).update(**{field: count, 'updated_at': timezone.now()})
+    caching.bump_generation(queryset.model)
+    return updated
+
+
+def recount_lesson_counts(themes=None):
+    """Пересчитать Theme.lesson_count; возвращает число исправленных тем."""
+    return _recount(Theme.objects.all() if themes is None else themes, 'lesson_count', Lesson, 'theme')
+
+
+def recount_task_counts(lessons=None):
+    """Пересчитать Lesson.task_count; возвращает число исправленных уроков."""
+    return _recount(Lesson.objects.all() if lessons is None else lessons, 'task_count', Task, 'lesson')
+
+
+def _adjust(model, field, pk, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Не уводим счётчик в минус, если он уже рассинхронизирован
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta, 'updated_at': timezone.now()})
+
+
+def adjust_lesson_count(theme_id, delta):
+    _adjust(Theme, 'lesson_count', theme_id, delta)
+
+
+def adjust_task_count(lesson_id, delta):
+    _adjust(Lesson, 'task_count', lesson_id, delta)
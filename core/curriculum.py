@@ -0,0 +1,301 @@
+"""
+Импорт и экспорт каталога (темы → уроки → задания) в формате JSON Lines.
+
+Каждая строка — одна запись с полем ``type``; ребёнок ссылается на родителя
+по слагу, а не по id, поэтому файл переносится между базами::
+
+    {"type": "theme", "slug": "oborona", "title": ..., "description": ..., "order": 1, "image": ""}
+    {"type": "lesson", "theme": "oborona", "slug": "signaly", "title": ..., "content": ..., ...}
+    {"type": "task", "theme": "oborona", "lesson": "signaly", "slug": "zadanie-1", ...}
+
+Естественный ключ — слаг: у темы уникален глобально, у урока внутри темы, у
+задания внутри урока. Слаг назначается при первом сохранении
+(core/signals.py) и потом не меняется при переименовании.
+
+Память не зависит от размера каталога: экспорт идёт тремя упорядоченными
+курсорами (``iterator()``), которые сливаются в дерево; импорт копит не
+больше ``batch_size`` записей каждого типа и пишет их одним
+``bulk_create(update_conflicts=True)`` — повторный импорт того же файла
+обновляет записи, а не дублирует их. Записи, которых нет в файле, не
+удаляются.
+
+Файлы (изображения тем, файлы заданий) не переносятся — только их имена в
+хранилище; уменьшенные копии изображений после импорта создаёт команда
+generate_image_variants.
+"""
+import gzip
+import json
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from . import caching, search
+from .counters import recount_lesson_counts, recount_task_counts
+from .models import Theme, Lesson, Task
+
+DEFAULT_BATCH_SIZE = 2000
+
+THEME_FIELDS = ('title', 'description', 'order', 'image')
+LESSON_FIELDS = ('title', 'content', 'video_url', 'order')
+TASK_FIELDS = ('title', 'description', 'file', 'file_size', 'file_sha256')
+
+# Поле родителя, внутри которого слаг уникален
+SLUG_SCOPES = {Theme: None, Lesson: 'theme_id', Task: 'lesson_id'}
+
+
+class CurriculumError(ValueError):
+    """Файл каталога не удаётся разобрать или записи ссылаются на неизвестных родителей."""
+
+
+@dataclass
+class CurriculumStats:
+    themes: int = 0
+    lessons: int = 0
+    tasks: int = 0
+
+    @property
+    def rows(self):
+        return self.themes + self.lessons + self.tasks
+
+    def count(self, kind, number=1):
+        setattr(self, f'{kind}s', getattr(self, f'{kind}s') + number)
+
+
+# --- Слаги ---
+
+def unique_slug(instance):
+    """Свободный слаг из названия: ``signaly``, занят — ``signaly-2`` и т.д."""
+    model = type(instance)
+    base = slugify(instance.title, allow_unicode=True)[:200].strip('-') or model._meta.model_name
+    rows = model.objects.filter(slug__startswith=base).exclude(pk=instance.pk)
+    scope_field = SLUG_SCOPES[model]
+    if scope_field:
+        rows = rows.filter(**{scope_field: getattr(instance, scope_field)})
+    taken = set(rows.values_list('slug', flat=True))
+    slug, number = base, 1
+    while slug in taken:
+        number += 1
+        slug = f'{base}-{number}'
+    return slug
+
+
+def assign_missing_slugs():
+    """Назначить слаги записям, созданным в обход save() (bulk_create); вернуть их число."""
+    assigned = 0
+    for model in SLUG_SCOPES:
+        for instance in model.objects.filter(slug__isnull=True).order_by('pk').iterator():
+            model.objects.filter(pk=instance.pk).update(slug=unique_slug(instance))
+            assigned += 1
+    return assigned
+
+
+# --- Экспорт ---
+
+def open_jsonl(path, mode):
+    """Открыть файл выгрузки (``.gz`` — со сжатием); для ``-`` — None (stdin/stdout)."""
+    if path == '-':
+        return None
+    if path.endswith('.gz'):
+        # Уровень 6: почти тот же размер, что у 9, но в разы быстрее
+        return gzip.open(path, mode + 't', compresslevel=6, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _file_name(value):
+    return value or ''
+
+
+class _ChildStream:
+    """Упорядоченный по родителю поток записей; отдаёт детей очередного родителя."""
+
+    def __init__(self, rows, parent_key):
+        self.rows = iter(rows)
+        self.parent_key = parent_key
+        self.head = next(self.rows, None)
+
+    def take(self, parent_id):
+        while self.head is not None and self.head[self.parent_key] == parent_id:
+            row, self.head = self.head, next(self.rows, None)
+            yield row
+
+
+def export_records(batch_size=DEFAULT_BATCH_SIZE):
+    """Генератор записей каталога в порядке тема, её уроки, задания каждого урока."""
+    assign_missing_slugs()
+    themes = Theme.objects.order_by('pk').values('pk', 'slug', *THEME_FIELDS)
+    # Порядок уроков и заданий согласован с порядком тем: сначала по родителю
+    lessons = _ChildStream(
+        Lesson.objects.order_by('theme_id', 'order', 'created_at', 'pk')
+        .values('pk', 'theme_id', 'slug', *LESSON_FIELDS).iterator(batch_size),
+        'theme_id',
+    )
+    tasks = _ChildStream(
+        Task.objects.order_by(
+            'lesson__theme_id', 'lesson__order', 'lesson__created_at', 'lesson_id', 'created_at', 'pk',
+        ).values('lesson_id', 'slug', *TASK_FIELDS).iterator(batch_size),
+        'lesson_id',
+    )
+    for theme in themes.iterator(batch_size):
+        yield {
+            'type': 'theme', 'slug': theme['slug'],
+            **{field: theme[field] for field in THEME_FIELDS}, 'image': _file_name(theme['image']),
+        }
+        for lesson in lessons.take(theme['pk']):
+            yield {
+                'type': 'lesson', 'theme': theme['slug'], 'slug': lesson['slug'],
+                **{field: lesson[field] for field in LESSON_FIELDS},
+            }
+            for task in tasks.take(lesson['pk']):
+                yield {
+                    'type': 'task', 'theme': theme['slug'], 'lesson': lesson['slug'], 'slug': task['slug'],
+                    **{field: task[field] for field in TASK_FIELDS}, 'file': _file_name(task['file']),
+                }
+
+
+def write_jsonl(records, stream):
+    """Записать записи в ``stream`` по одной на строку; вернуть :class:`CurriculumStats`."""
+    stats = CurriculumStats()
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write('\n')
+        stats.count(record['type'])
+    return stats
+
+
+# --- Импорт ---
+
+def read_jsonl(stream):
+    """Разобрать строки ``stream``; пустые строки пропускаются."""
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise CurriculumError(f'Строка {number}: некорректный JSON ({exc})') from exc
+        if not isinstance(record, dict) or record.get('type') not in ('theme', 'lesson', 'task'):
+            raise CurriculumError(f'Строка {number}: ожидалась запись с type theme, lesson или task')
+        record['_line'] = number
+        yield record
+
+
+def _required(record, key):
+    value = record.get(key)
+    if not value:
+        raise CurriculumError(f'Строка {record.get("_line", "?")}: нет поля {key}')
+    return value
+
+
+class CurriculumImporter:
+    """
+    Копит записи и пишет их пакетами. Родители всегда записываются раньше
+    детей: при сбросе пишутся накопленные темы, затем уроки, затем задания,
+    а id родителей ищутся по слагам одним запросом на пакет.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = CurriculumStats()
+        # Словари по естественному ключу: повтор записи в пакете заменяет
+        # предыдущую (PostgreSQL не даёт обновить одну строку дважды за INSERT)
+        self._themes = {}
+        self._lessons = {}
+        self._tasks = {}
+
+    def add(self, record):
+        kind = record['type']
+        slug = _required(record, 'slug')
+        if kind == 'theme':
+            theme = Theme(slug=slug, **self._values(record, THEME_FIELDS))
+            # bulk_create не вызывает save(): HTML и выдержку считаем здесь
+            theme.render_text()
+            self._themes[slug] = theme
+        elif kind == 'lesson':
+            key = (_required(record, 'theme'), slug)
+            lesson = Lesson(slug=slug, **self._values(record, LESSON_FIELDS))
+            lesson.render_text()
+            self._lessons[key] = lesson
+        else:
+            key = (_required(record, 'theme'), _required(record, 'lesson'), slug)
+            self._tasks[key] = Task(slug=slug, **self._values(record, TASK_FIELDS))
+        if max(len(self._themes), len(self._lessons), len(self._tasks)) >= self.batch_size:
+            self.flush()
+
+    @staticmethod
+    def _values(record, fields):
+        values = {field: record[field] for field in fields if field in record}
+        for file_field in ('image', 'file'):
+            if file_field in values:
+                values[file_field] = values[file_field] or None
+        return values
+
+    def flush(self):
+        themes, lessons, tasks = self._themes, self._lessons, self._tasks
+        self._themes, self._lessons, self._tasks = {}, {}, {}
+        if themes:
+            self._flush_themes(themes)
+        if lessons:
+            self._flush_lessons(lessons)
+        if tasks:
+            self._flush_tasks(tasks)
+
+    def _flush_themes(self, themes):
+        Theme.objects.bulk_create(
+            themes.values(), update_conflicts=True,
+            unique_fields=['slug'], update_fields=[*THEME_FIELDS, *Theme.rendered_fields(), 'updated_at'],
+        )
+        search.update_search_vectors(Theme.objects.filter(slug__in=themes))
+        self.stats.count('theme', len(themes))
+
+    def _flush_lessons(self, lessons):
+        theme_ids = dict(
+            Theme.objects.filter(slug__in={theme for theme, _ in lessons}).values_list('slug', 'pk')
+        )
+        for (theme, slug), lesson in lessons.items():
+            if theme not in theme_ids:
+                raise CurriculumError(f'Урок «{slug}»: тема «{theme}» не найдена')
+            lesson.theme_id = theme_ids[theme]
+        Lesson.objects.bulk_create(
+            lessons.values(), update_conflicts=True,
+            unique_fields=['theme', 'slug'],
+            update_fields=[*LESSON_FIELDS, *Lesson.rendered_fields(), 'updated_at'],
+        )
+        search.update_search_vectors(
+            Lesson.objects.filter(theme_id__in=theme_ids.values(), slug__in={slug for _, slug in lessons})
+        )
+        recount_lesson_counts(Theme.objects.filter(pk__in=theme_ids.values()))
+        self.stats.count('lesson', len(lessons))
+
+    def _flush_tasks(self, tasks):
+        lesson_ids = {
+            (theme, slug): pk
+            for theme, slug, pk in Lesson.objects.filter(
+                theme__slug__in={theme for theme, _, _ in tasks},
+                slug__in={lesson for _, lesson, _ in tasks},
+            ).values_list('theme__slug', 'slug', 'pk')
+        }
+        for (theme, lesson, slug), task in tasks.items():
+            if (theme, lesson) not in lesson_ids:
+                raise CurriculumError(f'Задание «{slug}»: урок «{lesson}» темы «{theme}» не найден')
+            task.lesson_id = lesson_ids[theme, lesson]
+        Task.objects.bulk_create(
+            tasks.values(), update_conflicts=True,
+            unique_fields=['lesson', 'slug'], update_fields=[*TASK_FIELDS, 'updated_at'],
+        )
+        search.update_search_vectors(
+            Task.objects.filter(lesson_id__in=lesson_ids.values(), slug__in={slug for _, _, slug in tasks})
+        )
+        recount_task_counts(Lesson.objects.filter(pk__in=lesson_ids.values()))
+        self.stats.count('task', len(tasks))
+
+
+def import_records(records, batch_size=DEFAULT_BATCH_SIZE):
+    """Загрузить записи одной транзакцией; вернуть :class:`CurriculumStats`."""
+    importer = CurriculumImporter(batch_size)
+    with transaction.atomic():
+        for record in records:
+            importer.add(record)
+        importer.flush()
+        caching.bump_generation(Theme, Lesson, Task)
+    return importer.stats
@@ -0,0 +1,106 @@
+"""
+Чтение каталога с реплик PostgreSQL.
+
+Реплики перечислены в ``DATABASE_REPLICAS`` (см. settings.py, переменная
+DB_REPLICA_HOSTS). Пока список пуст, маршрутизатор ничего не меняет.
+
+На реплику уходит только чтение моделей каталога (``REPLICA_MODELS``) внутри
+view, помеченных :func:`replica_reads`; сессии, пользователи и прогресс всегда
+читаются с основной базы, запись — только в неё.
+
+Реплика отстаёт, поэтому после записи пользователь «прилипает» к основной
+базе: ответ на запрос, который что-то записал, ставит cookie
+``PRIMARY_PIN_COOKIE`` на ``REPLICA_PIN_SECONDS`` секунд, и с ней чтение
+каталога идёт с основной базы, минуя кеш (core/caching.py) — так переход
+mark_lesson_completed → lesson_detail или add_lesson → theme_detail не
+покажет старое состояние.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_PIN_COOKIE = 'db_primary'
+REPLICA_MODELS = frozenset({'core.theme', 'core.lesson', 'core.task', 'core.researcharticle'})
+
+
+class RoutingState:
+    """Маршрутизация текущего запроса."""
+    __slots__ = ('pinned', 'read_alias', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.read_alias = None
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def begin_request(request):
+    """Начать маршрутизацию запроса (core/middleware.py); вернуть токен для :func:`end_request`."""
+    pinned = bool(replicas()) and PRIMARY_PIN_COOKIE in request.COOKIES
+    return _state.set(RoutingState(pinned))
+
+
+def enable_replica_reads(view_func):
+    """Выбрать реплику, если view помечен :func:`replica_reads` и запрос не прилип."""
+    state = _state.get()
+    if state is not None and not state.pinned and replicas() and getattr(view_func, 'replica_reads', False):
+        # Одна реплика на весь запрос — страница читается согласованно
+        state.read_alias = random.choice(replicas())
+
+
+def end_request(token, response):
+    """Закончить маршрутизацию; после записи поставить ``response`` cookie прилипания."""
+    state = _state.get()
+    _state.reset(token)
+    if response is not None and state.wrote and replicas():
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True, samesite='Lax',
+        )
+
+
+def replica_reads(view_func):
+    """Пометить view каталога: его чтение каталога может идти с реплики."""
+    view_func.replica_reads = True
+    return view_func
+
+
+def is_pinned():
+    """Запрос должен видеть свежие данные основной базы (и не доверять кешу каталога)."""
+    state = _state.get()
+    return state is not None and bool(replicas()) and (state.pinned or state.wrote)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not replicas():
+            return None
+        state = _state.get()
+        if (
+            state is not None and state.read_alias and not state.wrote
+            and model._meta.label_lower in REPLICA_MODELS
+        ):
+            return state.read_alias
+        # Явно, чтобы связанные объекты записей с реплики не читались оттуда же
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,254 @@
+"""
+Отдача файлов заданий.
+
+Файл читается с диска блоками через ``FileResponse`` и никогда не грузится в
+память целиком. Поддерживаются один диапазон ``Range: bytes=...`` (докачка,
+перемотка в плеерах), ``If-Range``, ``ETag`` и ``Content-Length``. ETag — это
+SHA-256 содержимого, который считается один раз при загрузке (core/signals.py).
+
+В production байты лучше отдаёт фронт-прокси: при ``TASK_FILES_OFFLOAD``
+``'x-accel'`` (nginx) или ``'x-sendfile'`` (Apache, lighttpd) Django только
+проверяет доступ и возвращает заголовок-указание, а Range обрабатывает прокси.
+
+Публичные медиафайлы (изображения тем, аватары и их уменьшенные копии) отдаёт
+``serve_media`` — без обращений к базе, с ETag и Last-Modified по ``stat``
+файла и кешированием на ``MEDIA_MAX_AGE`` секунд; в production их так же
+можно переложить на прокси (``MEDIA_OFFLOAD``).
+
+Под ASGI Django 4.2 собирает синхронное содержимое потокового ответа — и
+файл ``FileResponse`` тоже — в список (``sync_to_async(list)``) и только
+потом отправляет. ``stream_for_asgi``
+подменяет его асинхронным итератором, который берёт из исходного блоки по
+``CHUNK_SIZE`` через ``sync_to_async``, так что и под ASGI в памяти держится
+один блок.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+
+OFFLOAD_X_ACCEL = 'x-accel'
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_checksum(field_file):
+    """(размер, sha256) файла; читается блоками, позиция файла восстанавливается."""
+    digest = hashlib.sha256()
+    size = 0
+    field_file.open('rb')
+    try:
+        field_file.seek(0)
+        for chunk in field_file.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    finally:
+        field_file.seek(0)
+    return size, digest.hexdigest()
+
+
+def parse_range(header, size):
+    """
+    Разобрать ``Range`` для файла размером ``size``. Вернуть (start, end)
+    включительно, None — если заголовка нет или он не поддерживается (тогда
+    отдаём файл целиком), или ``False`` — если диапазон невыполним (416).
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        # Несколько диапазонов (multipart/byteranges) не поддерживаем — по RFC 9110
+        # сервер вправе проигнорировать Range и вернуть весь файл
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N — последние N байт
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+class RangeFile:
+    """Обёртка файла, которая отдаёт не больше ``length`` байт с позиции ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _take(iterator, size):
+    """Следующие части итератора общим объёмом не меньше ``size`` байт."""
+    parts, total = [], 0
+    for part in iterator:
+        parts.append(part)
+        total += len(part)
+        if total >= size:
+            break
+    return b''.join(parts)
+
+
+async def _async_chunks(iterator, size):
+    take = sync_to_async(_take)
+    while chunk := await take(iterator, size):
+        yield chunk
+
+
+def stream_for_asgi(request, response, size=CHUNK_SIZE):
+    """
+    Под ASGI отдавать потоковый ``response`` асинхронно, блоками по ``size``
+    байт; под WSGI ответ не меняется. Синхронный итератор (курсор БД, файл)
+    читается в том же потоке, что и view (``thread_sensitive``).
+    """
+    if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+        # Закрытие файла или генератора уже зарегистрировано в response
+        response.streaming_content = _async_chunks(iter(response.streaming_content), size)
+    return response
+
+
+def _offload_response(field_file, mode):
+    return _offload(field_file.name, field_file.path, mode)
+
+
+def _offload(name, path, mode):
+    response = HttpResponse()
+    if mode == OFFLOAD_X_ACCEL:
+        prefix = settings.TASK_FILES_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(name)}'
+    else:
+        response['X-Sendfile'] = path
+    # Content-Type определит прокси по расширению
+    del response['Content-Type']
+    return response
+
+
+def serve_file(request, field_file, size=None, checksum=''):
+    """
+    Ответ на скачивание ``field_file``. ``size`` и ``checksum`` берутся из
+    модели; если их нет (файл загружен до появления полей), используются
+    размер из хранилища и ETag без контрольной суммы. Файла нет в хранилище — 404.
+    """
+    storage = field_file.storage
+    if size is None:
+        try:
+            size = storage.size(field_file.name)
+        except OSError:
+            raise Http404('Файл не найден')
+    etag = quote_etag(checksum or f'{size:x}-{field_file.name}')
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    filename = posixpath.basename(field_file.name)
+    mode = settings.TASK_FILES_OFFLOAD
+    if mode in (OFFLOAD_X_ACCEL, OFFLOAD_X_SENDFILE):
+        response = _offload_response(field_file, mode)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if byte_range and if_range and etag not in parse_etags(if_range):
+            # Файл изменился с момента начала докачки — отдаём целиком
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        try:
+            handle = storage.open(field_file.name, 'rb')
+        except OSError:
+            # Запись есть, а файла в хранилище нет (см. compute_task_checksums)
+            raise Http404('Файл не найден')
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = FileResponse(
+                RangeFile(handle, start, length), as_attachment=True, filename=filename,
+                status=206,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            length = size
+            response = FileResponse(handle, as_attachment=True, filename=filename)
+        response.block_size = CHUNK_SIZE
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+        stream_for_asgi(request, response)
+
+    response['ETag'] = etag
+    # Файлы доступны только вошедшим — общим кешам их хранить нельзя
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
+
+def serve_media(request, name):
+    """
+    Ответ с публичным медиафайлом ``name`` из хранилища по умолчанию. Файлы
+    вне ``MEDIA_PUBLIC_PREFIXES`` (файлы заданий выдаются только вошедшим через
+    ``serve_file``) и пути за пределами MEDIA_ROOT — 404.
+    """
+    name = posixpath.normpath(name)
+    if not name.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES)):
+        raise Http404('Файл не найден')
+    try:
+        path = default_storage.path(name)
+        file_stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404('Файл не найден')
+
+    # Копии изображений перезаписываются под тем же именем — валидатор
+    # меняется вместе с временем изменения файла
+    etag = quote_etag(f'{int(file_stat.st_mtime):x}-{file_stat.st_size:x}')
+    last_modified = int(file_stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        mode = settings.MEDIA_OFFLOAD
+        if mode in (OFFLOAD_X_ACCEL, OFFLOAD_X_SENDFILE):
+            response = _offload(name, path, mode)
+        else:
+            response = FileResponse(open(path, 'rb'))
+            response.block_size = CHUNK_SIZE
+            response['Content-Length'] = str(file_stat.st_size)
+            stream_for_asgi(request, response)
+        response['Last-Modified'] = http_date(last_modified)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
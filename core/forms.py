@@ -1,3 +1,5 @@
+from datetime import date, timedelta
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
@@ -19,7 +21,7 @@ class LoginForm(AuthenticationForm):
 class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = UserProfile
-        fields = ['birth_date', 'phone', 'avatar', 'achievements']
+        fields = ['birth_date', 'phone', 'avatar']
 
 class LessonForm(forms.ModelForm):
     class Meta:
@@ -37,4 +39,31 @@ class TaskForm(forms.ModelForm):
 class ThemeForm(forms.ModelForm):
     class Meta:
         model = Theme
-        fields = ['title', 'description', 'image', 'order']
\ No newline at end of file
+        fields = ['title', 'description', 'image', 'order']
+class GradebookFilterForm(forms.Form):
+    """Фильтры ведомости (core/gradebook.py); все поля необязательны."""
+    theme = forms.ModelChoiceField(queryset=Theme.objects.all(), required=False, label="Тема")
+    date_from = forms.DateField(required=False, label="Пройдено с")
+    date_to = forms.DateField(required=False, label="Пройдено по")
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False,
+                               label="Формат")
+
+    # Границы периода переводятся в UTC и сдвигаются на день (core/gradebook.py):
+    # у крайних дат календаря это выходит за пределы datetime
+    MIN_DATE = date.min + timedelta(days=1)
+    MAX_DATE = date.max - timedelta(days=2)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        for field, value in (('date_from', date_from), ('date_to', date_to)):
+            if value and not self.MIN_DATE <= value <= self.MAX_DATE:
+                self.add_error(field, f'Дата вне диапазона {self.MIN_DATE:%d.%m.%Y} — {self.MAX_DATE:%d.%m.%Y}')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('Начало периода позже его конца')
+        return cleaned_data
+
+
+class LeaderboardFilterForm(forms.Form):
+    """Рейтинг по теме; без темы — общий."""
+    theme = forms.ModelChoiceField(queryset=Theme.objects.all(), required=False, label="Тема")
@@ -0,0 +1,126 @@
+"""
+Ведомость успеваемости всех пользователей для сотрудников.
+
+Для каждого пользователя — те же цифры, что profile_view показывает одному:
+пройдено уроков, выполнено заданий, дней с регистрации, достижения. Цифры
+считаются одним запросом с агрегатами по отметкам (LessonCompletion), а не
+запросом на пользователя: задания — суммой денормализованного
+Lesson.task_count пройденных уроков. Строки читаются ``iterator()`` пачками и
+сразу уходят клиенту (StreamingHttpResponse), поэтому память не зависит от
+числа пользователей. Достижения читаются вторым курсором в том же порядке
+пользователей и сливаются со строками.
+
+Фильтры (тема, период прохождения) сужают учитываемые отметки; пользователи
+без отметок в выборке всё равно попадают в ведомость с нулями.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import UserAchievement
+
+CHUNK_SIZE = 2000
+
+COLUMNS = (
+    'user_id', 'username', 'email', 'first_name', 'last_name', 'date_joined',
+    'completed_lessons', 'tasks_completed', 'days_active', 'achievements',
+)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def completion_filter(theme=None, date_from=None, date_to=None):
+    """Условие на отметки пользователя (путь от User) по теме урока и дате прохождения."""
+    condition = Q()
+    if theme is not None:
+        condition &= Q(userprofile__completions__lesson__theme=theme)
+    if date_from is not None:
+        condition &= Q(userprofile__completions__completed_at__gte=_day_start(date_from))
+    if date_to is not None:
+        # Включительно: до начала следующего дня
+        condition &= Q(userprofile__completions__completed_at__lt=_day_start(date_to + timedelta(days=1)))
+    return condition
+
+
+def rows(theme=None, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """Генератор строк ведомости (словари с ключами ``COLUMNS``) в порядке id пользователя."""
+    condition = completion_filter(theme, date_from, date_to)
+    queryset = (
+        User.objects.order_by('pk')
+        .values('pk', 'username', 'email', 'first_name', 'last_name', 'date_joined')
+        .annotate(
+            completed_lessons=Count('userprofile__completions', filter=condition),
+            tasks_completed=Coalesce(
+                Sum('userprofile__completions__lesson__task_count', filter=condition), 0
+            ),
+        )
+    )
+    achievements = (
+        UserAchievement.objects.order_by('userprofile__user_id', 'awarded_at', 'pk')
+        .values_list('userprofile__user_id', 'achievement__title').iterator(chunk_size=chunk_size)
+    )
+    pending = next(achievements, None)
+    now = timezone.now()
+    for row in queryset.iterator(chunk_size=chunk_size):
+        titles = []
+        while pending is not None and pending[0] == row['pk']:
+            titles.append(pending[1])
+            pending = next(achievements, None)
+        yield {
+            'user_id': row['pk'],
+            'username': row['username'],
+            'email': row['email'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'date_joined': row['date_joined'].isoformat(),
+            'completed_lessons': row['completed_lessons'],
+            'tasks_completed': row['tasks_completed'],
+            # Как в profile_view: не меньше одного дня
+            'days_active': max((now - row['date_joined']).days, 1),
+            'achievements': titles,
+        }
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: строка возвращается, а не копится."""
+
+    def write(self, value):
+        return value
+
+
+# С этих символов электронные таблицы начинают формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    """Текст, похожий на формулу (имя «=HYPERLINK(...)»), Excel выводит как есть."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield '﻿' + writer.writerow(COLUMNS)  # BOM — чтобы Excel понял UTF-8
+    for row in rows:
+        yield writer.writerow([
+            _csv_cell('; '.join(row[column]) if column == 'achievements' else row[column]) for column in COLUMNS
+        ])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson; charset=utf-8'),
+}
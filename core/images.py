@@ -0,0 +1,160 @@
+"""
+Уменьшенные копии загруженных изображений (темы, аватары).
+
+Оригинал не трогаем: рядом с ним сохраняются копии нескольких ширин в WebP и
+JPEG (запасной формат для старых браузеров), а их описание записывается в
+JSON-поле модели::
+
+    {'source': 'themes/photo.png', 'width': 3000, 'height': 2000,
+     'variants': {'card': {'width': 800, 'height': 533,
+                           'webp': 'themes/photo.card.webp', 'jpeg': 'themes/photo.card.jpg'}, ...}}
+
+Копии создаёт Celery-задача (core/tasks.py), запускаемая после фиксации
+транзакции сохранения. Пока копий нет или они построены для прежнего файла
+(``source`` не совпадает), шаблоны показывают оригинал (core/templatetags/images.py).
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import caching
+from .models import Theme, UserProfile
+
+# Ширины подобраны под сетку тем, шапку темы и аватары с запасом на 2x-экраны;
+# пропорции сохраняются, обрезку делает CSS (object-fit: cover)
+VARIANT_WIDTHS = {
+    'thumb': 320,
+    'card': 800,
+    'full': 1600,
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Модель -> (поле изображения, поле с описанием копий)
+IMAGE_FIELDS = {
+    Theme: ('image', 'image_variants'),
+    UserProfile: ('avatar', 'avatar_variants'),
+}
+
+
+def _variant_name(source, variant, extension):
+    root, _ = posixpath.splitext(source)
+    return f'{root}.{variant}.{extension}'
+
+
+def _flatten(image):
+    """RGB без прозрачности: JPEG её не поддерживает, фон — белый."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(storage, name, content):
+    # Имена копий стабильны: перезаписываем, а не плодим photo_AbC12.card.webp
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def build_variants(field_file):
+    """Построить и сохранить копии ``field_file``; вернуть их описание."""
+    storage = field_file.storage
+    source = field_file.name
+    with storage.open(source, 'rb') as handle:
+        image = Image.open(handle)
+        image = ImageOps.exif_transpose(image)
+        image = _flatten(image)
+
+    width, height = image.size
+    variants = {}
+    produced_widths = set()
+    for variant, target_width in sorted(VARIANT_WIDTHS.items(), key=lambda item: item[1]):
+        # Не увеличиваем: копии шире оригинала совпали бы с уже созданной
+        variant_width = min(target_width, width)
+        if variant_width in produced_widths:
+            continue
+        produced_widths.add(variant_width)
+        variant_height = max(1, round(height * variant_width / width))
+        resized = image.resize((variant_width, variant_height), Image.Resampling.LANCZOS) \
+            if variant_width != width else image
+        variants[variant] = {
+            'width': variant_width,
+            'height': variant_height,
+            'webp': _save(storage, _variant_name(source, variant, 'webp'),
+                          _encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4)),
+            'jpeg': _save(storage, _variant_name(source, variant, 'jpg'),
+                          _encode(resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)),
+        }
+    return {'source': source, 'width': width, 'height': height, 'variants': variants}
+
+
+def variant_files(data):
+    for variant in (data or {}).get('variants', {}).values():
+        yield variant['webp']
+        yield variant['jpeg']
+
+
+def needs_variants(instance):
+    """Изменился ли файл с момента построения копий (или копий ещё нет)."""
+    image_field, variants_field = IMAGE_FIELDS[type(instance)]
+    name = getattr(instance, image_field).name or ''
+    data = getattr(instance, variants_field) or {}
+    return name != data.get('source', '')
+
+
+def schedule_variants(instance):
+    """Поставить построение копий в очередь после фиксации транзакции."""
+    from .tasks import generate_image_variants
+
+    label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(lambda: generate_image_variants.delay(label, pk))
+
+
+def update_variants(model, pk):
+    """
+    Построить копии для записи и сохранить их описание. Возвращает True, если
+    описание обновлено. Запись обновляется условно по имени файла: если
+    изображение успели заменить, результат устарел и отбрасывается.
+    """
+    image_field, variants_field = IMAGE_FIELDS[model]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not needs_variants(instance):
+        return False
+
+    previous = getattr(instance, variants_field)
+    field_file = getattr(instance, image_field)
+    data = build_variants(field_file) if field_file else {}
+
+    changes = {variants_field: data}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        # Разметка страницы меняется — меняется и её ETag (core/conditional.py)
+        changes['updated_at'] = timezone.now()
+    if field_file:
+        unchanged = Q(**{image_field: field_file.name})
+    else:
+        unchanged = Q(**{image_field: ''}) | Q(**{f'{image_field}__isnull': True})
+    updated = model.objects.filter(unchanged, pk=pk).update(**changes)
+    if not updated:
+        # Изображение заменили во время обработки: новые копии построит следующая задача
+        stale = set(variant_files(data))
+    else:
+        stale = set(variant_files(previous)) - set(variant_files(data))
+        caching.bump_generation(model)
+    storage = field_file.storage
+    for name in stale:
+        storage.delete(name)
+    return bool(updated)
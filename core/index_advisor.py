@@ -0,0 +1,272 @@
+"""
+Разбор планов SQL-запросов страниц и предложения индексов (команда
+advise_indexes).
+
+Запросы собираются ``capture`` — обёрткой курсора с исходным SQL и
+параметрами, как их строит ORM. ``explain`` получает план запроса: в
+PostgreSQL ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)``, в SQLite
+``EXPLAIN QUERY PLAN``, — и отмечает в нём:
+
+* ``seq_scan`` — полный просмотр таблицы не меньше ``min_rows`` строк;
+* ``sort`` — сортировку не меньше ``min_rows`` строк (в SQLite —
+  временное B-дерево для ORDER BY, GROUP BY или DISTINCT; строки
+  считаются тем же запросом без LIMIT);
+* ``nested_loop`` — вложенный цикл, внутренняя часть которого выполняется
+  ``max_loops`` раз и больше (в SQLite — полный просмотр внутренней таблицы
+  соединения).
+
+``propose`` строит по SQL индекс для отмеченной таблицы: сначала столбцы
+условий на равенство (если их нет — столбцы соединения), затем столбцы
+ORDER BY с направлением (без них — столбцы MAX и MIN). Условие на логический столбец с постоянным
+значением (в том числе ``WHERE "is_published"`` без сравнения, как его
+пишет Django) и IS NULL становится условием частичного индекса.
+Предложение отбрасывается, если его столбцы — начало уже существующего
+индекса.
+"""
+import json
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import models
+
+DEFAULT_MIN_ROWS = 1000
+DEFAULT_MAX_LOOPS = 1000
+
+Finding = namedtuple('Finding', 'kind table detail')
+Proposal = namedtuple('Proposal', 'table columns condition')
+
+_IDENTIFIER = r'"(\w+)"\."(\w+)"'
+_FILTER = re.compile(_IDENTIFIER + r' (=|IN \(|IS NULL|IS NOT NULL)')
+_JOIN = re.compile(r'JOIN "(\w+)"(?: \w+)? ON \(' + _IDENTIFIER + ' = ' + _IDENTIFIER + r'\)')
+_BARE_BOOLEAN = re.compile(r'(NOT \(?)?' + _IDENTIFIER + r'(?= AND | OR |\)|$)')
+_LIKE = re.compile(_IDENTIFIER + r' LIKE ')
+_AGGREGATE = re.compile(r'(?:MAX|MIN)\(' + _IDENTIFIER + r'\)')
+_ORDER = re.compile(_IDENTIFIER + r' (ASC|DESC)')
+_SQLITE_TABLE = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+_CLAUSE_END = re.compile(r' (?:GROUP BY|HAVING|ORDER BY|LIMIT|OFFSET) ')
+_LIMIT = re.compile(r' LIMIT \d+(?: OFFSET \d+)?$')
+
+_row_counts = {}
+
+
+@contextmanager
+def capture(connection, queries):
+    """Дописывать в ``queries`` (sql, params) каждого SELECT, выполненного в блоке."""
+    def wrapper(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            queries.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def table_rows(connection, table):
+    """Число строк таблицы (один раз на таблицу за запуск процесса)."""
+    key = (connection.alias, table)
+    if key not in _row_counts:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            _row_counts[key] = cursor.fetchone()[0]
+    return _row_counts[key]
+
+
+def explain(connection, sql, params, min_rows=DEFAULT_MIN_ROWS, max_loops=DEFAULT_MAX_LOOPS):
+    """(текст плана, [Finding]) для запроса."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]['Plan']
+        findings = []
+        _walk_postgres(root, findings, min_rows, max_loops)
+        return json.dumps(root, ensure_ascii=False, indent=1), findings
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            rows = cursor.fetchall()
+        return '\n'.join(row[-1] for row in rows), _sqlite_findings(connection, sql, params, rows, min_rows)
+    return '', []
+
+
+def _walk_postgres(node, findings, min_rows, max_loops):
+    kind = node['Node Type']
+    loops = node.get('Actual Loops', 1)
+    if kind == 'Seq Scan':
+        scanned = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops
+        if scanned >= min_rows:
+            findings.append(Finding('seq_scan', node['Relation Name'], f'{scanned} строк просмотрено'))
+    elif kind in ('Sort', 'Incremental Sort'):
+        # Под Limit узел сортировки отдаёт только первые строки — считаем входные
+        source = node['Plans'][0]
+        rows = source.get('Actual Rows', source.get('Plan Rows', 0)) * source.get('Actual Loops', 1)
+        method = node.get('Sort Method', '')
+        if rows >= min_rows or 'external' in method:
+            findings.append(Finding('sort', _relation(node), f'{rows} строк, {method or kind}'.strip()))
+    elif kind == 'Nested Loop':
+        inner = node['Plans'][-1]
+        if inner.get('Actual Loops', 0) >= max_loops:
+            findings.append(Finding(
+                'nested_loop', _relation(inner), f'внутренняя часть выполнена {inner["Actual Loops"]} раз',
+            ))
+    for child in node.get('Plans', ()):
+        _walk_postgres(child, findings, min_rows, max_loops)
+
+
+def _relation(node):
+    """Таблица, которую читает узел плана или его ближайший потомок."""
+    if 'Relation Name' in node:
+        return node['Relation Name']
+    for child in node.get('Plans', ()):
+        relation = _relation(child)
+        if relation:
+            return relation
+    return None
+
+
+def _sqlite_findings(connection, sql, params, rows, min_rows):
+    findings = []
+    tables_seen = 0
+    first_table = None
+    for row in rows:
+        detail = row[-1]
+        match = _SQLITE_TABLE.match(detail)
+        if match:
+            table = match.group(1)
+            tables_seen += 1
+            first_table = first_table or table
+            if detail.startswith('SCAN') and ' USING ' not in detail and table_rows(connection, table) >= min_rows:
+                kind = 'nested_loop' if tables_seen > 1 else 'seq_scan'
+                findings.append(Finding(kind, table, detail))
+        elif detail.startswith('USE TEMP B-TREE'):
+            sorted_rows = _result_rows(connection, sql, params)
+            if sorted_rows >= min_rows:
+                findings.append(Finding('sort', first_table, f'{detail}, {sorted_rows} строк'))
+    return findings
+
+
+def _result_rows(connection, sql, params):
+    """Число строк запроса без LIMIT — столько строк сортирует SQLite."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM ({_LIMIT.sub("", sql)}) counted', params)
+        return cursor.fetchone()[0]
+
+
+def _where_clause(sql):
+    _, _, where = sql.partition(' WHERE ')
+    return _CLAUSE_END.split(where, 1)[0]
+
+
+def _param_index(sql, position):
+    return sql.count('%s', 0, position)
+
+
+def _field(table, column):
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.db_table == table:
+            for field in model._meta.concrete_fields:
+                if field.column == column:
+                    return model, field
+            return model, None
+    return None, None
+
+
+def propose(sql, params, table):
+    """Proposal для ``table`` по условиям и сортировке запроса или None."""
+    columns, condition = [], {}
+    where = _where_clause(sql)
+    where_start = sql.find(' WHERE ') + len(' WHERE ')
+    for match in _BARE_BOOLEAN.finditer(where):
+        _, field = _field(match.group(2), match.group(3))
+        if match.group(2) == table and isinstance(field, models.BooleanField):
+            condition[match.group(3)] = ('', not match.group(1))
+    for match in _FILTER.finditer(where):
+        if match.group(1) != table:
+            continue
+        column, operator = match.group(2), match.group(3)
+        _, field = _field(table, column)
+        if isinstance(field, models.BooleanField) and operator == '=':
+            index = _param_index(sql, where_start + match.end())
+            if index < len(params) and isinstance(params[index], bool):
+                condition[column] = ('', params[index])
+                continue
+        if operator.startswith('IS'):
+            condition[column] = ('__isnull', operator == 'IS NULL')
+            continue
+        if column not in columns:
+            columns.append(column)
+    # Столбец соединения нужен, только если таблицу ищут по нему (внутренняя
+    # часть соединения), а не по собственным условиям
+    for match in _JOIN.finditer(sql) if not columns else ():
+        for other_table, column in ((match.group(2), match.group(3)), (match.group(4), match.group(5))):
+            if other_table == table and match.group(1) == table and column not in columns:
+                columns.insert(0, column)
+    _, _, order_by = sql.rpartition(' ORDER BY ')
+    if order_by:
+        for match in _ORDER.finditer(order_by):
+            if match.group(1) == table and match.group(2) not in columns:
+                columns.append(('-' if match.group(3) == 'DESC' else '') + match.group(2))
+    if not columns:
+        for match in _AGGREGATE.finditer(sql):
+            if match.group(1) == table and match.group(2) not in columns:
+                columns.append(match.group(2))
+    if not columns:
+        return None
+    return Proposal(table, tuple(columns), tuple(sorted(condition.items())))
+
+
+def substring_search(sql, table):
+    """Условие запроса на ``table`` — LIKE по подстроке: B-tree здесь не поможет."""
+    return any(match.group(1) == table for match in _LIKE.finditer(_where_clause(sql)))
+
+
+def existing_indexes(connection, table):
+    """Списки столбцов индексов таблицы (включая первичный ключ и уникальные)."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        list(info['columns'])
+        for info in constraints.values()
+        if (info['index'] or info['unique'] or info['primary_key']) and info['columns']
+    ]
+
+
+def is_covered(proposal, indexes):
+    """
+    Столбцы предложения — начало существующего индекса. Условие IS NULL
+    может стоять и в начале обычного индекса; для логического условия
+    нужен частичный: ``WHERE "is_published"`` без сравнения, как его пишет
+    Django, SQLite по составному индексу не ищет.
+    """
+    key = [column.lstrip('-') for column in proposal.columns]
+    prefixes = [key]
+    if proposal.condition and all(lookup for _, (lookup, _) in proposal.condition):
+        prefixes.append([column for column, _ in proposal.condition] + key)
+    return any(index[:len(prefix)] == prefix for index in indexes for prefix in prefixes)
+
+
+def index_definition(proposal):
+    """Текст models.Index(...) для Meta.indexes модели таблицы."""
+    model, _ = _field(proposal.table, None)
+    names = {field.column: field.name for field in model._meta.concrete_fields} if model else {}
+
+    def field_name(column):
+        descending = column.startswith('-')
+        name = names.get(column.lstrip('-'), column.lstrip('-'))
+        return ('-' if descending else '') + name
+
+    fields = [field_name(column) for column in proposal.columns]
+    short = '_'.join(name.lstrip('-') for name in fields)[:16].rstrip('_')
+    name = f'{proposal.table[:9]}_{short}_idx'
+    arguments = [f'fields={fields!r}', f'name={name!r}']
+    if proposal.condition:
+        condition = ', '.join(
+            f'{field_name(column)}{lookup}={value!r}' for column, (lookup, value) in proposal.condition
+        )
+        arguments.append(f'condition=models.Q({condition})')
+    label = model._meta.label if model else proposal.table
+    return f'{label}: models.Index({", ".join(arguments)})'
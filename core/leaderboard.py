@@ -0,0 +1,205 @@
+"""
+Рейтинг пользователей по числу пройденных уроков: общий и по темам.
+
+Очки хранятся в сводной таблице LeaderboardEntry (строка на пользователя и
+рейтинг) и меняются на разницу при отметке уроков: сигнал m2m_changed на
+completed_lessons ставит задачу Celery после фиксации транзакции. Полный
+пересчёт по отметкам нужен только для ремонта (команда rebuild_leaderboard).
+
+Запросы не зависят от числа пользователей:
+
+* первые N — чтение начала индекса (scope, -score, userprofile);
+* место пользователя — 1 + число пользователей с большим счётом, которое
+  берётся из гистограммы LeaderboardBucket (пользователей на каждое значение
+  счёта), а не подсчётом строк рейтинга.
+
+Одинаковый счёт — одинаковое место («1, 2, 2, 4»). Строки с нулевым счётом
+остаются в таблице, но в рейтинг и гистограмму не входят.
+
+Корзины гистограммы общие для всех пользователей, поэтому строки блокируются
+в одном порядке — по (scope, score), строки рейтинга — по (scope, профиль):
+иначе задача, переводящая профиль из корзины 4 в 5, и задача, переводящая
+другой профиль из 5 в 4, в PostgreSQL взаимно блокируются.
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import LeaderboardBucket, LeaderboardEntry, LessonCompletion, UserProfile
+
+OVERALL = LeaderboardEntry.OVERALL
+TOP_SIZE = 50
+
+
+@dataclass
+class Rank:
+    position: int
+    score: int
+    participants: int
+
+
+# --- Инкрементальные изменения ---
+
+def _add_to_buckets(scope, histogram, sign=1):
+    """
+    Прибавить (``sign`` = 1) или вычесть (-1) пользователей корзин
+    ``{счёт: пользователей}``; корзины меняются по возрастанию счёта.
+    """
+    for score, users in sorted(histogram.items()):
+        users *= sign
+        if score <= 0 or not users:
+            continue
+        buckets = LeaderboardBucket.objects.filter(scope=scope, score=score)
+        if not buckets.update(users=F('users') + users) and users > 0:
+            LeaderboardBucket.objects.create(scope=scope, score=score, users=users)
+
+
+def _shifted_score(delta):
+    # Счёт не уходит ниже нуля, даже если рейтинг разошёлся с отметками
+    if delta > 0:
+        return F('score') + delta
+    return Case(When(score__gt=-delta, then=F('score') + delta), default=Value(0))
+
+
+def apply(profile_ids, theme_counts, sign):
+    """
+    Каждому профилю из ``profile_ids`` прибавить (``sign`` = 1) или вычесть
+    (-1) уроки: ``theme_counts`` — {id темы: сколько уроков}, общий рейтинг
+    меняется на их сумму. Строки профилей блокируются до конца транзакции,
+    так что параллельные изменения одного профиля не теряются.
+    """
+    deltas = {scope: sign * count for scope, count in theme_counts.items() if count}
+    if not deltas:
+        return
+    deltas[OVERALL] = sum(deltas.values())
+    with transaction.atomic():
+        for scope, delta in sorted(deltas.items()):
+            current = dict(
+                LeaderboardEntry.objects.select_for_update()
+                .filter(scope=scope, userprofile_id__in=profile_ids).order_by('userprofile_id')
+                .values_list('userprofile_id', 'score')
+            )
+            new_scores = Counter(max(score + delta, 0) for score in current.values())
+            if current:
+                LeaderboardEntry.objects.filter(scope=scope, userprofile_id__in=current).update(
+                    score=_shifted_score(delta)
+                )
+            missing = [profile_id for profile_id in profile_ids if profile_id not in current]
+            if missing and delta > 0:
+                # Профиль мог быть удалён, пока задача ждала в очереди
+                missing = list(UserProfile.objects.filter(pk__in=missing).values_list('pk', flat=True))
+                LeaderboardEntry.objects.bulk_create([
+                    LeaderboardEntry(userprofile_id=profile_id, scope=scope, score=delta)
+                    for profile_id in missing
+                ])
+                new_scores[delta] += len(missing)
+            # Одно изменение на корзину: ушедшие вычитаются, пришедшие прибавляются
+            new_scores.subtract(Counter(current.values()))
+            _add_to_buckets(scope, new_scores)
+
+
+def schedule(profile_ids, theme_counts, sign):
+    """Поставить изменение рейтинга в очередь после фиксации транзакции."""
+    from .tasks import update_leaderboard
+
+    profile_ids = sorted(profile_ids)
+    # Ключи словаря в JSON — строки; задача приводит их обратно к int
+    theme_counts = {str(theme_id): count for theme_id, count in theme_counts.items()}
+    transaction.on_commit(lambda: update_leaderboard.delay(profile_ids, theme_counts, sign))
+
+
+def forget_profile(profile_id):
+    """Профиль удаляется: убрать его строки из гистограмм (сами строки удалит каскад)."""
+    entries = LeaderboardEntry.objects.filter(userprofile_id=profile_id).order_by('scope')
+    for scope, score in entries.values_list('scope', 'score'):
+        _add_to_buckets(scope, {score: 1}, -1)
+
+
+def forget_theme(theme_id):
+    """Тема удалена — её рейтинг больше не нужен."""
+    LeaderboardEntry.objects.filter(scope=theme_id).delete()
+    LeaderboardBucket.objects.filter(scope=theme_id).delete()
+
+
+# --- Чтение ---
+
+def top(scope=OVERALL, limit=TOP_SIZE):
+    """Первые ``limit`` строк рейтинга; у каждой — место ``position``."""
+    entries = list(
+        LeaderboardEntry.objects.filter(scope=scope, score__gt=0)
+        .order_by('-score', 'userprofile_id').select_related('userprofile__user')[:limit]
+    )
+    previous = None
+    for index, entry in enumerate(entries, 1):
+        entry.position = previous.position if previous and previous.score == entry.score else index
+        previous = entry
+    return entries
+
+
+def rank(profile_id, scope=OVERALL):
+    """Место профиля (:class:`Rank`) или None, если в рейтинге его нет."""
+    score = (
+        LeaderboardEntry.objects.filter(scope=scope, userprofile_id=profile_id, score__gt=0)
+        .values_list('score', flat=True).first()
+    )
+    if score is None:
+        return None
+    totals = LeaderboardBucket.objects.filter(scope=scope).aggregate(
+        above=Sum('users', filter=Q(score__gt=score)), participants=Sum('users'),
+    )
+    return Rank(position=(totals['above'] or 0) + 1, score=score, participants=totals['participants'] or 0)
+
+
+# --- Полный пересчёт ---
+
+def _entries(rows, scope_key):
+    for row in rows:
+        yield LeaderboardEntry(
+            userprofile_id=row['userprofile_id'], scope=row[scope_key] if scope_key else OVERALL,
+            score=row['score'],
+        )
+
+
+def _bulk_create(model, objs, batch_size):
+    batch, total = [], 0
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            total += len(model.objects.bulk_create(batch))
+            batch = []
+    return total + len(model.objects.bulk_create(batch))
+
+
+def rebuild(batch_size=5000):
+    """
+    Пересчитать рейтинг по отметкам (ремонт) и вернуть число строк. Таблица
+    рейтинга блокируется до конца транзакции, чтобы изменения, пришедшие во
+    время пересчёта, дождались его и применились к новым данным.
+    """
+    with transaction.atomic():
+        connection = transaction.get_connection()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {LeaderboardEntry._meta.db_table}, {LeaderboardBucket._meta.db_table} '
+                    'IN SHARE ROW EXCLUSIVE MODE'
+                )
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardBucket.objects.all().delete()
+
+        completions = LessonCompletion.objects.order_by()
+        total = _bulk_create(LeaderboardEntry, _entries(
+            completions.values('userprofile_id').annotate(score=Count('pk')).iterator(batch_size), None,
+        ), batch_size)
+        total += _bulk_create(LeaderboardEntry, _entries(
+            completions.values('userprofile_id', 'lesson__theme_id').annotate(score=Count('pk'))
+            .iterator(batch_size), 'lesson__theme_id',
+        ), batch_size)
+        _bulk_create(LeaderboardBucket, (
+            LeaderboardBucket(**row)
+            for row in LeaderboardEntry.objects.values('scope', 'score').annotate(users=Count('pk'))
+            .order_by().iterator(batch_size)
+        ), batch_size)
+    return total
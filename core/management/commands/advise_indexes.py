@@ -0,0 +1,170 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.core.management.base import BaseCommand, CommandError
+
+from core import index_advisor, search
+from core.models import Theme, Lesson, Task, UserProfile
+from core.urls import urlpatterns
+
+# Сценарий для каждого маршрута core/urls.py:
+# имя -> (аргументы URL, кто запрашивает, метод, данные)
+SCENARIOS = {
+    'index': ({}, None, 'get', {}),
+    'research': ({}, None, 'get', {}),
+    'themes': ({}, None, 'get', {}),
+    'theme_detail': ({'pk': 'theme'}, None, 'get', {}),
+    'lesson_detail': ({'lesson_id': 'lesson'}, 'learner', 'get', {}),
+    'register': ({}, None, 'get', {}),
+    'login': ({}, None, 'get', {}),
+    'profile': ({}, 'learner', 'get', {}),
+    'search': ({}, None, 'get', {'q': 'query'}),
+    'leaderboard': ({}, 'learner', 'get', {}),
+    'mark_lesson_completed': ({'lesson_id': 'lesson'}, 'learner', 'post', {}),
+    'progress_sync': ({}, 'learner', 'post', {'operations': []}),
+    'task_download': ({'task_id': 'task'}, 'learner', 'get', {}),
+    'add_lesson': ({'theme_id': 'theme'}, 'staff', 'get', {}),
+    'add_task': ({'lesson_id': 'lesson'}, 'staff', 'get', {}),
+    'gradebook_export': ({}, 'staff', 'get', {}),
+    'metrics': ({}, 'staff', 'get', {}),
+    'logout': ({}, 'learner', 'get', {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает каждую страницу core/urls.py на заполненной базе (seed_dataset), '
+        'собирает её SQL и разбирает планы: EXPLAIN (ANALYZE, BUFFERS) в PostgreSQL, '
+        'EXPLAIN QUERY PLAN в SQLite. Отмечает полные просмотры, сортировки и '
+        'вложенные циклы и предлагает составные и частичные индексы. Все изменения '
+        'страниц откатываются, кеш не используется'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', action='append', dest='views', help='Только эти маршруты')
+        parser.add_argument('--min-rows', type=int, default=index_advisor.DEFAULT_MIN_ROWS,
+                            help='С какого числа строк полный просмотр и сортировка — проблема')
+        parser.add_argument('--max-loops', type=int, default=index_advisor.DEFAULT_MAX_LOOPS,
+                            help='С какого числа повторов внутренней части вложенный цикл — проблема')
+        parser.add_argument('--plans', action='store_true', help='Печатать планы отмеченных запросов')
+
+    def handle(self, *args, **options):
+        missing = [pattern.name for pattern in urlpatterns if pattern.name and pattern.name not in SCENARIOS]
+        if missing:
+            raise CommandError(f'Нет сценария для маршрутов: {", ".join(missing)}')
+        # Порядок сценариев, а не маршрутов: выход — последним
+        names = list(SCENARIOS)
+        if options['views']:
+            unknown = set(options['views']) - set(names)
+            if unknown:
+                raise CommandError(f'Неизвестные маршруты: {", ".join(sorted(unknown))}')
+            names = [name for name in names if name in options['views']]
+
+        proposals = {}
+        # Без кеша страницы выполняют все свои запросы; реплики не нужны —
+        # план смотрим на основной базе
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            DATABASE_REPLICAS=[], AUDIT_ASYNC=False,
+        ), transaction.atomic():
+            samples = self._samples()
+            clients = self._clients(samples)
+            for name in names:
+                self._advise(name, samples, clients, options, proposals)
+            transaction.set_rollback(True)
+
+        self.stdout.write('')
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('Новых индексов не требуется'))
+            return
+        self.stdout.write(self.style.WARNING(f'Предложено индексов: {len(proposals)}'))
+        for proposal, views in proposals.items():
+            self.stdout.write(f'  {index_advisor.index_definition(proposal)}  # {", ".join(sorted(views))}')
+
+    @staticmethod
+    def _samples():
+        """Самые «тяжёлые» записи: тема с наибольшим числом уроков, урок с заданиями и т.д."""
+        theme = Theme.objects.order_by('-lesson_count', 'pk').first()
+        lesson = Lesson.objects.order_by('-task_count', 'pk').first()
+        if theme is None or lesson is None:
+            raise CommandError('База пуста: заполните её командой seed_dataset')
+        profile = (
+            UserProfile.objects.annotate(completed=Count('completions'))
+            .order_by('-completed', 'pk').select_related('user').first()
+        )
+        if profile is None:
+            raise CommandError('Нет пользователей: заполните базу командой seed_dataset')
+        task = Task.objects.filter(lesson=lesson).order_by('pk').first() or Task.objects.order_by('pk').first()
+        words = [word for word in lesson.title.split() if len(word) >= search.MIN_QUERY_LENGTH]
+        return {
+            'theme': theme.pk, 'lesson': lesson.pk, 'task': task.pk if task else 0,
+            'query': words[0] if words else lesson.title, 'learner': profile.user,
+        }
+
+    @staticmethod
+    def _clients(samples):
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('', '*') and not host.startswith('.')),
+                    'localhost')
+        staff = User.objects.create_superuser('advise_indexes_staff', 'advise@example.com', None)
+        clients = {}
+        for role, user in ((None, None), ('learner', samples['learner']), ('staff', staff)):
+            client = Client(HTTP_HOST=host, raise_request_exception=False)
+            if user is not None:
+                client.force_login(user)
+            clients[role] = client
+        return clients
+
+    def _advise(self, name, samples, clients, options, proposals):
+        url_kwargs, role, method, data = SCENARIOS[name]
+        url = reverse(name, kwargs={key: samples[value] for key, value in url_kwargs.items()})
+        data = {key: samples[value] if value == 'query' else value for key, value in data.items()}
+        queries = []
+        with index_advisor.capture(connection, queries):
+            if method == 'post' and name == 'progress_sync':
+                response = clients[role].post(url, json.dumps(data), content_type='application/json')
+            else:
+                response = getattr(clients[role], method)(url, data)
+
+        flagged = []
+        seen = set()
+        for sql, params in queries:
+            if (sql, params) in seen:
+                continue
+            seen.add((sql, params))
+            plan, findings = index_advisor.explain(
+                connection, sql, params, options['min_rows'], options['max_loops'],
+            )
+            if findings:
+                flagged.append((sql, params, plan, findings))
+
+        style = self.style.WARNING if flagged else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{name} ({method.upper()} {url} → {response.status_code}): '
+            f'запросов {len(queries)}, с замечаниями {len(flagged)}'
+        ))
+        for sql, params, plan, findings in flagged:
+            self.stdout.write(f'    {sql[:160]}{"…" if len(sql) > 160 else ""}')
+            if options['plans']:
+                self.stdout.write('      ' + plan.replace('\n', '\n      '))
+            for finding in findings:
+                self.stdout.write(f'    [{finding.kind}] {finding.table or "?"}: {finding.detail}')
+                self.stdout.write(f'      → {self._verdict(sql, params, finding, name, proposals)}')
+
+    @staticmethod
+    def _verdict(sql, params, finding, view, proposals):
+        if finding.table is None:
+            return 'таблица не определена'
+        if index_advisor.substring_search(sql, finding.table):
+            return 'поиск LIKE по подстроке — B-tree не поможет (в PostgreSQL поиск идёт по GIN-индексам)'
+        proposal = index_advisor.propose(sql, params, finding.table)
+        if proposal is None:
+            return 'нет условий и сортировки по этой таблице — индекс не поможет'
+        if index_advisor.is_covered(proposal, index_advisor.existing_indexes(connection, finding.table)):
+            return 'подходящий индекс уже есть — нужен другой запрос, а не индекс'
+        proposals.setdefault(proposal, set()).add(view)
+        return index_advisor.index_definition(proposal)
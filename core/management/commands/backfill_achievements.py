@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import achievements
+from core.models import Achievement, UserAchievement, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит достижения из старого текстового поля профиля в UserAchievement '
+        '(ручные достижения) и, с --evaluate, выдаёт достижения по правилам за уже '
+        'накопленный прогресс'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--evaluate', action='store_true',
+                            help='Проверить активные правила по всему прогрессу (для новых правил)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            # bulk_create с ignore_conflicts возвращает все переданные объекты,
+            # вставленные строки считаем по таблице: повторный запуск покажет нули
+            before = UserAchievement.objects.count()
+            self._migrate_text(batch_size)
+            migrated = UserAchievement.objects.count() - before
+            if options['evaluate']:
+                self._evaluate(batch_size, options['verbosity'])
+            awarded = UserAchievement.objects.count() - before - migrated
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено из текста: {migrated}, выдано по правилам: {awarded}'
+        ))
+
+    @staticmethod
+    def _award(awards):
+        # Повторный запуск ничего не дублирует
+        UserAchievement.objects.bulk_create(awards, ignore_conflicts=True)
+
+    def _migrate_text(self, batch_size):
+        known = {}
+        batch = []
+        profiles = UserProfile.objects.exclude(achievements='').only('pk', 'achievements')
+        for profile in profiles.iterator(chunk_size=batch_size):
+            for title in achievements.split_legacy(profile.achievements):
+                batch.append(UserAchievement(
+                    userprofile_id=profile.pk, achievement_id=achievements.manual_achievement(title, known),
+                ))
+            if len(batch) >= batch_size:
+                self._award(batch)
+                batch = []
+        self._award(batch)
+
+    def _evaluate(self, batch_size, verbosity):
+        rules = Achievement.objects.filter(is_active=True).exclude(rule=Achievement.MANUAL).select_related('theme')
+        for achievement in rules:
+            batch = []
+            for profile_id in achievements.qualified_profiles(achievement).iterator(chunk_size=batch_size):
+                batch.append(UserAchievement(userprofile_id=profile_id, achievement=achievement))
+                if len(batch) >= batch_size:
+                    self._award(batch)
+                    batch = []
+            self._award(batch)
+            if verbosity > 1:
+                self.stdout.write(f'{achievement}: проверено')
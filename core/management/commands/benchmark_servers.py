@@ -0,0 +1,205 @@
+import asyncio
+import importlib.util
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+APPLICATIONS = {
+    'wsgi': ('serve_ready.wsgi:application', []),
+    'asgi': ('serve_ready.asgi:application', ['--worker-class', 'uvicorn.workers.UvicornWorker']),
+}
+READY_TIMEOUT = 30
+REQUEST_TIMEOUT = 30
+
+
+def _percentile(sorted_values, fraction):
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class LoadResult:
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+        self.elapsed = 0.0
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies) + self.errors,
+            'errors': self.errors,
+            'rps': len(latencies) / self.elapsed if self.elapsed else 0.0,
+            'p50': _percentile(latencies, 0.50) * 1000,
+            'p95': _percentile(latencies, 0.95) * 1000,
+            'p99': _percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+
+async def _get(host, port, path, slow_seconds=0.0):
+    """Один GET по новому соединению; возвращает код ответа."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'
+        if slow_seconds:
+            # Медленный клиент: заголовки приходят не сразу
+            writer.write(head.encode('ascii'))
+            await writer.drain()
+            await asyncio.sleep(slow_seconds)
+            head = ''
+        writer.write(f'{head}Connection: close\r\n\r\n'.encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(65536):
+            pass
+    finally:
+        writer.close()
+    return int(status_line.split()[1])
+
+
+async def _run_load(host, port, paths, total, concurrency, slow_clients, slow_seconds):
+    result = LoadResult()
+    issued = 0
+    done = asyncio.Event()
+
+    async def client():
+        nonlocal issued
+        while issued < total:
+            path = paths[issued % len(paths)]
+            issued += 1
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(_get(host, port, path), REQUEST_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                result.errors += 1
+                continue
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if status >= 500:
+                result.errors += 1
+            else:
+                result.latencies.append(time.perf_counter() - started)
+
+    async def slow_client():
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(_get(host, port, paths[0], slow_seconds), REQUEST_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                await asyncio.sleep(0.1)
+
+    slow = [asyncio.create_task(slow_client()) for _ in range(slow_clients)]
+    if slow:
+        await asyncio.sleep(0.5)  # медленные клиенты успевают занять соединения
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    done.set()
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвостовые задержки каталога под WSGI '
+        '(синхронные воркеры gunicorn) и ASGI (воркеры uvicorn) при множестве '
+        'одновременных соединений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+        parser.add_argument('--workers', type=int, default=2, help='Процессов gunicorn')
+        parser.add_argument('--concurrency', type=int, default=200, help='Одновременных соединений')
+        parser.add_argument('--requests', type=int, default=5000, help='Запросов на режим')
+        parser.add_argument('--warmup', type=int, default=100, help='Запросов на прогрев (не учитываются)')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='URL для нагрузки, можно несколько (по умолчанию /themes/)')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Фоновых клиентов, которые медленно присылают заголовки')
+        parser.add_argument('--slow-seconds', type=float, default=2.0,
+                            help='Сколько медленный клиент тянет с заголовками')
+        parser.add_argument('--port', type=int, default=8790, help='Первый свободный порт для серверов')
+        parser.add_argument('--url', help='Нагружать уже запущенный сервер вместо запуска своих')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/themes/']
+        if options['url']:
+            parts = urlsplit(options['url'])
+            targets = [(parts.netloc, parts.hostname, parts.port or 80, None)]
+        else:
+            modes = ('wsgi', 'asgi') if options['mode'] == 'both' else (options['mode'],)
+            if 'asgi' in modes and importlib.util.find_spec('uvicorn') is None:
+                raise CommandError('Для режима asgi нужен uvicorn: pip install uvicorn')
+            targets = [
+                (mode, '127.0.0.1', options['port'] + offset, mode) for offset, mode in enumerate(modes)
+            ]
+
+        rows = []
+        for label, host, port, mode in targets:
+            server = self._start_server(mode, port, options['workers']) if mode else None
+            try:
+                self._wait_ready(host, port, server)
+                asyncio.run(_run_load(host, port, paths, options['warmup'], min(options['concurrency'], 20), 0, 0))
+                result = asyncio.run(_run_load(
+                    host, port, paths, options['requests'], options['concurrency'],
+                    options['slow_clients'], options['slow_seconds'],
+                ))
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(10)
+            rows.append((label, result))
+            self._report(label, result)
+
+        if len(rows) == 2:
+            (_, wsgi), (_, asgi) = rows
+            wsgi, asgi = wsgi.summary(), asgi.summary()
+            self.stdout.write(self.style.SUCCESS(
+                f'asgi/wsgi: пропускная способность x{asgi["rps"] / max(wsgi["rps"], 1e-9):.2f}, '
+                f'p99 x{asgi["p99"] / max(wsgi["p99"], 1e-9):.2f}'
+            ))
+
+    def _start_server(self, mode, port, workers):
+        application, extra = APPLICATIONS[mode]
+        env = dict(os.environ, ASGI_MODE='True' if mode == 'asgi' else 'False')
+        command = [
+            sys.executable, '-m', 'gunicorn', application,
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+            *extra,
+        ]
+        self.stdout.write(f'Запуск {mode}: {" ".join(command[2:])}')
+        return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+
+    @staticmethod
+    def _wait_ready(host, port, server):
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError(f'Сервер завершился с кодом {server.returncode}')
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Сервер на {host}:{port} не ответил за {READY_TIMEOUT} с')
+
+    def _report(self, label, result):
+        summary = result.summary()
+        statuses = ', '.join(f'{status}: {count}' for status, count in sorted(result.statuses.items()))
+        self.stdout.write(
+            f'{label}: {summary["requests"]} запросов, ошибок {summary["errors"]}, '
+            f'{summary["rps"]:.1f} rps, p50 {summary["p50"]:.1f} мс, p95 {summary["p95"]:.1f} мс, '
+            f'p99 {summary["p99"]:.1f} мс, max {summary["max"]:.1f} мс ({statuses})'
+        )
@@ -0,0 +1,118 @@
+import random
+import time
+from importlib import import_module
+
+from django.contrib.sessions.models import Session
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'core': 'core.sessions',
+}
+# Сессия после входа: её читает AuthenticationMiddleware на каждом запросе
+SESSION_DATA = {'_auth_user_id': '1', '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend'}
+WRITE, REWRITE, READ = 'write', 'rewrite', 'read'
+
+
+class QueryCounter:
+    """execute_wrapper: чтения и записи; точки сохранения транзакций не считаются."""
+
+    def __init__(self):
+        self.reads = self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        verb = sql.lstrip().split(' ', 1)[0].upper()
+        if verb == 'SELECT':
+            self.reads += 1
+        elif verb in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды сессий (db, cached_db и core.sessions) с локальным кешем '
+        'в памяти процесса: запросы к django_session и время на запрос при типичной '
+        'смеси запросов, повторяя логику SessionMiddleware'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=200, help='Сессий пользователей')
+        parser.add_argument('--requests', type=int, default=5000, help='Запросов на бэкенд')
+        parser.add_argument('--write-ratio', type=float, default=0.02,
+                            help='Доля запросов, меняющих данные сессии')
+        parser.add_argument('--rewrite-ratio', type=float, default=0.2,
+                            help='Доля запросов, присваивающих ключу сессии прежнее значение')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        operations = [
+            rng.choices(
+                (WRITE, REWRITE, READ),
+                weights=(options['write_ratio'], options['rewrite_ratio'],
+                         1 - options['write_ratio'] - options['rewrite_ratio']),
+            )[0]
+            for _ in range(options['requests'])
+        ]
+        keys = self._create_sessions(options['sessions'])
+        order = [rng.choice(keys) for _ in operations]
+        try:
+            self.stdout.write(
+                f'{len(keys)} сессий, {len(operations)} запросов: '
+                f'{operations.count(WRITE)} меняют данные, {operations.count(REWRITE)} присваивают то же'
+            )
+            for save_every_request in (False, True):
+                self.stdout.write(
+                    'Скользящий срок (SESSION_SAVE_EVERY_REQUEST):' if save_every_request
+                    else 'Сохранение только изменённой сессии:'
+                )
+                for label, engine in ENGINES.items():
+                    self._run(label, import_module(engine), keys, order, operations, save_every_request)
+        finally:
+            Session.objects.filter(session_key__in=keys).delete()
+
+    @staticmethod
+    def _create_sessions(number):
+        store_class = import_module(ENGINES['db']).SessionStore
+        keys = []
+        for _ in range(number):
+            store = store_class()
+            store.update(SESSION_DATA)
+            store.create()
+            keys.append(store.session_key)
+        return keys
+
+    def _run(self, label, engine, keys, order, operations, save_every_request):
+        cache = LocMemCache('benchmark_sessions', {'OPTIONS': {'MAX_ENTRIES': len(keys) * 4}})
+        cache.clear()
+        # Прогрев: каждая сессия один раз прочитана и лежит в кеше
+        for key in keys:
+            self._request(engine, key, READ, cache, False)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            for key, operation in zip(order, operations):
+                self._request(engine, key, operation, cache, save_every_request)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {label}: SELECT {counter.reads}, запись {counter.writes}, '
+            f'{elapsed / len(operations) * 1_000_000:.0f} мкс на запрос'
+        )
+
+    @staticmethod
+    def _request(engine, key, operation, cache, save_every_request):
+        """Один запрос так, как его видит SessionMiddleware."""
+        store = engine.SessionStore(key)
+        if hasattr(store, '_cache'):
+            store._cache = cache
+        store.get('_auth_user_id')
+        if operation == WRITE:
+            store['visits'] = store.get('visits', 0) + 1
+        elif operation == REWRITE:
+            store['_auth_user_id'] = store['_auth_user_id']
+        if store.modified or save_every_request:
+            store.save()
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core import caching
+from core.downloads import file_checksum
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Считает размер и SHA-256 файлов заданий, загруженных до появления этих полей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересчитать и для файлов, у которых сумма уже есть',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.exclude(Q(file='') | Q(file__isnull=True)).only('pk', 'file')
+        if not options['force']:
+            tasks = tasks.filter(file_sha256='')
+        updated = missing = 0
+        for task in tasks.iterator():
+            try:
+                size, checksum = file_checksum(task.file)
+            except OSError as error:
+                missing += 1
+                self.stderr.write(f'Файл не прочитан: {task.file.name} (задание {task.pk}): {error}')
+                continue
+            finally:
+                task.file.close()
+            Task.objects.filter(pk=task.pk).update(
+                file_size=size, file_sha256=checksum, updated_at=timezone.now()
+            )
+            updated += 1
+        if updated:
+            caching.bump_generation(Task)
+        self.stdout.write(self.style.SUCCESS(f'Обновлено заданий: {updated}, файлов не прочитано: {missing}'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.curriculum import DEFAULT_BATCH_SIZE, export_records, open_jsonl, write_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает каталог (темы, уроки, задания) в JSON Lines потоком, '
+        'не загружая его в память целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default='-',
+                            help='Файл для выгрузки, .gz — со сжатием (по умолчанию stdout)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Строк, читаемых из базы за раз')
+
+    def handle(self, *args, **options):
+        stream = open_jsonl(options['output'], 'w')
+        # Данные идут в stdout — отчёт тогда в stderr
+        report = self.stderr if stream is None else self.stdout
+        started = time.perf_counter()
+        try:
+            stats = write_jsonl(export_records(options['batch_size']), stream or self.stdout)
+        finally:
+            if stream is not None:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        report.write(self.style.SUCCESS(
+            f'Выгружено за {elapsed:.1f} с: тем {stats.themes}, уроков {stats.lessons}, '
+            f'заданий {stats.tasks} ({stats.rows / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core import images
+from core.tasks import generate_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии изображений тем и аватаров, которых ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Строить копии в этом процессе, а не ставить задачи в очередь Celery',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они актуальны',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, (image_field, variants_field) in images.IMAGE_FIELDS.items():
+            queryset = (
+                model.objects.exclude(Q(**{image_field: ''}) | Q(**{f'{image_field}__isnull': True}))
+                .only('pk', image_field, variants_field)
+            )
+            for instance in queryset.iterator():
+                if options['force']:
+                    model.objects.filter(pk=instance.pk).update(**{variants_field: {}})
+                elif not images.needs_variants(instance):
+                    continue
+                if options['sync']:
+                    images.update_variants(model, instance.pk)
+                else:
+                    generate_image_variants.delay(model._meta.label, instance.pk)
+                total += 1
+        action = 'Обработано' if options['sync'] else 'Поставлено в очередь'
+        self.stdout.write(self.style.SUCCESS(f'{action} изображений: {total}'))
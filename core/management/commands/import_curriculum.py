@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.curriculum import DEFAULT_BATCH_SIZE, CurriculumError, import_records, open_jsonl, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает каталог из JSON Lines (см. export_curriculum) пакетными upsert '
+        'по слагам в одной транзакции; повторная загрузка обновляет записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл выгрузки, .gz — сжатый, - — stdin')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Записей каждого типа в одном INSERT')
+
+    def handle(self, *args, **options):
+        stream = open_jsonl(options['input'], 'r')
+        started = time.perf_counter()
+        try:
+            stats = import_records(read_jsonl(stream or sys.stdin), options['batch_size'])
+        except CurriculumError as exc:
+            raise CommandError(f'Каталог не загружен: {exc}')
+        finally:
+            if stream is not None:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено за {elapsed:.1f} с: тем {stats.themes}, уроков {stats.lessons}, '
+            f'заданий {stats.tasks} ({stats.rows / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
@@ -0,0 +1,129 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+# Секционированная копия схемы из postgres/init.sql. Ключ секционирования
+# обязан входить в первичный ключ, поэтому PK — (id, created_at), а
+# created_at — NOT NULL.
+PARTITIONED_TABLE_SQL = '''
+CREATE TABLE audit_log_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('audit_log_id_seq'),
+    user_id INTEGER,
+    action VARCHAR(255),
+    table_name VARCHAR(255),
+    record_id INTEGER,
+    old_values JSONB,
+    new_values JSONB,
+    ip_address INET,
+    user_agent TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at)
+'''
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Помесячное секционирование audit_log (только PostgreSQL): перевод таблицы '
+        'в секционированную и создание секций на месяцы вперёд'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Перевести существующую таблицу в секционированную (копирует строки, '
+                 'блокирует запись в журнал на время копирования)',
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='Сколько будущих месяцев покрыть секциями (по умолчанию 3)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[settings.AUDIT_DATABASE]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование audit_log поддерживается только в PostgreSQL')
+
+        with connection.cursor() as cursor:
+            partitioned = self._is_partitioned(cursor)
+            if not partitioned and not options['convert']:
+                raise CommandError('audit_log не секционирована; запустите команду с --convert')
+
+            with transaction.atomic(using=connection.alias):
+                if not partitioned:
+                    self._convert(cursor)
+                created = self._create_partitions(cursor, options['months_ahead'])
+
+        self.stdout.write(self.style.SUCCESS(f'Секций создано: {created}'))
+
+    @staticmethod
+    def _is_partitioned(cursor):
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c "
+            "WHERE c.relname = 'audit_log' AND pg_table_is_visible(c.oid)"
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise CommandError('Таблица audit_log не найдена; выполните migrate')
+        return row[0] == 'p'
+
+    def _convert(self, cursor):
+        cursor.execute('LOCK TABLE audit_log IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(PARTITIONED_TABLE_SQL)
+        # Секция по умолчанию принимает строки вне созданных месяцев
+        cursor.execute('CREATE TABLE audit_log_default PARTITION OF audit_log_partitioned DEFAULT')
+        cursor.execute('SELECT min(created_at) FROM audit_log')
+        oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            first = oldest.date().replace(day=1)
+            months = 0
+            while _add_months(first, months) <= datetime.date.today().replace(day=1):
+                self._create_partition(cursor, _add_months(first, months), 'audit_log_partitioned')
+                months += 1
+        cursor.execute(
+            'INSERT INTO audit_log_partitioned '
+            'SELECT id, user_id, action, table_name, record_id, old_values, new_values, '
+            'ip_address, user_agent, COALESCE(created_at, CURRENT_TIMESTAMP) FROM audit_log'
+        )
+        # Последовательность остаётся прежней и переходит к новой таблице
+        cursor.execute('ALTER SEQUENCE audit_log_id_seq OWNED BY NONE')
+        cursor.execute('DROP TABLE audit_log')
+        cursor.execute('ALTER TABLE audit_log_partitioned RENAME TO audit_log')
+        cursor.execute('ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id')
+        cursor.execute('CREATE INDEX idx_audit_log_user_id ON audit_log (user_id)')
+        cursor.execute('CREATE INDEX idx_audit_log_created_at ON audit_log (created_at)')
+        self.stdout.write('audit_log переведена в секционированную таблицу')
+
+    def _create_partitions(self, cursor, months_ahead):
+        cursor.execute('CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT')
+        this_month = datetime.date.today().replace(day=1)
+        created = 0
+        for months in range(months_ahead + 1):
+            created += self._create_partition(cursor, _add_months(this_month, months), 'audit_log')
+        return created
+
+    @staticmethod
+    def _create_partition(cursor, month, parent):
+        name = f'audit_log_y{month.year}m{month.month:02d}'
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return 0
+        bounds = [month.isoformat(), _add_months(month, 1).isoformat()]
+        # Строки этого месяца, уже попавшие в DEFAULT, не дадут создать секцию:
+        # переносим их в отдельную таблицу и подключаем её как секцию
+        cursor.execute(f'CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM audit_log_default '
+            f'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            bounds,
+        )
+        cursor.execute(f'ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+        return 1
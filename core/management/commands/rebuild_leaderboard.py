@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг (LeaderboardEntry и гистограмму LeaderboardBucket) по '
+        'отметкам о прохождении. Нужен при первом включении рейтинга и для ремонта — '
+        'в обычной работе рейтинг меняется инкрементально'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = leaderboard.rebuild(options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк рейтинга: {total} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import recount_lesson_counts, recount_task_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики Theme.lesson_count и Lesson.task_count'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            themes = recount_lesson_counts()
+            lessons = recount_task_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: тем {themes}, уроков {lessons}'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import caching
+from core.models import Theme, Lesson, ResearchArticle
+from core.rendering import DEFAULT_BATCH_SIZE, render_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает готовый HTML и выдержки тем, уроков и исследований. Нужен после '
+        'загрузки в обход save() и при изменении правил отрисовки; обновляются только '
+        'изменившиеся записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = []
+        for model in (Theme, Lesson, ResearchArticle):
+            changed = render_rows(model, model.text_field, model.excerpt_length, options['batch_size'])
+            counts.append(f'{model._meta.verbose_name_plural}: {changed}')
+        caching.bump_generation(Theme, Lesson, ResearchArticle)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено записей — {", ".join(counts)} за {elapsed:.1f} с'
+        ))
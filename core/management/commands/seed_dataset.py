@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Theme
+from core.seeding import SEED_PASSWORD, SEED_USERNAME_PREFIX, generate_dataset
+from django.contrib.auth.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует детерминированный синтетический каталог (темы, уроки, задания, '
+        'исследования) и пользователей с прогрессом для нагрузочных проверок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+        parser.add_argument('--themes', type=int, default=2000)
+        parser.add_argument('--lessons-per-theme', type=int, default=100)
+        parser.add_argument('--tasks-per-lesson', type=int, default=2)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--max-completed', type=int, default=400,
+                            help='Максимум пройденных уроков на пользователя')
+        parser.add_argument('--articles', type=int, default=200)
+        parser.add_argument('--content-size', type=int, default=1500,
+                            help='Примерный размер текста урока в символах')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--allow-existing', action='store_true',
+                            help='Не требовать пустой каталог (результат перестаёт быть детерминированным)')
+
+    def handle(self, *args, **options):
+        if not options['allow_existing']:
+            if Theme.objects.exists() or User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).exists():
+                raise CommandError(
+                    'База уже содержит данные. Очистите её (manage.py flush) '
+                    'или запустите с --allow-existing.'
+                )
+        if options['allow_existing'] and User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).exists():
+            raise CommandError('Синтетические пользователи уже созданы, --allow-existing их не перезаписывает.')
+
+        started = time.perf_counter()
+        stats = generate_dataset(
+            seed=options['seed'],
+            themes=options['themes'],
+            lessons_per_theme=options['lessons_per_theme'],
+            tasks_per_lesson=options['tasks_per_lesson'],
+            users=options['users'],
+            max_completed=options['max_completed'],
+            articles=options['articles'],
+            content_size=options['content_size'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {elapsed:.1f} с: тем {stats.themes}, уроков {stats.lessons}, '
+            f'заданий {stats.tasks}, исследований {stats.articles}, '
+            f'пользователей {stats.users}, отметок о прохождении {stats.completions}.'
+        ))
+        self.stdout.write(f'Пароль синтетических пользователей: {SEED_PASSWORD}')
@@ -0,0 +1,125 @@
+import http.client
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+CONFIG_MODULE = 'serve_ready.gunicorn_config'
+APPLICATIONS = {
+    False: 'serve_ready.wsgi:application',
+    True: 'serve_ready.asgi:application',
+}
+READY_TIMEOUT = 60
+# Параметры командной строки -> переменные окружения serve_ready/gunicorn_config.py
+ENV_OPTIONS = {
+    'bind': 'GUNICORN_BIND',
+    'workers': 'GUNICORN_WORKERS',
+    'threads': 'GUNICORN_THREADS',
+    'max_requests': 'GUNICORN_MAX_REQUESTS',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает gunicorn с настройками serve_ready/gunicorn_config.py: воркеры и потоки '
+        'по числу процессоров, preload_app с прогревом (шаблоны, URL, кеш каталога, '
+        'соединения с базой), перезапуск воркеров со случайным разбросом. --measure '
+        'замеряет холодный старт и задержку первого запроса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', help='Адрес, по умолчанию GUNICORN_BIND или 0.0.0.0:8000')
+        parser.add_argument('--workers', type=int, help='Воркеров (по умолчанию — по числу CPU)')
+        parser.add_argument('--threads', type=int, help='Потоков на воркер (больше 1 — gthread)')
+        parser.add_argument('--max-requests', type=int, help='Запросов до перезапуска воркера')
+        parser.add_argument('--asgi', action='store_true', help='serve_ready.asgi и воркеры uvicorn')
+        parser.add_argument('--no-warmup', action='store_true', help='Без прогрева (для сравнения)')
+        parser.add_argument('--print-config', action='store_true',
+                            help='Показать итоговые настройки и выйти')
+        parser.add_argument('--measure', action='store_true',
+                            help='Запустить, замерить холодный старт и первые запросы, остановить')
+        parser.add_argument('--path', default='/', help='URL для --measure')
+        parser.add_argument('--requests', type=int, default=20, help='Запросов после первого для --measure')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        for option, variable in ENV_OPTIONS.items():
+            if options[option] is not None:
+                env[variable] = str(options[option])
+        if options['asgi']:
+            env['ASGI_MODE'] = 'True'
+        if options['no_warmup']:
+            env['GUNICORN_WARMUP'] = 'False'
+        command = [sys.executable, '-m', 'gunicorn', '-c', f'python:{CONFIG_MODULE}',
+                   APPLICATIONS[options['asgi']]]
+
+        if options['print_config']:
+            return self._print_config(env)
+        if options['measure']:
+            return self._measure(command, env, options['path'], options['requests'])
+        self.stdout.write(' '.join(command[2:]))
+        self.stdout.flush()
+        # exec: gunicorn получает сигналы контейнера напрямую (PID 1)
+        os.chdir(settings.BASE_DIR)
+        os.execvpe(command[0], command, env)
+
+    def _print_config(self, env):
+        saved = dict(os.environ)
+        os.environ.update(env)
+        try:
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, *CONFIG_MODULE.split('.')) + '.py')
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+        self.stdout.write(f'Процессоров: {config["cpu_count"]()}')
+        for name in ('bind', 'workers', 'threads', 'worker_class', 'preload_app',
+                     'max_requests', 'max_requests_jitter', 'timeout', 'WARMUP'):
+            self.stdout.write(f'{name} = {config[name]}')
+
+    def _measure(self, command, env, path, requests):
+        bind = env.get('GUNICORN_BIND', '127.0.0.1:8795')
+        env['GUNICORN_BIND'] = bind
+        host, port = bind.rsplit(':', 1)
+        host = '127.0.0.1' if host in ('', '0.0.0.0') else host
+        started = time.monotonic()
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            first, status = self._first_response(server, host, int(port), path, started)
+            cold_start = time.monotonic() - started
+            latencies = [self._request(host, int(port), path)[0] for _ in range(requests)]
+        finally:
+            server.terminate()
+            server.wait(30)
+        self.stdout.write(self.style.SUCCESS(
+            f'Холодный старт до первого ответа ({status}): {cold_start * 1000:.0f} мс, '
+            f'первый запрос {first * 1000:.1f} мс, '
+            f'медиана следующих {statistics.median(latencies) * 1000 if latencies else 0:.1f} мс'
+        ))
+
+    def _first_response(self, server, host, port, path, started):
+        """Повторять запрос, пока сервер не ответит; вернуть (задержку ответа, код)."""
+        while time.monotonic() - started < READY_TIMEOUT:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn завершился с кодом {server.returncode}')
+            try:
+                return self._request(host, port, path)
+            except OSError:
+                time.sleep(0.05)
+        raise CommandError(f'Сервер не ответил за {READY_TIMEOUT} с')
+
+    @staticmethod
+    def _request(host, port, path):
+        connection = http.client.HTTPConnection(host, port, timeout=READY_TIMEOUT)
+        try:
+            request_started = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            return time.perf_counter() - request_started, response.status
+        finally:
+            connection.close()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.search import refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковые векторы тем, уроков, заданий и исследований (только PostgreSQL)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Поисковые векторы используются только в PostgreSQL — пересчитывать нечего.'
+            ))
+            return
+        updated = refresh_search_vectors()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено записей: {updated}'))
@@ -0,0 +1,194 @@
+"""
+Метрики производительности запросов.
+
+Счётчики текущего запроса (SQL, шаблоны, кеш) лежат в contextvar и
+заполняются обёртками: ``connection.execute_wrapper`` для SQL, шаблонный
+бэкенд core.template_backends для рендеринга и ``record_cache`` в слоях кеша
+(core/caching.py, core/progress.py). По окончании запроса
+(core/middleware.py) итоги попадают в гистограммы и счётчики процесса с
+меткой ``view`` — имя URL из urls.py.
+
+Агрегаты живут в памяти процесса: у каждого воркера gunicorn свои значения,
+Prometheus суммирует их по экземплярам. Отдаются в текстовом формате
+Prometheus на ``/metrics`` (core/views.py).
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'serve_ready'
+
+# Границы корзин гистограммы длительности запроса, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин числа SQL-запросов на страницу
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+    __slots__ = ('started', 'sql_count', 'sql_time', 'template_time', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def current():
+    """Счётчики текущего запроса или None, если запрос не попал в выборку."""
+    return _current.get()
+
+
+@contextmanager
+def collecting(request_metrics):
+    token = _current.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        _current.reset(token)
+
+
+def record_cache(hit):
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return
+    if hit:
+        request_metrics.cache_hits += 1
+    else:
+        request_metrics.cache_misses += 1
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Обёртка для ``connection.execute_wrapper``: время и число запросов."""
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.sql_count += 1
+        request_metrics.sql_time += time.perf_counter() - started
+
+
+# --- Агрегаты процесса ---
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            yield bound, running
+
+
+class Registry:
+    """Метрики процесса по имени view; обновляются под блокировкой."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)  # (view, класс статуса) -> число
+            self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+            self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.sql_seconds = defaultdict(float)
+            self.template_seconds = defaultdict(float)
+            self.cache = defaultdict(int)  # (view, 'hit' | 'miss') -> число
+
+    def observe(self, view, status, duration, request_metrics=None):
+        status_class = f'{status // 100}xx'
+        with self._lock:
+            self.requests[view, status_class] += 1
+            if request_metrics is None:
+                return
+            self.durations[view].observe(duration)
+            self.query_counts[view].observe(request_metrics.sql_count)
+            self.sql_seconds[view] += request_metrics.sql_time
+            self.template_seconds[view] += request_metrics.template_time
+            self.cache[view, 'hit'] += request_metrics.cache_hits
+            self.cache[view, 'miss'] += request_metrics.cache_misses
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus (version 0.0.4)."""
+        with self._lock:
+            lines = []
+            _counter(lines, 'requests_total', 'Запросы по view и классу статуса (все, без выборки)',
+                     {(('view', view), ('status', status)): value
+                      for (view, status), value in self.requests.items()})
+            _histogram(lines, 'request_duration_seconds',
+                       'Длительность обработки запроса (запросы из выборки)', self.durations)
+            _histogram(lines, 'sql_queries_per_request', 'SQL-запросов на запрос', self.query_counts)
+            _counter(lines, 'sql_duration_seconds_total', 'Суммарное время SQL',
+                     {(('view', view),): value for view, value in self.sql_seconds.items()})
+            _counter(lines, 'template_render_seconds_total', 'Суммарное время рендеринга шаблонов',
+                     {(('view', view),): value for view, value in self.template_seconds.items()})
+            _counter(lines, 'cache_requests_total', 'Обращения к кешу приложения',
+                     {(('view', view), ('result', result)): value
+                      for (view, result), value in self.cache.items()})
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _counter(lines, name, help_text, samples):
+    name = f'{METRIC_PREFIX}_{name}'
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(samples.items()):
+        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+
+def _histogram(lines, name, help_text, histograms):
+    name = f'{METRIC_PREFIX}_{name}'
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for view, histogram in sorted(histograms.items()):
+        for bound, running in histogram.cumulative():
+            lines.append(f'{name}_bucket{_labels((("view", view), ("le", _number(float(bound)))))} {running}')
+        lines.append(f'{name}_bucket{_labels((("view", view), ("le", "+Inf")))} {histogram.count}')
+        lines.append(f'{name}_sum{_labels((("view", view),))} {_number(histogram.total)}')
+        lines.append(f'{name}_count{_labels((("view", view),))} {histogram.count}')
+
+
+REGISTRY = Registry()
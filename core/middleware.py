@@ -0,0 +1,259 @@
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import audit, db_router, metrics
+
+try:
+    import brotli
+except ImportError:  # без пакета Brotli ответы сжимаются только gzip
+    brotli = None
+
+
+class PerformanceMiddleware:
+    """
+    Замер запроса: общее время, SQL (число и время), рендеринг шаблонов и
+    обращения к кешу. Итоги уходят в заголовок ``Server-Timing`` и в метрики
+    процесса (core/metrics.py).
+
+    Подробный замер делается для доли запросов ``METRICS_SAMPLE_RATE``;
+    остальные только считаются в ``requests_total`` — это два вызова
+    perf_counter и одна блокировка. Ставится в начало MIDDLEWARE, чтобы
+    учитывать запросы сессии и аутентификации. Работает и под ASGI, не
+    заставляя Django переключать цепочку в синхронный режим.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        if not self._sampled():
+            started = time.perf_counter()
+            response = self.get_response(request)
+            metrics.REGISTRY.observe(
+                self._view_name(request), response.status_code, time.perf_counter() - started
+            )
+            return response
+
+        request_metrics = metrics.RequestMetrics()
+        with ExitStack() as stack:
+            stack.enter_context(metrics.collecting(request_metrics))
+            self._wrap_connections(stack)
+            response = self.get_response(request)
+        return self._finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        if not self._sampled():
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            metrics.REGISTRY.observe(
+                self._view_name(request), response.status_code, time.perf_counter() - started
+            )
+            return response
+
+        request_metrics = metrics.RequestMetrics()
+        with metrics.collecting(request_metrics):
+            # Асинхронный ORM выполняет запросы в потоке sync_to_async со своими
+            # соединениями — обёртки ставятся на них, в том же потоке
+            stack = ExitStack()
+            await sync_to_async(self._wrap_connections)(stack)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self._finish(request, response, request_metrics)
+
+    @staticmethod
+    def _sampled():
+        sample_rate = settings.METRICS_SAMPLE_RATE
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    @staticmethod
+    def _wrap_connections(stack):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.sql_wrapper))
+
+    def _finish(self, request, response, request_metrics):
+        duration = request_metrics.elapsed()
+        metrics.REGISTRY.observe(
+            self._view_name(request), response.status_code, duration, request_metrics
+        )
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = self._server_timing(request_metrics, duration)
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or 'unnamed'
+
+    @staticmethod
+    def _server_timing(request_metrics, duration):
+        return ', '.join((
+            f'total;dur={duration * 1000:.1f}',
+            f'sql;dur={request_metrics.sql_time * 1000:.1f};desc="{request_metrics.sql_count} queries"',
+            f'tpl;dur={request_metrics.template_time * 1000:.1f}',
+            f'cache;desc="hit={request_metrics.cache_hits} miss={request_metrics.cache_misses}"',
+        ))
+
+
+class AuditContextMiddleware:
+    """
+    Делает текущий запрос доступным журналу аудита (core/audit.py): события
+    из сигналов получают пользователя, IP и User-Agent. Ставится после
+    AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = audit.bind_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.unbind_request(token)
+
+    async def __acall__(self, request):
+        # Контекст копируется в потоки sync_to_async — сигналы увидят запрос
+        token = audit.bind_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            audit.unbind_request(token)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Чтение каталога с реплик и прилипание к основной базе после записи
+    (core/db_router.py). Ставится перед SessionMiddleware, чтобы учитывать и
+    запись сессии.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = db_router.begin_request(request)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.end_request(token, response)
+        return response
+
+    async def __acall__(self, request):
+        # Состояние общее для потоков sync_to_async: контекст копируется со ссылкой на него
+        token = db_router.begin_request(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.end_request(token, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        db_router.enable_replica_reads(view_func)
+
+
+# «br;q=0» в Accept-Encoding — кодировка явно запрещена
+_REFUSED = re.compile(r'q=0(\.0*)?$')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие текстовых ответов: brotli, если клиент его принимает, иначе gzip.
+
+    Защита от BREACH: brotli (без случайной добавки к длине) применяется
+    только к ответам без секретов — анониму и без CSRF-токена в форме. Ответы
+    вошедшему пользователю и страницы с {% csrf_token %} сжимаются gzip
+    Django 4.2 со случайной длиной заголовка (``max_random_bytes``), а сам
+    токен Django и так маскирует заново при каждом рендеринге. Файлы
+    (FileResponse: скачивание заданий с Range и контрольной суммой) и
+    уже сжатые форматы не трогаются.
+
+    Ставится выше всех middleware, меняющих тело ответа.
+    """
+    COMPRESSIBLE_TYPES = (
+        'text/', 'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml',
+    )
+    MIN_LENGTH = 200
+
+    def process_response(self, request, response):
+        if isinstance(response, FileResponse) or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(self.COMPRESSIBLE_TYPES):
+            return response
+        if response.streaming or brotli is None or self._has_secrets(request, response):
+            return super().process_response(request, response)
+        if len(response.content) < self.MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not self._accepts_brotli(request):
+            return super().process_response(request, response)
+        compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def _accepts_brotli(request):
+        for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() == 'br':
+                return not _REFUSED.match(params.strip())
+        return False
+
+    @staticmethod
+    def _has_secrets(request, response):
+        # Пользователь, которого ответ не загружал (AuthenticationMiddleware
+        # кеширует его в _cached_user), в ответ попасть не мог — и лишних
+        # запросов сессии ради сжатия не делаем
+        user = getattr(request, '_cached_user', None)
+        if user is not None and user.is_authenticated:
+            return True
+        return b'csrfmiddlewaretoken' in response.content
@@ -0,0 +1,23 @@
+"""
+Операции миграций, которые имеют смысл только в PostgreSQL.
+
+Состояние моделей меняется на любой СУБД, а SQL выполняется только на
+PostgreSQL: так одна и та же история миграций применяется и к боевой базе,
+и к SQLite, на которой гоняются тесты.
+"""
+from django.db import migrations
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """AddIndex для индексов, специфичных для PostgreSQL (GIN, opclasses и т.п.)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return super().describe() + ' (PostgreSQL only)'
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-17 01:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(model, fk_name):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Theme = apps.get_model('core', 'Theme')
+    Lesson = apps.get_model('core', 'Lesson')
+    Task = apps.get_model('core', 'Task')
+    Theme.objects.update(lesson_count=_count_subquery(Lesson, 'theme'))
+    Lesson.objects.update(task_count=_count_subquery(Task, 'lesson'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество заданий'),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество уроков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_lesson_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['theme', 'order', 'created_at', 'id'], name='core_lesson_theme_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='researcharticle',
+            index=models.Index(fields=['is_published', '-created_at', '-id'], name='core_research_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theme',
+            index=models.Index(fields=['order', 'created_at', 'id'], name='core_theme_order_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2 on 2026-10-17 01:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+from core.migration_operations import PostgresOnlyAddIndex
+
+SEARCH_CONFIG = 'russian'
+
+# Поля поискового вектора: (модель, заголовок с весом A, текст с весом B)
+SEARCH_FIELDS = [
+    ('Theme', 'title', 'description'),
+    ('Lesson', 'title', 'content'),
+    ('Task', 'title', 'description'),
+    ('ResearchArticle', 'title', 'content'),
+]
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, title_field, body_field in SEARCH_FIELDS:
+        apps.get_model('core', model_name).objects.update(
+            search_vector=(
+                SearchVector(title_field, weight='A', config=SEARCH_CONFIG)
+                + SearchVector(body_field, weight='B', config=SEARCH_CONFIG)
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='lesson',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='researcharticle',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='lesson',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_lesson_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='lesson',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_lesson_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='researcharticle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_research_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='researcharticle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_research_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_task_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_task_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='theme',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_theme_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='theme',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_theme_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='file_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='SHA-256 файла'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Размер файла'),
+        ),
+    ]
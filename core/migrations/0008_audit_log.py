@@ -0,0 +1,70 @@
+# Generated by Django 4.2 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+# Та же схема, что в postgres/init.sql: если скрипт уже создал таблицу, она не меняется
+POSTGRES_SQL = '''
+CREATE TABLE IF NOT EXISTS audit_log (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    action VARCHAR(255),
+    table_name VARCHAR(255),
+    record_id INTEGER,
+    old_values JSONB,
+    new_values JSONB,
+    ip_address INET,
+    user_agent TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_audit_log_user_id ON audit_log(user_id);
+CREATE INDEX IF NOT EXISTS idx_audit_log_created_at ON audit_log(created_at);
+'''
+
+
+def create_audit_log_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SQL)
+        return
+    if 'audit_log' in connection.introspection.table_names():
+        return
+    AuditLog = apps.get_model('core', 'AuditLog')
+    # Модель неуправляемая — create_model всё равно строит таблицу по её полям
+    schema_editor.create_model(AuditLog)
+    for field_name in ('user_id', 'created_at'):
+        schema_editor.execute(
+            f'CREATE INDEX idx_audit_log_{field_name} ON audit_log ({field_name})'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_task_file_checksum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('action', models.CharField(blank=True, max_length=255, null=True)),
+                ('table_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('record_id', models.IntegerField(blank=True, null=True)),
+                ('old_values', models.JSONField(blank=True, null=True)),
+                ('new_values', models.JSONField(blank=True, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Запись аудита',
+                'verbose_name_plural': 'Журнал аудита',
+                'db_table': 'audit_log',
+                'managed': False,
+            },
+        ),
+        # Таблицу не удаляем при откате: в PostgreSQL её мог создать init.sql
+        migrations.RunPython(create_audit_log_table, migrations.RunPython.noop),
+    ]
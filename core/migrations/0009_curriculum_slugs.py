@@ -0,0 +1,72 @@
+# Generated by Django 4.2 on 2026-10-17 02:14
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+BATCH_SIZE = 2000
+
+
+def _fill_slugs(model, scope_field):
+    # Записи обходятся по родителю; занятые слаги помнятся только для текущего
+    used = set()
+    scope = object()
+    batch = []
+    fields = [scope_field] if scope_field else []
+    rows = model.objects.order_by(*fields, 'pk').only('pk', 'title', *fields)
+    for obj in rows.iterator(BATCH_SIZE):
+        if scope_field and getattr(obj, scope_field) != scope:
+            scope = getattr(obj, scope_field)
+            used = set()
+        base = slugify(obj.title, allow_unicode=True)[:200].strip('-') or model._meta.model_name
+        slug, number = base, 1
+        while slug in used:
+            number += 1
+            slug = f'{base}-{number}'
+        used.add(slug)
+        obj.slug = slug
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, ['slug'])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['slug'])
+
+
+def fill_slugs(apps, schema_editor):
+    _fill_slugs(apps.get_model('core', 'Theme'), None)
+    _fill_slugs(apps.get_model('core', 'Lesson'), 'theme_id')
+    _fill_slugs(apps.get_model('core', 'Task'), 'lesson_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_audit_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, db_index=False, editable=False, max_length=220, null=True, verbose_name='Слаг'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, db_index=False, editable=False, max_length=220, null=True, verbose_name='Слаг'),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, editable=False, max_length=220, null=True, unique=True, verbose_name='Слаг'),
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('theme', 'slug'), name='core_lesson_theme_slug_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('lesson', 'slug'), name='core_task_lesson_slug_uniq'),
+        ),
+    ]
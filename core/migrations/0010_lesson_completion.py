@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-17 02:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    """
+    Автоматическая промежуточная таблица completed_lessons становится моделью
+    LessonCompletion без пересоздания: меняется только состояние миграций,
+    в базу добавляется одна колонка. У существующих отметок completed_at
+    остаётся NULL — время их прохождения неизвестно.
+    """
+
+    dependencies = [
+        ('core', '0009_curriculum_slugs'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='LessonCompletion',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='core.lesson')),
+                        ('userprofile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='core.userprofile')),
+                    ],
+                    options={
+                        'verbose_name': 'Пройденный урок',
+                        'verbose_name_plural': 'Пройденные уроки',
+                        'db_table': 'core_userprofile_completed_lessons',
+                        'unique_together': {('userprofile', 'lesson')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='userprofile',
+                    name='completed_lessons',
+                    field=models.ManyToManyField(blank=True, through='core.LessonCompletion', to='core.lesson', verbose_name='Пройденные уроки'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lessoncompletion',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Пройден'),
+        ),
+        # Значение по умолчанию — только для новых отметок
+        migrations.AlterField(
+            model_name='lessoncompletion',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=django.utils.timezone.now, null=True, verbose_name='Пройден'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-17 02:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lesson_completion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=220, unique=True, verbose_name='Слаг')),
+                ('title', models.CharField(max_length=200, verbose_name='Название')),
+                ('description', models.TextField(blank=True, verbose_name='Описание')),
+                ('rule', models.CharField(choices=[('manual', 'Выдаётся вручную'), ('theme_completed', 'Пройдены все уроки темы'), ('lessons_completed', 'Пройдено N уроков'), ('lessons_in_days', 'N уроков за D дней')], default='manual', max_length=32, verbose_name='Правило')),
+                ('lesson_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='Уроков (N)')),
+                ('days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Дней (D)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Выдаётся')),
+            ],
+            options={
+                'verbose_name': 'Достижение',
+                'verbose_name_plural': 'Достижения',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAchievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('awarded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Получено')),
+            ],
+            options={
+                'verbose_name': 'Полученное достижение',
+                'verbose_name_plural': 'Полученные достижения',
+            },
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='achievements',
+            field=models.TextField(blank=True, verbose_name='Достижения (текст, устарело)'),
+        ),
+        migrations.AddIndex(
+            model_name='lessoncompletion',
+            index=models.Index(fields=['userprofile', 'completed_at'], name='core_completion_user_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='userachievement',
+            name='achievement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='awards', to='core.achievement', verbose_name='Достижение'),
+        ),
+        migrations.AddField(
+            model_name='userachievement',
+            name='userprofile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_achievements', to='core.userprofile', verbose_name='Профиль'),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='theme',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to='core.theme', verbose_name='Тема'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userachievement',
+            unique_together={('userprofile', 'achievement')},
+        ),
+    ]
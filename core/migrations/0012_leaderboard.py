@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 02:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_achievements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.PositiveBigIntegerField()),
+                ('score', models.PositiveIntegerField()),
+                ('users', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.PositiveBigIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('userprofile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='core.userprofile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardbucket',
+            constraint=models.UniqueConstraint(fields=('scope', 'score'), name='core_leaderboard_bucket_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['scope', '-score', 'userprofile'], name='core_leaderboard_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('scope', 'userprofile'), name='core_leaderboard_entry_uniq'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+from core.rendering import render_rows
+
+# (модель, текстовое поле, длина выдержки) — как в RenderedTextMixin моделей
+RENDERED_FIELDS = [
+    ('Theme', 'description', 150),
+    ('Lesson', 'content', 200),
+    ('ResearchArticle', 'content', 300),
+]
+
+
+def fill_rendered_text(apps, schema_editor):
+    # Тем же кодом, что и команда render_content: пакетами, без загрузки таблиц целиком
+    for model_name, text_field, excerpt_length in RENDERED_FIELDS:
+        render_rows(apps.get_model('core', model_name), text_field, excerpt_length)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='researcharticle',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='researcharticle',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
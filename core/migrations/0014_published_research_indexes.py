@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_rendered_text'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='researcharticle',
+            name='core_research_published_idx',
+        ),
+        migrations.AddIndex(
+            model_name='researcharticle',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at', '-id'], name='core_research_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='researcharticle',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['updated_at'], name='core_research_updated_idx'),
+        ),
+    ]
@@ -1,18 +1,103 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
+from django.utils import timezone
 
-class Theme(models.Model):
+from . import rendering
+
+
+class CounterFieldsMixin:
+    """
+    Не даёт save() перезаписать денормализованные счётчики устаревшими
+    значениями: при обновлении существующей записи поля из ``counter_fields``
+    исключаются из UPDATE, их меняют только F()-выражения в сигналах.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class RenderedTextMixin:
+    """
+    Хранит HTML текстового поля ``text_field`` (поле ``<text_field>_html``) и
+    выдержку без разметки (``excerpt``) — см. core/rendering.py. Оба поля
+    пересчитываются в save(), если текст загружен и сохраняется.
+    """
+    text_field = 'content'
+    excerpt_length = 200
+
+    @classmethod
+    def rendered_fields(cls):
+        return (f'{cls.text_field}_html', 'excerpt')
+
+    @classmethod
+    def listing_deferred_fields(cls):
+        """Поля, которые спискам не нужны: полный текст, его HTML и поисковый вектор."""
+        return (cls.text_field, f'{cls.text_field}_html', 'search_vector')
+
+    def render_text(self):
+        text = getattr(self, self.text_field)
+        html_field, excerpt_field = self.rendered_fields()
+        setattr(self, html_field, rendering.to_html(text))
+        setattr(self, excerpt_field, rendering.to_excerpt(text, self.excerpt_length))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.text_field not in self.get_deferred_fields() and (
+            update_fields is None or self.text_field in update_fields
+        ):
+            self.render_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.rendered_fields()}
+        super().save(*args, **kwargs)
+
+
+class Theme(RenderedTextMixin, CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200, verbose_name="Название темы")
+    # Естественный ключ для импорта/экспорта каталога (см. core/curriculum.py)
+    slug = models.SlugField(max_length=220, unique=True, null=True, blank=True, allow_unicode=True,
+                            editable=False, verbose_name="Слаг")
     description = models.TextField(verbose_name="Описание")
+    # Заполняются при сохранении из description (см. RenderedTextMixin)
+    description_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=150, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Меняется и при изменении lesson_count (см. core/counters.py) — основа ETag
+    updated_at = models.DateTimeField(auto_now=True)
     order = models.IntegerField(default=0, verbose_name="Порядок")
     image = models.ImageField(upload_to='themes/', blank=True, null=True, verbose_name="Изображение")
+    # Уменьшенные копии изображения, создаются фоновой задачей (см. core/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Денормализованный счётчик, поддерживается сигналами (см. core/signals.py)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество уроков")
+    # Поисковый вектор заполняется в PostgreSQL (см. core/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    text_field = 'description'
+    excerpt_length = 150
+    counter_fields = ('lesson_count',)
     
     class Meta:
         verbose_name = "Тема"
         verbose_name_plural = "Темы"
         ordering = ['order', 'created_at']
+        indexes = [
+            # Ключ курсорной пагинации списка тем
+            models.Index(fields=['order', 'created_at', 'id'], name='core_theme_order_idx'),
+            # Полнотекстовый поиск и нечёткое совпадение по названию (только PostgreSQL)
+            GinIndex(fields=['search_vector'], name='core_theme_search_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='core_theme_title_trgm_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -20,18 +105,39 @@ class Theme(models.Model):
     def get_absolute_url(self):
         return reverse('theme_detail', kwargs={'pk': self.pk})
 
-class Lesson(models.Model):
+class Lesson(RenderedTextMixin, CounterFieldsMixin, models.Model):
     theme = models.ForeignKey(Theme, on_delete=models.CASCADE, related_name='lessons', verbose_name="Тема")
     title = models.CharField(max_length=200, verbose_name="Название урока")
+    # Уникален внутри темы
+    slug = models.SlugField(max_length=220, null=True, blank=True, allow_unicode=True,
+                            db_index=False, editable=False, verbose_name="Слаг")
     content = models.TextField(verbose_name="Содержание урока")
+    # Заполняются при сохранении из content (см. RenderedTextMixin)
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, blank=True, editable=False)
     video_url = models.URLField(blank=True, null=True, verbose_name="Ссылка на видео")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     order = models.IntegerField(default=0, verbose_name="Порядок")
+    # Денормализованный счётчик, поддерживается сигналами (см. core/signals.py)
+    task_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество заданий")
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    counter_fields = ('task_count',)
     
     class Meta:
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
         ordering = ['order', 'created_at']
+        indexes = [
+            # Ключ курсорной пагинации уроков внутри темы
+            models.Index(fields=['theme', 'order', 'created_at', 'id'], name='core_lesson_theme_order_idx'),
+            GinIndex(fields=['search_vector'], name='core_lesson_search_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='core_lesson_title_trgm_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['theme', 'slug'], name='core_lesson_theme_slug_uniq'),
+        ]
     
     def __str__(self):
         return self.title
@@ -39,13 +145,28 @@ class Lesson(models.Model):
 class Task(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='tasks', verbose_name="Урок")
     title = models.CharField(max_length=200, verbose_name="Название задания")
+    # Уникален внутри урока
+    slug = models.SlugField(max_length=220, null=True, blank=True, allow_unicode=True,
+                            db_index=False, editable=False, verbose_name="Слаг")
     description = models.TextField(verbose_name="Описание задания")
     file = models.FileField(upload_to='tasks/', blank=True, null=True, verbose_name="Файл задания")
+    # Считаются один раз при загрузке файла (см. core/signals.py), ETag скачивания
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name="Размер файла")
+    file_sha256 = models.CharField(max_length=64, blank=True, editable=False, verbose_name="SHA-256 файла")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         verbose_name = "Задание"
         verbose_name_plural = "Задания"
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_task_search_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='core_task_title_trgm_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['lesson', 'slug'], name='core_task_lesson_slug_uniq'),
+        ]
     
     def __str__(self):
         return self.title
@@ -55,8 +176,12 @@ class UserProfile(models.Model):
     birth_date = models.DateField(blank=True, null=True, verbose_name="Дата рождения")
     phone = models.CharField(max_length=20, blank=True, verbose_name="Телефон")
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, verbose_name="Аватар")
-    completed_lessons = models.ManyToManyField(Lesson, blank=True, verbose_name="Пройденные уроки")
-    achievements = models.TextField(blank=True, verbose_name="Достижения")
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
+    completed_lessons = models.ManyToManyField(Lesson, blank=True, through='LessonCompletion',
+                                               verbose_name="Пройденные уроки")
+    # Устаревшее текстовое поле; достижения теперь — UserAchievement,
+    # старые значения переносит команда backfill_achievements
+    achievements = models.TextField(blank=True, verbose_name="Достижения (текст, устарело)")
     
     class Meta:
         verbose_name = "Профиль пользователя"
@@ -65,16 +190,185 @@ class UserProfile(models.Model):
     def __str__(self):
         return self.user.username
 
-class ResearchArticle(models.Model):
+class LessonCompletion(models.Model):
+    """
+    Отметка о прохождении урока — промежуточная таблица
+    UserProfile.completed_lessons. Таблица прежняя, автоматическая; к ней
+    добавлено время отметки для фильтров ведомости (core/gradebook.py).
+    """
+    userprofile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='completions')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='completions')
+    # У отметок, поставленных до появления поля, время неизвестно
+    completed_at = models.DateTimeField(default=timezone.now, null=True, blank=True, db_index=True,
+                                        verbose_name="Пройден")
+
+    class Meta:
+        db_table = 'core_userprofile_completed_lessons'
+        unique_together = [('userprofile', 'lesson')]
+        indexes = [
+            # Правило «N уроков за D дней» (core/achievements.py)
+            models.Index(fields=['userprofile', 'completed_at'], name='core_completion_user_time_idx'),
+        ]
+        verbose_name = "Пройденный урок"
+        verbose_name_plural = "Пройденные уроки"
+
+    def __str__(self):
+        return f'{self.userprofile_id} → {self.lesson_id}'
+
+class Achievement(models.Model):
+    """
+    Достижение и правило, по которому оно выдаётся автоматически
+    (core/achievements.py). ``manual`` выдаются только вручную — к ним же
+    относятся перенесённые из старого текстового поля профиля.
+    """
+    MANUAL = 'manual'
+    THEME_COMPLETED = 'theme_completed'
+    LESSONS_COMPLETED = 'lessons_completed'
+    LESSONS_IN_DAYS = 'lessons_in_days'
+    RULE_CHOICES = [
+        (MANUAL, 'Выдаётся вручную'),
+        (THEME_COMPLETED, 'Пройдены все уроки темы'),
+        (LESSONS_COMPLETED, 'Пройдено N уроков'),
+        (LESSONS_IN_DAYS, 'N уроков за D дней'),
+    ]
+
+    slug = models.SlugField(max_length=220, unique=True, allow_unicode=True, verbose_name="Слаг")
+    title = models.CharField(max_length=200, verbose_name="Название")
+    description = models.TextField(blank=True, verbose_name="Описание")
+    rule = models.CharField(max_length=32, choices=RULE_CHOICES, default=MANUAL, verbose_name="Правило")
+    theme = models.ForeignKey(Theme, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='achievements', verbose_name="Тема")
+    lesson_count = models.PositiveIntegerField(null=True, blank=True, verbose_name="Уроков (N)")
+    days = models.PositiveIntegerField(null=True, blank=True, verbose_name="Дней (D)")
+    is_active = models.BooleanField(default=True, verbose_name="Выдаётся")
+
+    class Meta:
+        verbose_name = "Достижение"
+        verbose_name_plural = "Достижения"
+
+    def __str__(self):
+        return self.title
+
+    def clean(self):
+        required = {
+            self.THEME_COMPLETED: ('theme',),
+            self.LESSONS_COMPLETED: ('lesson_count',),
+            self.LESSONS_IN_DAYS: ('lesson_count', 'days'),
+        }.get(self.rule, ())
+        errors = {
+            field: 'Обязательно для выбранного правила'
+            for field in required if getattr(self, field) in (None, 0)
+        }
+        if errors:
+            raise ValidationError(errors)
+
+
+class UserAchievement(models.Model):
+    userprofile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='user_achievements',
+                                    verbose_name="Профиль")
+    achievement = models.ForeignKey(Achievement, on_delete=models.CASCADE, related_name='awards',
+                                    verbose_name="Достижение")
+    awarded_at = models.DateTimeField(default=timezone.now, verbose_name="Получено")
+
+    class Meta:
+        verbose_name = "Полученное достижение"
+        verbose_name_plural = "Полученные достижения"
+        unique_together = [('userprofile', 'achievement')]
+
+    def __str__(self):
+        return self.achievement.title
+
+class LeaderboardEntry(models.Model):
+    """
+    Очки пользователя в рейтинге (core/leaderboard.py): ``scope`` 0 — общий
+    рейтинг, иначе id темы. Поддерживается инкрементально, а не пересчитывается.
+    """
+    OVERALL = 0
+
+    userprofile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    scope = models.PositiveBigIntegerField(default=OVERALL)
+    score = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'userprofile'], name='core_leaderboard_entry_uniq'),
+        ]
+        indexes = [
+            # Первые N рейтинга — чтение начала индекса
+            models.Index(fields=['scope', '-score', 'userprofile'], name='core_leaderboard_top_idx'),
+        ]
+
+
+class LeaderboardBucket(models.Model):
+    """
+    Сколько пользователей рейтинга ``scope`` набрали ровно ``score`` очков.
+    Место пользователя — 1 + сумма по корзинам с большим счётом; корзин не
+    больше, чем уроков, и их число не зависит от числа пользователей.
+    """
+    scope = models.PositiveBigIntegerField()
+    score = models.PositiveIntegerField()
+    users = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'score'], name='core_leaderboard_bucket_uniq'),
+        ]
+
+class ResearchArticle(RenderedTextMixin, models.Model):
     title = models.CharField(max_length=300, verbose_name="Заголовок исследования")
     content = models.TextField(verbose_name="Содержание")
+    # Заполняются при сохранении из content (см. RenderedTextMixin)
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=300, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=True, verbose_name="Опубликовано")
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    excerpt_length = 300
     
     class Meta:
         verbose_name = "Исследование"
         verbose_name_plural = "Исследования"
+        indexes = [
+            # Частичные индексы опубликованных исследований (advise_indexes): фильтр
+            # Django пишет как WHERE "is_published" без сравнения, и по составному
+            # индексу с is_published впереди SQLite не ищет. Ключ курсорной
+            # пагинации (новые сверху) и свежесть списка для условных запросов
+            models.Index(fields=['-created_at', '-id'], name='core_research_published_idx',
+                         condition=models.Q(is_published=True)),
+            models.Index(fields=['updated_at'], name='core_research_updated_idx',
+                         condition=models.Q(is_published=True)),
+            GinIndex(fields=['search_vector'], name='core_research_search_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='core_research_title_trgm_idx'),
+        ]
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class AuditLog(models.Model):
+    """
+    Журнал аудита. Таблица ``audit_log`` описана в postgres/init.sql и
+    создаётся миграцией, если её ещё нет; в PostgreSQL может быть
+    секционирована по месяцам (команда partition_audit_log), поэтому
+    Django ею не управляет. Пишется пакетами из core/audit.py.
+    """
+    id = models.AutoField(primary_key=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    action = models.CharField(max_length=255, null=True, blank=True)
+    table_name = models.CharField(max_length=255, null=True, blank=True)
+    record_id = models.IntegerField(null=True, blank=True)
+    old_values = models.JSONField(null=True, blank=True)
+    new_values = models.JSONField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = 'audit_log'
+        verbose_name = "Запись аудита"
+        verbose_name_plural = "Журнал аудита"
+
+    def __str__(self):
+        return f'{self.action} {self.table_name}#{self.record_id}'
@@ -0,0 +1,147 @@
+"""
+Курсорная (keyset) пагинация.
+
+В отличие от OFFSET, страница выбирается условием по ключу сортировки
+последней показанной записи, поэтому глубина страницы не влияет на стоимость
+запроса: при подходящем составном индексе это один index range scan.
+Общее количество записей и номера страниц не вычисляются — наружу отдаются
+только непрозрачные курсоры «вперёд» и «назад».
+"""
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'core.pagination.cursor'
+NEXT, PREVIOUS = 'n', 'p'
+
+
+class KeysetPage:
+    """Страница результатов; итерируется как список объектов."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по уникальному ключу сортировки ``ordering``, например
+    ``('order', 'created_at', 'id')`` или ``('-created_at', '-id')``.
+    Последним полем должен идти первичный ключ — он делает ключ уникальным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self._fields = [name.lstrip('-') for name in self.ordering]
+        self._descending = [name.startswith('-') for name in self.ordering]
+        opts = queryset.model._meta
+        self._model_fields = [
+            opts.pk if name in ('pk', 'id') else opts.get_field(name) for name in self._fields
+        ]
+
+    # --- курсоры ---
+
+    def encode_cursor(self, obj, direction):
+        values = [field.value_to_string(obj) for field in self._model_fields]
+        return signing.dumps([direction, values], salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Вернуть (направление, значения ключа) или None для некорректного курсора."""
+        try:
+            direction, raw_values = signing.loads(cursor, salt=CURSOR_SALT)
+            if direction not in (NEXT, PREVIOUS) or len(raw_values) != len(self._model_fields):
+                return None
+            values = [
+                field.to_python(value) for field, value in zip(self._model_fields, raw_values)
+            ]
+        except (signing.BadSignature, ValidationError, ValueError, TypeError):
+            return None
+        return direction, values
+
+    # --- выборка ---
+
+    def _seek_filter(self, values, forward):
+        """
+        Условие «строго после ключа» для ``forward`` и «строго до» иначе:
+        k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... Первым идёт избыточное
+        k1 >= v1, чтобы планировщик мог начать range scan по индексу.
+        """
+        condition = Q()
+        for position, (name, value) in enumerate(zip(self._fields, values)):
+            after = forward != self._descending[position]
+            step = Q(**{f'{name}__gt' if after else f'{name}__lt': value})
+            for prev_name, prev_value in zip(self._fields[:position], values[:position]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        first_after = forward != self._descending[0]
+        bound = Q(**{f'{self._fields[0]}__gte' if first_after else f'{self._fields[0]}__lte': values[0]})
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _page_queryset(self, cursor):
+        """Запрос страницы (на одну запись больше) и направление курсора."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        limit = self.per_page + 1
+        if decoded is None:
+            return self.queryset.order_by(*self.ordering)[:limit], None
+        direction, values = decoded
+        forward = direction == NEXT
+        queryset = self.queryset.filter(self._seek_filter(values, forward=forward))
+        ordering = self.ordering if forward else self._reversed_ordering()
+        return queryset.order_by(*ordering)[:limit], direction
+
+    def _make_page(self, rows, direction):
+        overflow = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows = rows[::-1]
+            has_more, has_before = True, overflow
+        else:
+            has_more, has_before = overflow, direction == NEXT
+
+        if not rows:
+            return KeysetPage([])
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], NEXT) if has_more else None,
+            previous_cursor=self.encode_cursor(rows[0], PREVIOUS) if has_before else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Страница по курсору; пустой или испорченный курсор даёт первую страницу."""
+        queryset, direction = self._page_queryset(cursor)
+        return self._make_page(list(queryset), direction)
+
+    async def aget_page(self, cursor=None):
+        """То же, что :meth:`get_page`, через асинхронный ORM."""
+        queryset, direction = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], direction)
@@ -0,0 +1,185 @@
+"""
+Сервис прогресса пользователя.
+
+Множество id пройденных уроков загружается одним запросом к промежуточной
+таблице ``completed_lessons`` и кешируется: в пределах запроса — на объекте
+request, между запросами — в кеше Django по ключу пользователя. Проверка
+«урок пройден» после этого выполняется за O(1) без обращения к БД.
+
+Пакетная синхронизация (``sync``) применяет к промежуточной таблице набор
+операций «урок пройден / не пройден» от мобильных и офлайн-клиентов
+несколькими запросами на весь пакет: конфликты разрешаются по времени
+операции на клиенте, а не по порядку прихода запросов.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .models import Lesson, UserProfile
+
+CACHE_KEY_TEMPLATE = 'progress:completed:{user_id}'
+CACHE_TIMEOUT = 60 * 60  # 1 час; при изменениях ключ сбрасывается сигналом
+
+_REQUEST_ATTR = '_completed_lesson_ids'
+
+
+def _cache_key(user_id):
+    return CACHE_KEY_TEMPLATE.format(user_id=user_id)
+
+
+def load_completed_lesson_ids(user_id):
+    """Вернуть frozenset id пройденных уроков пользователя (кеш → БД)."""
+    key = _cache_key(user_id)
+    lesson_ids = cache.get(key)
+    metrics.record_cache(lesson_ids is not None)
+    if lesson_ids is None:
+        through = UserProfile.completed_lessons.through
+        lesson_ids = frozenset(
+            through.objects.filter(userprofile__user_id=user_id)
+            .values_list('lesson_id', flat=True)
+        )
+        cache.set(key, lesson_ids, CACHE_TIMEOUT)
+    return lesson_ids
+
+
+def completed_lesson_ids(request):
+    """Множество id пройденных уроков текущего пользователя, один раз за запрос."""
+    if not request.user.is_authenticated:
+        return frozenset()
+    lesson_ids = getattr(request, _REQUEST_ATTR, None)
+    if lesson_ids is None:
+        lesson_ids = load_completed_lesson_ids(request.user.pk)
+        setattr(request, _REQUEST_ATTR, lesson_ids)
+    return lesson_ids
+
+
+def is_lesson_completed(request, lesson_id):
+    return lesson_id in completed_lesson_ids(request)
+
+
+def invalidate_user_ids(user_ids):
+    """Сбросить закешированный прогресс указанных пользователей."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def forget_request_cache(request):
+    """Убрать множество из request, чтобы следующий вызов перечитал прогресс."""
+    if hasattr(request, _REQUEST_ATTR):
+        delattr(request, _REQUEST_ATTR)
+
+
+def summary(profile):
+    """Пройдено уроков, выполнено заданий и всего уроков — цифры личного кабинета."""
+    totals = profile.completions.aggregate(
+        completed_count=Count('pk'), tasks_completed=Coalesce(Sum('lesson__task_count'), 0),
+    )
+    totals['total_lessons'] = Lesson.objects.count()
+    return totals
+
+
+# --- Пакетная синхронизация ---
+
+MAX_OPERATIONS = 500
+# Диапазон первичного ключа (bigint); большие числа базы не принимают как параметр
+MAX_LESSON_ID = 2 ** 63 - 1
+
+
+class ProgressSyncError(ValueError):
+    """Пакет операций не разобран; текст — для ответа клиенту."""
+
+
+def _parse_timestamp(value, now):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            moment = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            # За пределами дат платформы (1e18, 1e20) или NaN
+            raise ProgressSyncError(f'client_ts: недопустимое время {value!r}') from None
+    elif isinstance(value, str) and parse_datetime(value):
+        moment = parse_datetime(value)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+    else:
+        raise ProgressSyncError(f'client_ts: ожидается ISO 8601 или секунды Unix, получено {value!r}')
+    # Спешащие часы клиента не должны выигрывать все будущие конфликты
+    return min(moment, now)
+
+
+def parse_operations(payload, now=None):
+    """
+    Разобрать ``{"operations": [{"lesson_id", "completed", "client_ts"}, ...]}``.
+    Возвращает {id урока: (пройден, время)}: из нескольких операций над
+    одним уроком остаётся последняя по времени, при равном — последняя в пакете.
+    """
+    now = now or timezone.now()
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        raise ProgressSyncError('Ожидается объект со списком operations')
+    if len(operations) > MAX_OPERATIONS:
+        raise ProgressSyncError(f'Не больше {MAX_OPERATIONS} операций за запрос')
+    latest = {}
+    for number, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ProgressSyncError(f'operations[{number}]: ожидается объект')
+        lesson_id, completed = operation.get('lesson_id'), operation.get('completed')
+        if not isinstance(lesson_id, int) or isinstance(lesson_id, bool) or not isinstance(completed, bool):
+            raise ProgressSyncError(f'operations[{number}]: нужны целый lesson_id и логический completed')
+        if not 1 <= lesson_id <= MAX_LESSON_ID:
+            raise ProgressSyncError(f'operations[{number}]: lesson_id вне диапазона 1..{MAX_LESSON_ID}')
+        moment = _parse_timestamp(operation.get('client_ts'), now)
+        if lesson_id not in latest or latest[lesson_id][1] <= moment:
+            latest[lesson_id] = (completed, moment)
+    return latest
+
+
+def sync(profile, operations):
+    """
+    Применить операции ``{id урока: (пройден, время)}`` и вернуть итог для ответа.
+
+    Профиль блокируется на время транзакции, поэтому пакеты одного
+    пользователя применяются по очереди. Снятие отметки проигрывает, если
+    урок отмечен позже времени операции (completed_at новее). Время снятия
+    не хранится, поэтому устаревшая отметка «пройден» снятие не проигрывает.
+    Изменения идут через add()/remove() связи: сигналы m2m_changed (кеш
+    прогресса, достижения, рейтинг, аудит) получают весь пакет разом.
+    """
+    with transaction.atomic():
+        UserProfile.objects.select_for_update().filter(pk=profile.pk).exists()
+        known = set(Lesson.objects.filter(pk__in=operations).order_by().values_list('pk', flat=True))
+        existing = dict(
+            profile.completions.filter(lesson_id__in=known).values_list('lesson_id', 'completed_at')
+        )
+        added, removed, conflicts = {}, [], []
+        for lesson_id in sorted(known):
+            completed, moment = operations[lesson_id]
+            if completed and lesson_id not in existing:
+                added[lesson_id] = moment
+            elif not completed and lesson_id in existing:
+                completed_at = existing[lesson_id]
+                if completed_at is not None and completed_at > moment:
+                    conflicts.append({'lesson_id': lesson_id, 'completed_at': completed_at})
+                else:
+                    removed.append(lesson_id)
+
+        if added:
+            profile.completed_lessons.add(*added)
+            # Время прохождения — время операции на клиенте, одним UPDATE на пакет
+            profile.completions.filter(lesson_id__in=added).update(completed_at=Case(
+                *(When(lesson_id=lesson_id, then=moment) for lesson_id, moment in added.items())
+            ))
+        if removed:
+            profile.completed_lessons.remove(*removed)
+
+    return {
+        'added': sorted(added),
+        'removed': removed,
+        'conflicts': conflicts,
+        'unknown_lessons': sorted(set(operations) - known),
+        'progress': summary(profile),
+    }
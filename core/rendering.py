@@ -0,0 +1,62 @@
+"""
+Готовый HTML и выдержки текстовых полей каталога.
+
+Уроки, темы и исследования хранят рядом с текстом его HTML (то же, что давал
+фильтр ``linebreaks`` в шаблоне) и короткую выдержку без разметки для списков.
+Оба поля считаются при сохранении (``RenderedTextMixin`` в core/models.py),
+поэтому списки не читают из базы полный текст, а страницы не обрабатывают
+его на каждый запрос. Записи, созданные в обход save(), заполняет команда
+render_content.
+"""
+import re
+
+from django.utils import timezone
+from django.utils.html import linebreaks, strip_tags
+from django.utils.text import Truncator
+
+DEFAULT_BATCH_SIZE = 500
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def to_html(text):
+    """HTML текста: абзацы и переносы строк, разметка в тексте экранируется."""
+    return linebreaks(text or '', autoescape=True)
+
+
+def to_excerpt(text, length):
+    """Простой текст длиной не больше ``length`` символов, с «…» при обрезке."""
+    plain = _WHITESPACE.sub(' ', strip_tags(text or '')).strip()
+    return Truncator(plain).chars(length)
+
+
+def render_rows(model, text_field, excerpt_length, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Пересчитать HTML и выдержки всех записей ``model`` пакетами по первичному
+    ключу; вернуть число изменившихся. Изменившиеся записи получают новый
+    ``updated_at``, чтобы сменился ETag страниц. Работает и с историческими
+    моделями миграций, поэтому поля передаются явно.
+    """
+    html_field = f'{text_field}_html'
+    queryset = model._default_manager.order_by('pk').only('pk', text_field, html_field, 'excerpt')
+    changed_total = 0
+    last_pk = None
+    while True:
+        rows = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(rows[:batch_size])
+        if not batch:
+            return changed_total
+        last_pk = batch[-1].pk
+        now = timezone.now()
+        changed = []
+        for row in batch:
+            text = getattr(row, text_field)
+            html, excerpt = to_html(text), to_excerpt(text, excerpt_length)
+            if (getattr(row, html_field), row.excerpt) != (html, excerpt):
+                setattr(row, html_field, html)
+                row.excerpt = excerpt
+                row.updated_at = now
+                changed.append(row)
+        if changed:
+            model._default_manager.bulk_update(changed, [html_field, 'excerpt', 'updated_at'])
+        changed_total += len(changed)
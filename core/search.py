@@ -0,0 +1,186 @@
+"""
+Поиск по темам, урокам, заданиям и исследованиям.
+
+В PostgreSQL используется сохранённый ``search_vector`` (tsvector с GIN-индексом)
+и триграммное сходство по названию (pg_trgm) для устойчивости к опечаткам.
+На остальных СУБД (SQLite в тестах) работает простой бэкенд на ``icontains``
+с тем же интерфейсом; учтите, что LIKE в SQLite не различает регистр только
+для латиницы. Админка использует тот же бэкенд, что и публичный поиск.
+"""
+from dataclasses import dataclass
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from django.urls import reverse
+
+from .models import Theme, Lesson, Task, ResearchArticle
+
+SEARCH_CONFIG = 'russian'
+MIN_QUERY_LENGTH = 2
+RESULTS_PER_MODEL = 20
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    """
+    Как искать по модели: поле заголовка, поле текста и публичный URL.
+    ``excerpt_field`` — готовая выдержка для выдачи (core/rendering.py); если
+    она есть, полный текст из базы не читается.
+    """
+    model: type
+    kind: str
+    title_field: str
+    body_field: str
+    excerpt_field: str = ''
+
+    def public_queryset(self):
+        if self.excerpt_field:
+            queryset = self.model.objects.defer(*self.model.listing_deferred_fields())
+        else:
+            queryset = self.model.objects.defer('search_vector')
+        if self.model is ResearchArticle:
+            queryset = queryset.filter(is_published=True)
+        return queryset
+
+    def vector(self):
+        return (
+            SearchVector(self.title_field, weight='A', config=SEARCH_CONFIG)
+            + SearchVector(self.body_field, weight='B', config=SEARCH_CONFIG)
+        )
+
+    def url(self, obj):
+        if self.model is Theme:
+            return reverse('theme_detail', kwargs={'pk': obj.pk})
+        if self.model is Lesson:
+            return reverse('lesson_detail', kwargs={'lesson_id': obj.pk})
+        if self.model is Task:
+            return reverse('lesson_detail', kwargs={'lesson_id': obj.lesson_id})
+        return reverse('research')
+
+
+SEARCH_SPECS = {
+    Theme: SearchSpec(Theme, 'Тема', 'title', 'description', 'excerpt'),
+    Lesson: SearchSpec(Lesson, 'Урок', 'title', 'content', 'excerpt'),
+    Task: SearchSpec(Task, 'Задание', 'title', 'description'),
+    ResearchArticle: SearchSpec(ResearchArticle, 'Исследование', 'title', 'content', 'excerpt'),
+}
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    title: str
+    body: str
+    url: str
+    score: float
+
+
+class SimpleSearchBackend:
+    """Запасной бэкенд: ``icontains`` без индексов, совпадение в заголовке выше."""
+    indexed = False
+
+    def filter_queryset(self, spec, queryset, query):
+        return queryset.filter(
+            Q(**{f'{spec.title_field}__icontains': query})
+            | Q(**{f'{spec.body_field}__icontains': query})
+        )
+
+    def search_model(self, spec, query, limit):
+        title_match = Q(**{f'{spec.title_field}__icontains': query})
+        queryset = spec.public_queryset().order_by('-pk')
+        title_hits = list(queryset.filter(title_match)[:limit])
+        for obj in title_hits:
+            obj.score = 1.0
+        body_hits = []
+        if len(title_hits) < limit:
+            body_hits = list(
+                queryset.exclude(title_match)
+                .filter(**{f'{spec.body_field}__icontains': query})[:limit - len(title_hits)]
+            )
+            for obj in body_hits:
+                obj.score = 0.5
+        return title_hits + body_hits
+
+
+class PostgresSearchBackend:
+    """Полнотекстовый поиск по ``search_vector`` + триграммы по заголовку."""
+    indexed = True
+
+    def _query(self, query):
+        return SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+
+    def filter_queryset(self, spec, queryset, query):
+        # Оба условия обслуживаются GIN-индексами (BitmapOr); порог сходства
+        # для оператора % задаётся параметром pg_trgm.similarity_threshold
+        return queryset.filter(
+            Q(search_vector=self._query(query))
+            | Q(**{f'{spec.title_field}__trigram_similar': query})
+        )
+
+    def search_model(self, spec, query, limit):
+        queryset = (
+            self.filter_queryset(spec, spec.public_queryset(), query)
+            .annotate(
+                score=SearchRank(F('search_vector'), self._query(query))
+                + TrigramSimilarity(spec.title_field, query)
+            )
+            .order_by('-score', '-pk')
+        )
+        return list(queryset[:limit])
+
+
+def get_backend(using='default'):
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
+
+
+def search(query, limit=RESULTS_PER_MODEL):
+    """Ранжированные результаты по всем моделям каталога."""
+    query = (query or '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+    backend = get_backend()
+    results = []
+    for spec in SEARCH_SPECS.values():
+        for obj in backend.search_model(spec, query, limit):
+            results.append(SearchResult(
+                kind=spec.kind,
+                title=getattr(obj, spec.title_field),
+                body=getattr(obj, spec.excerpt_field or spec.body_field),
+                url=spec.url(obj),
+                score=float(obj.score or 0),
+            ))
+    results.sort(key=lambda result: result.score, reverse=True)
+    return results
+
+
+def filter_queryset(model, queryset, query):
+    """Фильтр для админки: тот же индекс, что и у публичного поиска."""
+    return get_backend(queryset.db).filter_queryset(SEARCH_SPECS[model], queryset, query)
+
+
+def update_search_vector(instance):
+    """Пересчитать вектор одной записи (вызывается из post_save)."""
+    spec = SEARCH_SPECS[type(instance)]
+    if connections[instance._state.db or 'default'].vendor != 'postgresql':
+        return
+    type(instance).objects.filter(pk=instance.pk).update(search_vector=spec.vector())
+
+
+def update_search_vectors(queryset):
+    """Пересчитать векторы записей ``queryset`` одним UPDATE (после пакетной загрузки)."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+    return queryset.update(search_vector=SEARCH_SPECS[queryset.model].vector())
+
+
+def refresh_search_vectors(using='default'):
+    """Пересчитать векторы всех записей одним UPDATE на модель (после bulk_create)."""
+    if connections[using].vendor != 'postgresql':
+        return 0
+    updated = 0
+    for model, spec in SEARCH_SPECS.items():
+        updated += model.objects.using(using).update(search_vector=spec.vector())
+    return updated
@@ -0,0 +1,218 @@
+"""
+Генератор синтетического каталога для нагрузочных проверок.
+
+Данные детерминированы: один и тот же ``seed`` на пустой базе даёт один и
+тот же набор тем, уроков, заданий, пользователей и их прогресса. Все записи
+создаются пакетами через ``bulk_create``, поэтому save() и сигналы не
+вызываются: готовый HTML и выдержки текстов считаются до вставки, а
+денормализованные счётчики и поисковые векторы в конце пересчитываются
+одним UPDATE на таблицу, рейтинг строится заново, а поколения кеша
+каталога сбрасываются.
+"""
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from . import caching, leaderboard
+from .counters import recount_lesson_counts, recount_task_counts
+from .search import refresh_search_vectors
+from .models import Theme, Lesson, Task, UserProfile, ResearchArticle
+
+SEED_USERNAME_PREFIX = 'seed_user_'
+SEED_PASSWORD = 'seed-password'
+
+_WORDS = (
+    'безопасность', 'защита', 'оборона', 'служба', 'армия', 'подготовка',
+    'строевая', 'тактика', 'медицина', 'помощь', 'эвакуация', 'укрытие',
+    'связь', 'карта', 'ориентирование', 'маршрут', 'снаряжение', 'устав',
+    'дисциплина', 'караул', 'противогаз', 'радиация', 'химическая', 'пожар',
+    'спасение', 'учения', 'норматив', 'огневая', 'топография', 'взвод',
+    'командир', 'приказ', 'гражданская', 'население', 'сигнал', 'тревога',
+)
+
+
+@dataclass
+class SeedStats:
+    themes: int = 0
+    lessons: int = 0
+    tasks: int = 0
+    users: int = 0
+    completions: int = 0
+    articles: int = 0
+
+
+class _TextFactory:
+    """Быстрый генератор правдоподобного текста из заранее собранных абзацев."""
+
+    def __init__(self, rng, paragraphs=200):
+        self.rng = rng
+        self.paragraphs = [self._paragraph() for _ in range(paragraphs)]
+
+    def _sentence(self):
+        words = self.rng.choices(_WORDS, k=self.rng.randint(6, 14))
+        return ' '.join(words).capitalize() + '.'
+
+    def _paragraph(self):
+        return ' '.join(self._sentence() for _ in range(self.rng.randint(3, 7)))
+
+    def title(self):
+        return ' '.join(self.rng.choices(_WORDS, k=self.rng.randint(2, 5))).capitalize()
+
+    def text(self, size):
+        parts = []
+        length = 0
+        while length < size:
+            paragraph = self.rng.choice(self.paragraphs)
+            parts.append(paragraph)
+            length += len(paragraph) + 2
+        return '\n\n'.join(parts)
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _render(objs):
+    for obj in objs:
+        obj.render_text()
+
+
+def generate_dataset(seed=42, themes=2000, lessons_per_theme=100, tasks_per_lesson=2,
+                     users=10000, max_completed=400, articles=200, content_size=1500,
+                     batch_size=5000, log=None):
+    """
+    Сгенерировать каталог и пользователей. ``log`` — необязательный callable
+    для вывода прогресса. Возвращает :class:`SeedStats`.
+    """
+    rng = random.Random(seed)
+    text = _TextFactory(rng)
+    stats = SeedStats()
+    log = log or (lambda message: None)
+
+    with transaction.atomic():
+        # Темы → уроки → задания обрабатываются пачками тем, чтобы память
+        # не зависела от общего размера каталога
+        themes_per_batch = max(1, batch_size // max(lessons_per_theme, 1))
+        order = Theme.objects.aggregate(max_order=Max('order'))['max_order'] or 0
+        for theme_batch in _batched(range(themes), themes_per_batch):
+            theme_objs = []
+            for _ in theme_batch:
+                order += 1
+                theme_objs.append(Theme(
+                    title=text.title(),
+                    slug=f'seed-{seed}-{order}',
+                    description=text.text(300),
+                    order=order,
+                ))
+            _render(theme_objs)
+            Theme.objects.bulk_create(theme_objs, batch_size=batch_size)
+            theme_ids = list(
+                Theme.objects.filter(order__gt=order - len(theme_objs), order__lte=order)
+                .order_by('id').values_list('id', flat=True)
+            )
+            stats.themes += len(theme_ids)
+
+            lesson_objs = [
+                Lesson(
+                    theme_id=theme_id,
+                    title=text.title(),
+                    content=text.text(content_size),
+                    video_url='https://example.com/video/%d' % rng.randint(1, 10 ** 6)
+                    if rng.random() < 0.3 else None,
+                    order=position,
+                    slug=f'lesson-{position}',
+                )
+                for theme_id in theme_ids
+                for position in range(1, lessons_per_theme + 1)
+            ]
+            _render(lesson_objs)
+            Lesson.objects.bulk_create(lesson_objs, batch_size=batch_size)
+            stats.lessons += len(lesson_objs)
+
+            lesson_ids = list(
+                Lesson.objects.filter(theme_id__in=theme_ids)
+                .order_by('id').values_list('id', flat=True)
+            )
+            task_objs = (
+                Task(
+                    lesson_id=lesson_id,
+                    title=text.title(),
+                    slug=f'task-{number}',
+                    description=text.text(200),
+                )
+                for lesson_id in lesson_ids
+                for number in range(1, tasks_per_lesson + 1)
+            )
+            for task_batch in _batched(task_objs, batch_size):
+                Task.objects.bulk_create(task_batch)
+                stats.tasks += len(task_batch)
+            log(f'Темы: {stats.themes}, уроки: {stats.lessons}, задания: {stats.tasks}')
+
+        article_objs = [
+            ResearchArticle(
+                title=text.title(),
+                content=text.text(content_size * 2),
+                is_published=rng.random() < 0.9,
+            )
+            for _ in range(articles)
+        ]
+        _render(article_objs)
+        ResearchArticle.objects.bulk_create(article_objs, batch_size=batch_size)
+        stats.articles = articles
+
+        # Пароль хешируется один раз: хеширование на каждого пользователя
+        # заняло бы больше времени, чем всё остальное вместе взятое
+        password = make_password(SEED_PASSWORD)
+        all_lesson_ids = list(Lesson.objects.order_by('id').values_list('id', flat=True))
+        through = UserProfile.completed_lessons.through
+        for user_batch in _batched(range(users), batch_size):
+            usernames = [f'{SEED_USERNAME_PREFIX}{number:07d}' for number in user_batch]
+            User.objects.bulk_create(
+                [
+                    User(username=username, password=password,
+                         email=f'{username}@example.com', first_name='Тест', last_name='Пользователь')
+                    for username in usernames
+                ],
+                batch_size=batch_size,
+            )
+            user_ids = User.objects.filter(username__in=usernames).values_list('id', flat=True)
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_id) for user_id in user_ids],
+                batch_size=batch_size,
+            )
+            profile_ids = list(
+                UserProfile.objects.filter(user__username__in=usernames)
+                .order_by('id').values_list('id', flat=True)
+            )
+            stats.users += len(profile_ids)
+
+            completions = (
+                through(userprofile_id=profile_id, lesson_id=lesson_id)
+                for profile_id in profile_ids
+                for lesson_id in rng.sample(
+                    all_lesson_ids, rng.randint(0, min(max_completed, len(all_lesson_ids)))
+                )
+            )
+            for completion_batch in _batched(completions, batch_size):
+                through.objects.bulk_create(completion_batch)
+                stats.completions += len(completion_batch)
+            log(f'Пользователи: {stats.users}, пройдено уроков: {stats.completions}')
+
+        recount_lesson_counts()
+        recount_task_counts()
+        refresh_search_vectors()
+        leaderboard.rebuild(batch_size)
+        caching.bump_generation(Theme, Lesson, Task, ResearchArticle)
+
+    return stats
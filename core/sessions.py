@@ -0,0 +1,152 @@
+"""
+Сессии и сообщения без лишних записей в базу.
+
+``SessionStore`` (SESSION_ENGINE = 'core.sessions') читает сессию из кеша,
+при промахе — из ``django_session`` и кладёт её в кеш. В базу пишет только
+то, что изменилось:
+
+* данные сессии сравниваются с сохранёнными; если они те же (например,
+  ``request.session[key]`` присвоили прежнее значение), записи нет;
+* срок действия скользящий, но ``expire_date`` обновляется не на каждом
+  запросе, а не чаще раза в ``SESSION_REFRESH_INTERVAL`` секунд: сессия,
+  срок которой пора продлить, помечается изменённой при чтении, и
+  SessionMiddleware сохраняет её вместе с новой cookie.
+
+Заодно пропущенная запись не включает прилипание к основной базе
+(core/db_router.py).
+
+``MessageStorage`` (MESSAGE_STORAGE) держит сообщения в том же кеше под
+ключом сессии, не трогая её данные; без сессии, как и при переполнении, —
+в cookie, как стандартный FallbackStorage.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.messages.storage.base import BaseStorage
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+KEY_PREFIX = 'core.sessions.'
+MESSAGES_KEY_PREFIX = 'core.messages.'
+
+
+class SessionStore(DBStore):
+    """
+    Сессии в базе с чтением через кеш. В кеше лежит пара «закодированные
+    данные, expire_date» последней записи в базу — по ней save() решает,
+    нужна ли запись.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # (session_data, expire_date) строки в базе; None — строки нет
+        self._stored = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def load(self):
+        try:
+            stored = self._cache.get(self.cache_key)
+        except Exception:
+            # Например, memcached отвергает некорректный ключ — сессия начнётся заново
+            stored = None
+        if stored is None:
+            session = self._get_session_from_db()
+            if session is None:
+                self._stored = None
+                return {}
+            stored = (session.session_data, session.expire_date)
+            self._cache.set(self.cache_key, stored, self.get_expiry_age(expiry=session.expire_date))
+        self._stored = stored
+        data = self.decode(stored[0])
+        if self._needs_refresh(data.get('_session_expiry'), stored[1]):
+            self.modified = True
+        return data
+
+    def _needs_refresh(self, expiry, expire_date):
+        """Срок сессии с этим ``expiry`` ушёл от ``expire_date`` в базе дальше интервала."""
+        refresh = timedelta(seconds=settings.SESSION_REFRESH_INTERVAL)
+        return abs(self.get_expiry_date(expiry=expiry) - expire_date) >= refresh
+
+    def _is_unchanged(self):
+        if self._stored is None or self.session_key is None:
+            return False
+        session_data, expire_date = self._stored
+        data = self._get_session()
+        return (
+            self.decode(session_data) == data
+            and not self._needs_refresh(data.get('_session_expiry'), expire_date)
+        )
+
+    def create_model_instance(self, data):
+        obj = super().create_model_instance(data)
+        self._pending = (obj.session_data, obj.expire_date)
+        return obj
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        if not must_create and self._is_unchanged():
+            return
+        super().save(must_create)
+        self._stored = self._pending
+        self._cache.set(self.cache_key, self._stored, self.get_expiry_age(expiry=self._stored[1]))
+
+    def exists(self, session_key):
+        if session_key and (self.cache_key_prefix + session_key) in self._cache:
+            return True
+        return super().exists(session_key)
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+            self._stored = None
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+
+class SessionCacheStorage(BaseStorage):
+    """Сообщения в кеше сессий под ключом сессии; без ключа не хранит ничего."""
+
+    def __init__(self, request, *args, **kwargs):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(request, *args, **kwargs)
+
+    def _cache_key(self):
+        session = getattr(self.request, 'session', None)
+        session_key = session.session_key if session is not None else None
+        return MESSAGES_KEY_PREFIX + session_key if session_key else None
+
+    def _get(self, *args, **kwargs):
+        key = self._cache_key()
+        messages = self._cache.get(key) if key else None
+        # Пусто — пусть FallbackStorage заглянет и в cookie
+        return messages or [], bool(messages)
+
+    def _store(self, messages, response, *args, **kwargs):
+        key = self._cache_key()
+        if key is None:
+            return messages
+        if messages:
+            self._cache.set(key, messages, settings.SESSION_COOKIE_AGE)
+        else:
+            self._cache.delete(key)
+        return []
+
+
+class MessageStorage(FallbackStorage):
+    """Сообщения в кеше сессий, без сессии и при переполнении — в cookie."""
+    storage_classes = (SessionCacheStorage, CookieStorage)
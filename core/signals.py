@@ -0,0 +1,309 @@
+from collections import defaultdict
+
+from django.contrib.auth.signals import user_logged_in
+from django.db.models import Count, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Theme, Lesson, Task, UserProfile, ResearchArticle, LessonCompletion
+from . import achievements, audit, caching, counters, curriculum, downloads, images, leaderboard, progress, search
+
+
+@receiver(m2m_changed, sender=UserProfile.completed_lessons.through)
+def invalidate_progress_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сбрасываем кеш прогресса при любом изменении completed_lessons."""
+    if not reverse:
+        # profile.completed_lessons.add(...) — меняется один профиль
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            progress.invalidate_user_ids([instance.user_id])
+        return
+
+    # lesson.userprofile_set.add(...) — меняются профили из pk_set;
+    # при clear() список профилей известен только до очистки
+    if action == 'pre_clear':
+        profiles = UserProfile.objects.filter(completed_lessons=instance)
+    elif action in ('post_add', 'post_remove'):
+        profiles = UserProfile.objects.filter(pk__in=pk_set)
+    else:
+        return
+    progress.invalidate_user_ids(profiles.values_list('user_id', flat=True))
+
+
+# --- Каскадное удаление ---
+
+# Модели-предки: при их удалении запись удаляется каскадом
+_CASCADE_PARENTS = {Lesson: (Theme,), Task: (Theme, Lesson)}
+
+
+def _deleted_with_parent(sender, origin):
+    """
+    Запись удаляется каскадом вместе с родителем (``origin`` — запись или
+    QuerySet, с которых начато удаление). Тогда счётчики родителя не
+    трогаем, а общую работу делают сигналы самого родителя — один раз, а не
+    на каждую строку.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in _CASCADE_PARENTS.get(sender, ())
+
+
+# --- Денормализованные счётчики уроков и заданий ---
+
+def _remember_parent(model, instance, fk_attname):
+    """Запоминаем исходного родителя, чтобы учесть перенос записи."""
+    if instance._state.adding or instance.pk is None:
+        instance._original_parent_id = None
+        return
+    instance._original_parent_id = (
+        model.objects.filter(pk=instance.pk).values_list(fk_attname, flat=True).first()
+    )
+
+
+def _apply_parent_change(instance, created, fk_attname, adjust):
+    parent_id = getattr(instance, fk_attname)
+    if created:
+        adjust(parent_id, 1)
+        return
+    original_id = getattr(instance, '_original_parent_id', None)
+    if original_id is not None and original_id != parent_id:
+        adjust(original_id, -1)
+        adjust(parent_id, 1)
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_theme(sender, instance, raw, **kwargs):
+    if not raw:
+        _remember_parent(Lesson, instance, 'theme_id')
+
+
+@receiver(post_save, sender=Lesson)
+def update_theme_lesson_count(sender, instance, created, raw, **kwargs):
+    if not raw:
+        _apply_parent_change(instance, created, 'theme_id', counters.adjust_lesson_count)
+
+
+@receiver(post_delete, sender=Lesson)
+def decrement_theme_lesson_count(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_parent(sender, origin):
+        counters.adjust_lesson_count(instance.theme_id, -1)
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_lesson(sender, instance, raw, **kwargs):
+    if not raw:
+        _remember_parent(Task, instance, 'lesson_id')
+
+
+@receiver(post_save, sender=Task)
+def update_lesson_task_count(sender, instance, created, raw, **kwargs):
+    if not raw:
+        _apply_parent_change(instance, created, 'lesson_id', counters.adjust_task_count)
+
+
+@receiver(post_delete, sender=Task)
+def decrement_lesson_task_count(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_parent(sender, origin):
+        counters.adjust_task_count(instance.lesson_id, -1)
+
+
+# --- Поисковый вектор ---
+
+@receiver(post_save, sender=Theme)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=ResearchArticle)
+def refresh_search_vector(sender, instance, raw, **kwargs):
+    if not raw:
+        search.update_search_vector(instance)
+
+
+# --- Поколения кеша каталога ---
+
+@receiver(post_save, sender=Theme)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=ResearchArticle)
+def bump_catalog_generation(sender, **kwargs):
+    caching.bump_generation(sender)
+
+
+# Удаление родителя увеличивает и поколения каскадно удалённых детей
+_DELETE_GENERATIONS = {Theme: (Theme, Lesson, Task), Lesson: (Lesson, Task)}
+
+
+@receiver(post_delete, sender=Theme)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ResearchArticle)
+def bump_catalog_generation_on_delete(sender, origin=None, **kwargs):
+    if not _deleted_with_parent(sender, origin):
+        caching.bump_generation(*_DELETE_GENERATIONS.get(sender, (sender,)))
+
+
+# --- Уменьшенные копии изображений ---
+
+@receiver(post_save, sender=Theme)
+@receiver(post_save, sender=UserProfile)
+def schedule_image_variants(sender, instance, raw, **kwargs):
+    if not raw and images.needs_variants(instance):
+        images.schedule_variants(instance)
+
+
+# --- Контрольная сумма файла задания ---
+
+@receiver(pre_save, sender=Task)
+def compute_task_file_checksum(sender, instance, raw, **kwargs):
+    """
+    Размер и SHA-256 считаются при загрузке нового файла, а не при каждой
+    отдаче. Суммы файлов, загруженных раньше, досчитывает команда
+    compute_task_checksums: сохранение задания не должно читать файл с
+    диска и падать, если его там нет.
+    """
+    if raw:
+        return
+    if not instance.file:
+        instance.file_size, instance.file_sha256 = None, ''
+    elif not instance.file._committed:
+        try:
+            instance.file_size, instance.file_sha256 = downloads.file_checksum(instance.file)
+        except OSError:
+            instance.file_size, instance.file_sha256 = None, ''
+
+
+# --- Слаги (естественный ключ импорта каталога) ---
+
+@receiver(pre_save, sender=Theme)
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Task)
+def assign_catalog_slug(sender, instance, raw, **kwargs):
+    """Слаг назначается один раз; урок или задание, перенесённые к другому родителю, получают новый."""
+    if raw:
+        return
+    scope_field = curriculum.SLUG_SCOPES[sender]
+    original_parent_id = getattr(instance, '_original_parent_id', None)
+    moved = scope_field and original_parent_id not in (None, getattr(instance, scope_field))
+    if not instance.slug or moved:
+        instance.slug = curriculum.unique_slug(instance)
+
+
+# --- Достижения ---
+
+@receiver(m2m_changed, sender=UserProfile.completed_lessons.through)
+def evaluate_achievements(sender, instance, action, reverse, pk_set, **kwargs):
+    """Проверяются только новые отметки: в post_add ``pk_set`` — лишь добавленные связи."""
+    if action != 'post_add' or not pk_set:
+        return
+    if not reverse:
+        achievements.schedule_evaluation(instance.pk, pk_set)
+    else:
+        # lesson.userprofile_set.add(...): pk_set — профили, урок один
+        for profile_id in pk_set:
+            achievements.schedule_evaluation(profile_id, [instance.pk])
+
+
+# --- Рейтинг ---
+
+def _theme_counts(completions):
+    return dict(completions.order_by().values_list('lesson__theme_id').annotate(total=Count('pk')))
+
+
+@receiver(m2m_changed, sender=UserProfile.completed_lessons.through)
+def update_leaderboard(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Очки меняются на разницу. Добавленные связи — ``pk_set`` в post_add;
+    снимаемые читаются до удаления (pre_remove/pre_clear): ``pk_set`` в remove —
+    запрошенные id, а не существующие связи. Задача ставится после фиксации.
+    """
+    if action not in ('post_add', 'pre_remove', 'pre_clear') or (action != 'pre_clear' and not pk_set):
+        return
+    if not reverse:
+        # profile.completed_lessons.add(...): pk_set — уроки
+        if action == 'post_add':
+            leaderboard.schedule([instance.pk], _theme_counts(instance.completions.filter(lesson_id__in=pk_set)), 1)
+            return
+        completions = instance.completions.all()
+        if action == 'pre_remove':
+            completions = completions.filter(lesson_id__in=pk_set)
+        leaderboard.schedule([instance.pk], _theme_counts(completions), -1)
+        return
+
+    # lesson.userprofile_set.add(...): pk_set — профили, урок один
+    if action == 'post_add':
+        leaderboard.schedule(pk_set, {instance.theme_id: 1}, 1)
+        return
+    completions = instance.completions.all()
+    if action == 'pre_remove':
+        completions = completions.filter(userprofile_id__in=pk_set)
+    profile_ids = list(completions.values_list('userprofile_id', flat=True))
+    if profile_ids:
+        leaderboard.schedule(profile_ids, {instance.theme_id: 1}, -1)
+
+
+@receiver(pre_delete, sender=Lesson)
+def remove_lesson_from_leaderboard(sender, instance, origin=None, **kwargs):
+    """Каскадное удаление отметок m2m_changed не посылает."""
+    if _deleted_with_parent(sender, origin):
+        return
+    profile_ids = list(instance.completions.values_list('userprofile_id', flat=True))
+    if profile_ids:
+        leaderboard.schedule(profile_ids, {instance.theme_id: 1}, -1)
+
+
+@receiver(pre_delete, sender=Theme)
+def remove_theme_lessons_from_leaderboard(sender, instance, **kwargs):
+    """Отметки всех уроков темы — одним запросом, профили сгруппированы по числу уроков."""
+    profiles_by_total = defaultdict(list)
+    rows = (
+        LessonCompletion.objects.filter(lesson__theme=instance).order_by()
+        .values_list('userprofile_id').annotate(total=Count('pk'))
+    )
+    for profile_id, total in rows:
+        profiles_by_total[total].append(profile_id)
+    for total, profile_ids in profiles_by_total.items():
+        leaderboard.schedule(profile_ids, {instance.pk: total}, -1)
+
+
+@receiver(post_save, sender=Lesson)
+def move_lesson_in_leaderboard(sender, instance, created, raw, **kwargs):
+    """Урок перенесён в другую тему — его отметки переходят в рейтинг новой темы."""
+    original_id = getattr(instance, '_original_parent_id', None)
+    if raw or created or original_id in (None, instance.theme_id):
+        return
+    profile_ids = list(instance.completions.values_list('userprofile_id', flat=True))
+    if profile_ids:
+        leaderboard.schedule(profile_ids, {original_id: 1}, -1)
+        leaderboard.schedule(profile_ids, {instance.theme_id: 1}, 1)
+
+
+@receiver(post_delete, sender=Theme)
+def forget_theme_leaderboard(sender, instance, **kwargs):
+    leaderboard.forget_theme(instance.pk)
+
+
+@receiver(pre_delete, sender=UserProfile)
+def forget_profile_leaderboard(sender, instance, **kwargs):
+    leaderboard.forget_profile(instance.pk)
+
+
+# --- Журнал аудита ---
+
+@receiver(user_logged_in)
+def audit_login(sender, request, user, **kwargs):
+    audit.record(audit.LOGIN, user=user, request=request,
+                 table_name=user._meta.db_table, record_id=user.pk)
+
+
+@receiver(m2m_changed, sender=UserProfile.completed_lessons.through)
+def audit_lesson_completion(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    event = audit.LESSON_COMPLETED if action == 'post_add' else audit.LESSON_UNCOMPLETED
+    table_name = sender._meta.db_table
+    if not reverse:
+        # profile.completed_lessons.add(...): pk_set — уроки; после clear() он пуст
+        for lesson_id in sorted(pk_set or [None]):
+            audit.record(event, user_id=instance.user_id, table_name=table_name, record_id=lesson_id)
+    elif pk_set:
+        # lesson.userprofile_set.add(...): pk_set — профили
+        user_ids = UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+        for user_id in user_ids:
+            audit.record(event, user_id=user_id, table_name=table_name, record_id=instance.pk)
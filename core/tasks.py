@@ -0,0 +1,28 @@
+from celery import shared_task
+from django.apps import apps
+from django.db import IntegrityError, OperationalError
+
+from . import achievements, images, leaderboard
+
+
+@shared_task(ignore_result=True, autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def generate_image_variants(model_label, pk):
+    """Построить уменьшенные копии изображения записи (см. core/images.py)."""
+    images.update_variants(apps.get_model(model_label), pk)
+
+
+@shared_task(ignore_result=True)
+def evaluate_achievements(profile_id, lesson_ids):
+    """Выдать достижения после отметки уроков (см. core/achievements.py)."""
+    achievements.evaluate(profile_id, lesson_ids)
+
+
+# Параллельные задачи могут одновременно создать строку или корзину рейтинга
+# (IntegrityError) или, несмотря на общий порядок блокировок, получить отказ
+# по взаимной блокировке или сериализации (OperationalError); проигравшая
+# транзакция откатывается целиком и повторяется
+@shared_task(ignore_result=True, autoretry_for=(IntegrityError, OperationalError), retry_backoff=True,
+             max_retries=5)
+def update_leaderboard(profile_ids, theme_counts, sign):
+    """Изменить очки рейтинга после отметки уроков (см. core/leaderboard.py)."""
+    leaderboard.apply(profile_ids, {int(theme_id): count for theme_id, count in theme_counts.items()}, sign)
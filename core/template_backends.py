@@ -0,0 +1,33 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class InstrumentedTemplate(Template):
+    """Шаблон верхнего уровня, время рендеринга которого попадает в метрики запроса."""
+
+    def render(self, context=None, request=None):
+        request_metrics = metrics.current()
+        if request_metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Стандартный бэкенд Django с замером рендеринга (core/metrics.py).
+    {% include %} и {% extends %} рендерятся внутри шаблона верхнего уровня
+    и входят в его время, поэтому двойного учёта нет.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
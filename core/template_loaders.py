@@ -0,0 +1,48 @@
+"""
+Загрузчик шаблонов с минификацией HTML.
+
+Пробелы и HTML-комментарии убираются из исходника шаблона один раз, при
+загрузке; вместе с кеширующим загрузчиком (TEMPLATES → loaders в settings.py)
+это не стоит ничего при рендеринге. Вывод переменных не меняется: сжимается
+только разметка самого шаблона.
+
+Отступы и пустые строки сворачиваются до переводов строк — браузер
+отображает их так же, как один пробел, а число строк сохраняется, чтобы
+номера строк в ошибках шаблонов оставались верными. Содержимое ``<pre>`` и
+``<textarea>``, где пробелы значимы, не трогается. Минифицируются только
+шаблоны с префиксами ``HTML_MINIFY_PREFIXES``: у шаблонов админки переносы
+строк внутри {% blocktranslate %} входят в строку перевода.
+"""
+import re
+
+from django.conf import settings
+from django.template.loaders.app_directories import Loader as AppDirectoriesLoader
+
+_MINIFIABLE = re.compile(
+    r'(?P<keep><(?P<tag>pre|textarea)\b.*?</(?P=tag)\s*>)'
+    r'|<!--(?!\[if).*?-->'
+    r'|[ \t]*\n\s*',
+    re.S | re.I,
+)
+
+
+def _replace(match):
+    if match.group('keep'):
+        return match.group('keep')
+    return '\n' * match.group(0).count('\n')
+
+
+def minify(source):
+    """Свернуть отступы и убрать комментарии в HTML-исходнике шаблона."""
+    return _MINIFIABLE.sub(_replace, source)
+
+
+class MinifyingLoader(AppDirectoriesLoader):
+    """Шаблоны приложений (templates/ в INSTALLED_APPS) с минификацией HTML."""
+
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        name = origin.template_name or ''
+        if name.endswith('.html') and name.startswith(tuple(settings.HTML_MINIFY_PREFIXES)):
+            return minify(contents)
+        return contents
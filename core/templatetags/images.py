@@ -0,0 +1,52 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+DEFAULT_VARIANT = 'card'
+
+
+def _current_variants(field_file, data):
+    """Копии, построенные именно для этого файла, от меньшей к большей."""
+    if not data or data.get('source') != field_file.name:
+        return []
+    return sorted(data.get('variants', {}).values(), key=lambda variant: variant['width'])
+
+
+def _srcset(storage, variants, key):
+    return ', '.join(f'{storage.url(variant[key])} {variant["width"]}w' for variant in variants)
+
+
+def _attrs(attrs):
+    return format_html_join(
+        '', ' {}="{}"', ((name, value) for name, value in attrs.items() if value not in (None, ''))
+    )
+
+
+@register.simple_tag
+def responsive_image(field_file, variants, sizes='100vw', alt='', loading='lazy',
+                     default=DEFAULT_VARIANT, **attrs):
+    """
+    ``<picture>`` с WebP и JPEG-копиями разной ширины (см. core/images.py)::
+
+        {% responsive_image theme.image theme.image_variants sizes="400px" alt=theme.title style="..." %}
+
+    Пока копии не готовы, выводится ``<img>`` с оригиналом. ``loading="lazy"``
+    по умолчанию; для изображений первого экрана передайте ``loading="eager"``.
+    """
+    if not field_file:
+        return ''
+    common = {'alt': alt, 'loading': loading, 'decoding': 'async', **attrs}
+    current = _current_variants(field_file, variants)
+    if not current:
+        return format_html('<img src="{}"{}>', field_file.url, _attrs(common))
+
+    storage = field_file.storage
+    fallback = variants['variants'].get(default) or current[-1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{}></picture>',
+        _srcset(storage, current, 'webp'), sizes,
+        storage.url(fallback['jpeg']), _srcset(storage, current, 'jpeg'), sizes,
+        fallback['width'], fallback['height'], _attrs(common),
+    )
@@ -0,0 +1,9 @@
+from django.urls import include, path
+
+from core import async_views
+from core.urls import catalog_urlpatterns
+
+# Как под ASGI: каталог обслуживают async-views, остальное — обычные
+urlpatterns = catalog_urlpatterns(async_views) + [
+    path('', include('serve_ready.urls')),
+]
@@ -0,0 +1,140 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import achievements
+from core.models import Theme, Lesson, UserProfile, LessonCompletion, Achievement, UserAchievement
+
+
+# Отметки о прохождении пишутся и в журнал аудита; фоновый поток писал бы
+# в тестовую базу параллельно с тестом
+@override_settings(AUDIT_ASYNC=False)
+class AchievementRuleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.lessons = [
+            Lesson.objects.create(theme=cls.theme, title=f'Урок {number}', content='Текст', order=number)
+            for number in range(3)
+        ]
+        other = Theme.objects.create(title='Медицина', description='Первая помощь')
+        cls.other_lesson = Lesson.objects.create(theme=other, title='Перевязка', content='Текст')
+        cls.user = User.objects.create_user('learner', password='pass')
+        cls.profile = UserProfile.objects.create(user=cls.user)
+
+        cls.theme_done = Achievement.objects.create(
+            slug='oborona', title='Знаток обороны', rule=Achievement.THEME_COMPLETED, theme=cls.theme,
+        )
+        cls.four_lessons = Achievement.objects.create(
+            slug='four', title='Четыре урока', rule=Achievement.LESSONS_COMPLETED, lesson_count=4,
+        )
+        cls.streak = Achievement.objects.create(
+            slug='streak', title='Три урока за неделю', rule=Achievement.LESSONS_IN_DAYS,
+            lesson_count=3, days=7,
+        )
+
+    def complete(self, *lessons, **through_defaults):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.completed_lessons.add(*lessons, through_defaults=through_defaults)
+
+    def earned(self):
+        return set(self.profile.user_achievements.values_list('achievement__slug', flat=True))
+
+    def test_rules_are_evaluated_when_lessons_are_completed(self):
+        self.complete(*self.lessons[:2])
+        self.assertEqual(self.earned(), set())
+
+        self.complete(self.lessons[2])
+        self.assertEqual(self.earned(), {'oborona', 'streak'})
+
+        self.complete(self.other_lesson)
+        self.assertEqual(self.earned(), {'oborona', 'streak', 'four'})
+
+    def test_streak_counts_only_recent_completions(self):
+        self.complete(*self.lessons[:2], completed_at=timezone.now() - timedelta(days=30))
+        self.complete(self.lessons[2])
+        self.assertNotIn('streak', self.earned())
+
+    def test_only_the_delta_is_evaluated(self):
+        self.complete(*self.lessons[:2])
+        with mock.patch('core.tasks.evaluate_achievements.delay') as delay:
+            self.complete(*self.lessons)
+        delay.assert_called_once_with(self.profile.pk, [self.lessons[2].pk])
+
+    def test_evaluation_runs_after_commit(self):
+        with mock.patch('core.tasks.evaluate_achievements.delay') as delay:
+            self.profile.completed_lessons.add(self.lessons[0])
+            delay.assert_not_called()
+
+    def test_theme_rules_of_other_themes_are_not_checked(self):
+        self.complete(*self.lessons, self.other_lesson)
+        UserAchievement.objects.all().delete()
+        # Урок другой темы: «вся тема пройдена» для обороны не проверяется
+        earned = achievements.evaluate(self.profile.pk, [self.other_lesson.pk])
+        self.assertEqual({achievement.slug for achievement in earned}, {'four', 'streak'})
+
+    def test_reverse_add_evaluates_each_profile(self):
+        self.complete(*self.lessons[:2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[2].userprofile_set.add(self.profile)
+        self.assertIn('oborona', self.earned())
+
+    def test_achievements_stay_after_uncompleting(self):
+        self.complete(*self.lessons)
+        self.profile.completed_lessons.remove(self.lessons[0])
+        self.assertIn('oborona', self.earned())
+
+    def test_profile_shows_structured_achievements(self):
+        self.complete(*self.lessons)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'Знаток обороны')
+        self.assertEqual(len(response.context['achievements_list']), 2)
+
+
+class BackfillAchievementsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = UserProfile.objects.create(
+            user=User.objects.create_user('first'), achievements='Лидер команды, Знаток ОБЖ,',
+        )
+        cls.second = UserProfile.objects.create(
+            user=User.objects.create_user('second'), achievements='Знаток ОБЖ',
+        )
+        theme = Theme.objects.create(title='Оборона', description='')
+        lesson = Lesson.objects.create(theme=theme, title='Урок', content='')
+        LessonCompletion.objects.bulk_create([LessonCompletion(userprofile=cls.second, lesson=lesson)])
+        cls.rule = Achievement.objects.create(
+            slug='oborona', title='Оборона пройдена', rule=Achievement.THEME_COMPLETED, theme=theme,
+        )
+
+    def test_text_field_is_migrated_once(self):
+        for _ in range(2):
+            call_command('backfill_achievements', stdout=io.StringIO())
+        self.assertEqual(
+            sorted(self.first.user_achievements.values_list('achievement__title', flat=True)),
+            ['Знаток ОБЖ', 'Лидер команды'],
+        )
+        self.assertEqual(Achievement.objects.filter(rule=Achievement.MANUAL).count(), 2)
+        self.assertEqual(UserAchievement.objects.count(), 3)
+
+    def test_evaluate_awards_existing_progress(self):
+        call_command('backfill_achievements', evaluate=True, stdout=io.StringIO())
+        self.assertTrue(self.second.user_achievements.filter(achievement=self.rule).exists())
+        self.assertFalse(self.first.user_achievements.filter(achievement=self.rule).exists())
+
+    def test_rerun_reports_nothing_new(self):
+        output = io.StringIO()
+        call_command('backfill_achievements', evaluate=True, stdout=output)
+        self.assertIn('Перенесено из текста: 3, выдано по правилам: 1', output.getvalue())
+        output = io.StringIO()
+        call_command('backfill_achievements', evaluate=True, stdout=output)
+        self.assertIn('Перенесено из текста: 0, выдано по правилам: 0', output.getvalue())
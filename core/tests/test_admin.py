@@ -0,0 +1,149 @@
+"""
+Бюджет SQL-запросов страниц админки. Число запросов не должно зависеть от
+числа строк: N+1 в колонках списка, справочники в фильтрах и виджетах или
+список всех уроков в форме профиля валят сборку.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.admin_performance import EstimatedCountPaginator
+from core.models import Theme, Lesson, Task, UserProfile, LessonCompletion, ResearchArticle
+
+# URL админки -> максимум SQL-запросов (пользователь — один из них, сессия — из кеша)
+ADMIN_QUERY_BUDGETS = {
+    'admin:core_theme_changelist': 3,
+    'admin:core_lesson_changelist': 3,
+    'admin:core_task_changelist': 3,
+    'admin:core_researcharticle_changelist': 3,
+    'admin:core_userprofile_changelist': 3,
+    'admin:core_userachievement_changelist': 4,
+    'admin:auth_user_changelist': 4,
+    'admin:core_lesson_change': 5,
+    'admin:core_task_change': 5,
+    'admin:core_userprofile_change': 7,
+    'admin:auth_user_change': 10,
+}
+
+
+# Отметки о прохождении пишутся и в журнал аудита; фоновый поток писал бы
+# в тестовую базу параллельно с тестом
+@override_settings(AUDIT_ASYNC=False)
+class AdminQueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.profile = UserProfile.objects.create(user=User.objects.create_user('learner', password='pass'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def grow(self, number):
+        """Добавить ``number`` тем с уроками, заданиями, пользователями и отметками."""
+        start = Theme.objects.count()
+        for index in range(start, start + number):
+            theme = Theme.objects.create(title=f'Тема {index}', description='Описание')
+            lesson = Lesson.objects.create(theme=theme, title=f'Урок {index}', content='Текст')
+            Task.objects.create(lesson=lesson, title=f'Задание {index}', description='Текст')
+            ResearchArticle.objects.create(title=f'Исследование {index}', content='Текст')
+            UserProfile.objects.create(user=User.objects.create(username=f'learner{index}'))
+            LessonCompletion.objects.create(userprofile=self.profile, lesson=lesson)
+
+    def url(self, name):
+        lesson = Lesson.objects.order_by('pk').first()
+        args = {
+            'admin:core_lesson_change': [lesson.pk],
+            'admin:core_task_change': [Task.objects.order_by('pk').first().pk],
+            'admin:core_userprofile_change': [self.profile.pk],
+            'admin:auth_user_change': [self.profile.user_id],
+        }.get(name, [])
+        return reverse(name, args=args)
+
+    def count_queries(self, name):
+        url = self.url(name)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, name)
+        return len(queries)
+
+    def test_budgets_do_not_grow_with_rows(self):
+        self.grow(3)
+        # Первый запрос заполняет кеш типов содержимого
+        for name in ADMIN_QUERY_BUDGETS:
+            self.count_queries(name)
+        small = {name: self.count_queries(name) for name in ADMIN_QUERY_BUDGETS}
+        self.grow(30)
+        for name, budget in ADMIN_QUERY_BUDGETS.items():
+            with self.subTest(name):
+                queries = self.count_queries(name)
+                self.assertLessEqual(queries, budget)
+                self.assertEqual(queries, small[name])
+
+    def test_changelist_does_not_read_full_text(self):
+        self.grow(3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:core_lesson_changelist'))
+        self.assertNotIn('"content"', queries[-1]['sql'])
+
+    def test_profile_form_does_not_list_all_lessons(self):
+        self.grow(3)
+        for name in ('admin:core_userprofile_change', 'admin:auth_user_change'):
+            response = self.client.get(self.url(name))
+            self.assertNotContains(response, 'name="completed_lessons"')
+            self.assertNotContains(response, 'name="userprofile-0-completed_lessons"')
+
+    def test_progress_inline_is_paginated(self):
+        self.grow(30)
+        url = self.url('admin:core_userprofile_change')
+        response = self.client.get(url)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 25)
+        self.assertContains(response, 'Страница 1 из 2')
+
+        response = self.client.get(url, {f'{formset.prefix}-page': 2})
+        self.assertEqual(len(response.context['inline_admin_formsets'][0].formset.forms), 5)
+
+    def test_removing_completion_goes_through_relation(self):
+        self.grow(2)
+        response = self.client.get(self.url('admin:core_userprofile_change'))
+        formset = response.context['inline_admin_formsets'][0].formset
+        data = {
+            'user': self.profile.user_id, 'achievements': '',
+            f'{formset.prefix}-TOTAL_FORMS': 2, f'{formset.prefix}-INITIAL_FORMS': 2,
+        }
+        for index, form in enumerate(formset.forms):
+            data[f'{formset.prefix}-{index}-id'] = form.instance.pk
+            data[f'{formset.prefix}-{index}-userprofile'] = self.profile.pk
+        data[f'{formset.prefix}-0-DELETE'] = 'on'
+        with mock.patch('core.leaderboard.schedule') as schedule:
+            response = self.client.post(self.url('admin:core_userprofile_change'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.profile.completions.count(), 1)
+        self.assertTrue(schedule.called)
+
+    def test_lesson_filter_lists_only_selected_theme(self):
+        self.grow(5)
+        theme = Theme.objects.order_by('pk').last()
+        response = self.client.get(reverse('admin:core_lesson_changelist'), {'theme__id__exact': theme.pk})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        choices = list(response.context['cl'].filter_specs[0].lookup_choices)
+        self.assertEqual(choices, [(theme.pk, theme.title)])
+
+
+class EstimatedCountTests(TestCase):
+
+    def test_falls_back_to_exact_count_without_statistics(self):
+        Theme.objects.create(title='Тема', description='Описание')
+        paginator = EstimatedCountPaginator(Theme.objects.all(), 10)
+        self.assertEqual(paginator.count, 1)
+
+    def test_uses_estimate_for_large_tables(self):
+        with mock.patch('core.admin_performance.estimate_count', return_value=2_000_000):
+            paginator = EstimatedCountPaginator(Theme.objects.all(), 100)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.num_pages, 20_000)
@@ -0,0 +1,65 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.models import Theme, Lesson, Task, UserProfile
+
+
+@override_settings(ROOT_URLCONF='core.tests.async_urls')
+class AsyncCatalogViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Сигналы оповещения', content='Текст')
+        Task.objects.create(lesson=cls.lesson, title='Тест по сигналам', description='Описание')
+        cls.user = User.objects.create_user('learner', password='pass')
+        profile, _ = UserProfile.objects.get_or_create(user=cls.user)
+        profile.completed_lessons.add(cls.lesson)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_is_routed_to_async_views(self):
+        for name in ('index', 'themes', 'research'):
+            self.assertTrue(iscoroutinefunction(resolve(reverse(name)).func))
+
+    async def test_pages_render(self):
+        pages = {
+            reverse('index'): 'Гражданская оборона',
+            reverse('themes'): 'Гражданская оборона',
+            reverse('research'): '',
+            reverse('theme_detail', kwargs={'pk': self.theme.pk}): 'Сигналы оповещения',
+            reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk}): 'Тест по сигналам',
+        }
+        for url, text in pages.items():
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, text)
+
+    async def test_anonymous_page_cache_and_conditional_get(self):
+        url = reverse('theme_detail', kwargs={'pk': self.theme.pk})
+        first = await self.async_client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual((await self.async_client.get(url))['X-Cache'], 'HIT')
+        response = await self.async_client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_missing_objects_are_404(self):
+        response = await self.async_client.get(reverse('theme_detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('lesson_detail', kwargs={'lesson_id': 999}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_logged_in_user_sees_own_progress(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk}))
+        self.assertNotIn('X-Cache', response)
+        self.assertContains(response, 'Пройден')
+
+    async def test_server_timing_counts_async_queries(self):
+        response = await self.async_client.get(reverse('themes'))
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
@@ -0,0 +1,153 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import audit
+from core.models import AuditLog, Lesson, Theme, UserProfile
+
+
+class AuditWriterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.batches = []
+        self.flushed = threading.Event()
+
+    def _flush(self, batch):
+        self.batches.append(list(batch))
+        self.flushed.set()
+
+    def _writer(self, **kwargs):
+        options = {'batch_size': 3, 'flush_interval': 10.0, 'max_queue': 100, 'enqueue_timeout': 0.01}
+        options.update(kwargs)
+        writer = audit.AuditWriter(self._flush, **options)
+        self.addCleanup(writer.close)
+        return writer
+
+    def test_flushes_full_batch_without_waiting_for_interval(self):
+        writer = self._writer()
+        for entry in range(3):
+            writer.put(entry)
+        self.assertTrue(self.flushed.wait(2))
+        self.assertEqual(self.batches, [[0, 1, 2]])
+
+    def test_flushes_partial_batch_after_interval(self):
+        writer = self._writer(flush_interval=0.05)
+        writer.put('login')
+        self.assertTrue(self.flushed.wait(2))
+        self.assertEqual(self.batches, [['login']])
+
+    def test_close_flushes_remainder(self):
+        writer = self._writer()
+        writer.put('a')
+        writer.put('b')
+        writer.close()
+        self.assertEqual(self.batches, [['a', 'b']])
+
+    def test_full_queue_writes_synchronously(self):
+        release = threading.Event()
+
+        def slow_flush(batch):
+            release.wait(2)
+            self._flush(batch)
+
+        writer = audit.AuditWriter(slow_flush, batch_size=1, flush_interval=10.0,
+                                   max_queue=1, enqueue_timeout=0.01)
+        self.addCleanup(writer.close)
+        writer.put(1)  # поток забирает и зависает на записи
+        time.sleep(0.05)
+        writer.put(2)  # занимает единственное место в очереди
+        with self.assertLogs('core.audit', 'WARNING'):
+            started = threading.Thread(target=writer.put, args=(3,))
+            started.start()
+            time.sleep(0.1)
+            release.set()
+            started.join(2)
+        writer.close()
+        self.assertCountEqual([entry for batch in self.batches for entry in batch], [1, 2, 3])
+
+    def test_failed_batch_is_counted(self):
+        def broken_flush(batch):
+            raise RuntimeError('db is down')
+
+        writer = audit.AuditWriter(broken_flush, batch_size=2, flush_interval=10.0,
+                                   max_queue=10, enqueue_timeout=0.01)
+        with self.assertLogs('core.audit', 'ERROR'):
+            writer.put(1)
+            writer.put(2)
+            writer.close()
+        self.assertEqual(writer.dropped, 2)
+
+
+@override_settings(AUDIT_ASYNC=False)
+class AuditEventsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Тема', description='Описание')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Урок', content='Текст')
+        cls.user = User.objects.create_user('learner', password='pass')
+        UserProfile.objects.get_or_create(user=cls.user)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+    def test_login_is_recorded_with_client_details(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('login'), {'username': 'learner', 'password': 'pass'},
+                             REMOTE_ADDR='192.0.2.10', HTTP_USER_AGENT='pytest')
+        entry = AuditLog.objects.get(action=audit.LOGIN)
+        self.assertEqual(entry.user_id, self.user.pk)
+        self.assertEqual(entry.ip_address, '192.0.2.10')
+        self.assertEqual(entry.user_agent, 'pytest')
+
+    def test_forwarded_for_is_ignored_unless_trusted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('login'), {'username': 'learner', 'password': 'pass'},
+                             REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(AuditLog.objects.get(action=audit.LOGIN).ip_address, '10.0.0.1')
+
+    def test_lesson_completion_toggle(self):
+        self.client.force_login(self.user)
+        url = reverse('mark_lesson_completed', kwargs={'lesson_id': self.lesson.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        actions = list(AuditLog.objects.order_by('id').values_list('action', 'user_id', 'record_id'))
+        self.assertEqual(actions, [
+            (audit.LESSON_COMPLETED, self.user.pk, self.lesson.pk),
+            (audit.LESSON_UNCOMPLETED, self.user.pk, self.lesson.pk),
+        ])
+
+    def test_admin_edit_records_changed_fields_only(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_theme_change', args=[self.theme.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'title': 'Новая тема', 'description': 'Описание', 'order': 0})
+        self.assertEqual(response.status_code, 302)
+        entry = AuditLog.objects.get(action=audit.UPDATE)
+        self.assertEqual(entry.user_id, self.admin.pk)
+        self.assertEqual(entry.table_name, 'core_theme')
+        self.assertEqual(entry.record_id, self.theme.pk)
+        self.assertEqual(entry.old_values, {'title': 'Тема'})
+        self.assertEqual(entry.new_values, {'title': 'Новая тема'})
+
+    def test_admin_delete_keeps_old_values(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_lesson_delete', args=[self.lesson.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'post': 'yes'})
+        entry = AuditLog.objects.get(action=audit.DELETE)
+        self.assertEqual(entry.record_id, self.lesson.pk)
+        self.assertEqual(entry.old_values['title'], 'Урок')
+
+    def test_event_waits_for_commit(self):
+        audit.record(audit.LOGIN, user=self.user)
+        self.assertFalse(AuditLog.objects.exists())
+
+    @override_settings(AUDIT_ENABLED=False)
+    def test_disabled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('login'), {'username': 'learner', 'password': 'pass'})
+        self.assertFalse(AuditLog.objects.exists())
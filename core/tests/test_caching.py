@@ -0,0 +1,133 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import caching
+from core.models import Theme, Lesson, Task, UserProfile
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Средства защиты', content='Текст')
+        Task.objects.create(lesson=cls.lesson, title='Надеть противогаз', description='На время')
+        cls.user = User.objects.create_user('learner', password='pass')
+        UserProfile.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_served_from_cache(self):
+        url = reverse('theme_detail', kwargs={'pk': self.theme.pk})
+        self.assertEqual(self.client.get(url)[caching.CACHE_STATUS_HEADER], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response[caching.CACHE_STATUS_HEADER], 'HIT')
+        self.assertContains(response, 'Средства защиты')
+
+    def test_save_bumps_generation_and_invalidates_page(self):
+        url = reverse('theme_detail', kwargs={'pk': self.theme.pk})
+        self.client.get(url)
+        Lesson.objects.create(theme=self.theme, title='Укрытия', content='Текст')
+        response = self.client.get(url)
+        self.assertEqual(response[caching.CACHE_STATUS_HEADER], 'MISS')
+        self.assertContains(response, 'Укрытия')
+
+    def test_delete_invalidates_page(self):
+        url = reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk})
+        self.assertContains(self.client.get(url), 'Надеть противогаз')
+        Task.objects.all().delete()
+        self.assertNotContains(self.client.get(url), 'Надеть противогаз')
+
+    def test_cascade_delete_work_does_not_grow_with_children(self):
+        profile = UserProfile.objects.get(user=self.user)
+
+        def delete_theme(lessons):
+            theme = Theme.objects.create(title=f'Тема из {lessons} уроков', description='')
+            for number in range(lessons):
+                lesson = Lesson.objects.create(theme=theme, title=f'Урок {number}', content='Текст')
+                Task.objects.create(lesson=lesson, title='Задание', description='Текст')
+                profile.completed_lessons.add(lesson)
+            with CaptureQueriesContext(connection) as queries, \
+                    mock.patch('core.caching._bump', wraps=caching._bump) as bump:
+                theme.delete()
+            return len(queries), bump.call_count
+
+        # Счётчики удаляемых родителей не обновляются, отметки читаются одним
+        # запросом на тему, поколения увеличиваются один раз на модель
+        self.assertEqual(delete_theme(2), delete_theme(6))
+        self.assertEqual(delete_theme(1)[1], 3)
+
+    def test_unrelated_model_keeps_page(self):
+        self.client.get(reverse('research'))
+        Lesson.objects.create(theme=self.theme, title='Укрытия', content='Текст')
+        self.assertEqual(self.client.get(reverse('research'))[caching.CACHE_STATUS_HEADER], 'HIT')
+
+    def test_query_string_is_part_of_key(self):
+        url = reverse('themes')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, {'cursor': 'x'})[caching.CACHE_STATUS_HEADER], 'MISS')
+
+    def test_authenticated_user_gets_shared_fragment_only(self):
+        self.client.force_login(self.user)
+        url = reverse('theme_detail', kwargs={'pk': self.theme.pk})
+        with self.assertNumQueries(5):
+            # валидатор ETag, пользователь, прогресс, тема, уроки (сессия — из кеша)
+            response = self.client.get(url)
+        self.assertNotIn(caching.CACHE_STATUS_HEADER, response)
+        with self.assertNumQueries(1):
+            # только пользователь: тема, уроки и прогресс из кеша
+            self.client.get(url)
+
+    def test_pending_messages_bypass_page_cache(self):
+        url = reverse('index')
+        self.client.get(url)
+        self.client.get(reverse('logout'))  # кладёт flash-сообщение
+        response = self.client.get(url)
+        self.assertNotIn(caching.CACHE_STATUS_HEADER, response)
+        self.assertContains(response, 'Вы успешно вышли из системы.')
+
+
+class GetOrBuildTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_is_served_while_another_process_rebuilds(self):
+        cache.set('k', ('old', time.time() - 1), 60)
+        cache.add(caching._lock_key('k'), 1)
+        builder = mock.Mock(return_value='new')
+        self.assertEqual(caching.get_or_build('k', builder, 60), 'old')
+        builder.assert_not_called()
+
+    def test_stale_value_is_rebuilt_by_lock_owner(self):
+        cache.set('k', ('old', time.time() - 1), 60)
+        self.assertEqual(caching.get_or_build('k', lambda: 'new', 60), 'new')
+        self.assertEqual(cache.get('k')[0], 'new')
+        self.assertIsNone(cache.get(caching._lock_key('k')))
+
+    def test_miss_waits_for_lock_owner(self):
+        cache.add(caching._lock_key('k'), 1)
+        builder = mock.Mock(return_value='own')
+
+        def owner_finishes(seconds):
+            cache.set('k', ('built', time.time() + 60), 60)
+
+        with mock.patch('core.caching.time.sleep', side_effect=owner_finishes):
+            self.assertEqual(caching.get_or_build('k', builder, 60), 'built')
+        builder.assert_not_called()
+
+    def test_generation_survives_eviction_without_reuse(self):
+        before = caching.get_generations(Theme)
+        caching.bump_generation(Theme)
+        self.assertNotEqual(caching.get_generations(Theme), before)
+        cache.clear()
+        self.assertNotEqual(caching.get_generations(Theme), before)
@@ -0,0 +1,79 @@
+import brotli
+from django.contrib.auth.models import User
+from django.template import engines
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Theme
+from core.template_loaders import minify
+
+
+class MinifyTests(TestCase):
+
+    def test_indentation_and_comments_are_removed(self):
+        source = '<div>\n    <!-- Заголовок -->\n    <h1>Темы</h1>\n\n    <p>Текст</p>\n</div>'
+        self.assertEqual(minify(source), '<div>\n\n<h1>Темы</h1>\n\n<p>Текст</p>\n</div>')
+
+    def test_line_count_is_kept_for_template_errors(self):
+        source = '<ul>\n        <li>{{ a }}</li>\n\n\n        <li>{{ b }}</li>\n</ul>\n'
+        self.assertEqual(minify(source).count('\n'), source.count('\n'))
+
+    def test_whitespace_sensitive_blocks_are_kept(self):
+        source = '<div>\n    <pre>  код\n      с отступом</pre>\n    <textarea name="t">\n  текст\n</textarea>\n</div>'
+        minified = minify(source)
+        self.assertIn('<pre>  код\n      с отступом</pre>', minified)
+        self.assertIn('<textarea name="t">\n  текст\n</textarea>', minified)
+
+    def test_templates_are_cached_and_minified(self):
+        engine = engines.all()[0].engine
+        self.assertEqual(
+            [loader.__class__.__module__ for loader in engine.template_loaders],
+            ['django.template.loaders.cached'],
+        )
+        self.assertIs(engine.get_template('core/themes.html'), engine.get_template('core/themes.html'))
+        response = self.client.get(reverse('themes'))
+        self.assertNotIn(b'\n    ', response.content)
+        self.assertNotIn('<!-- Список тем -->'.encode(), response.content)
+
+
+class CompressionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(5):
+            Theme.objects.create(title=f'Тема {number}', description='Описание ' * 30)
+        cls.user = User.objects.create_user('learner', password='pass')
+
+    def test_anonymous_pages_use_brotli(self):
+        response = self.client.get(reverse('themes'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Тема 4', brotli.decompress(response.content).decode())
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_refused_brotli_falls_back_to_gzip(self):
+        response = self.client.get(reverse('themes'), HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Encoding', self.client.get(reverse('themes'), HTTP_ACCEPT_ENCODING='identity'))
+
+    def test_pages_with_secrets_use_padded_gzip(self):
+        # Форма с CSRF-токеном
+        response = self.client.get(reverse('login'), HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        # Страница вошедшего пользователя: длина меняется от ответа к ответу
+        self.client.force_login(self.user)
+        lengths = {
+            len(self.client.get(reverse('themes'), HTTP_ACCEPT_ENCODING='br, gzip').content) for _ in range(10)
+        }
+        self.assertGreater(len(lengths), 1)
+
+    def test_short_responses_are_not_compressed(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('leaderboard'), {'theme': 'x'}, HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_stylesheet_replaces_inline_styles_in_lists(self):
+        response = self.client.get(reverse('themes'))
+        self.assertContains(response, 'core/css/site.css')
+        self.assertContains(response, '<div class="theme-card">', count=5)
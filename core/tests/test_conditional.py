@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.models import Theme, Lesson, Task, UserProfile, ResearchArticle
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Средства защиты', content='Текст')
+        cls.task = Task.objects.create(lesson=cls.lesson, title='Надеть противогаз', description='На время')
+        ResearchArticle.objects.create(title='Статистика', content='Цифры')
+        cls.user = User.objects.create_user('learner', password='pass')
+        cls.profile = UserProfile.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.theme_url = reverse('theme_detail', kwargs={'pk': self.theme.pk})
+        self.lesson_url = reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk})
+
+    def _etag(self, url):
+        return self.client.get(url)['ETag']
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        etag = self._etag(self.theme_url)
+        with self.assertTemplateNotUsed('core/theme_detail.html'), self.assertNumQueries(0):
+            response = self.client.get(self.theme_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_for_anonymous(self):
+        last_modified = self.client.get(self.lesson_url)['Last-Modified']
+        response = self.client.get(self.lesson_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.lesson_url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_child_changes_change_parent_validator(self):
+        theme_etag = self._etag(self.theme_url)
+        lesson_etag = self._etag(self.lesson_url)
+        Task.objects.create(lesson=self.lesson, title='Укрыться', description='Быстро')
+        self.assertNotEqual(self._etag(self.theme_url), theme_etag)
+        self.assertNotEqual(self._etag(self.lesson_url), lesson_etag)
+
+    def test_child_delete_changes_validator(self):
+        etag = self._etag(self.lesson_url)
+        self.task.delete()
+        response = self.client.get(self.lesson_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_sibling_changes_change_lesson_validator(self):
+        # Соседние уроки — в боковой панели страницы урока
+        sibling = Lesson.objects.create(theme=self.theme, title='Сигналы', content='Текст', order=1)
+        etag = self._etag(self.lesson_url)
+        sibling.title = 'Сигналы оповещения'
+        sibling.save()
+        response = self.client.get(self.lesson_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Сигналы оповещения')
+        etag = response['ETag']
+        sibling.order = -1
+        sibling.save()
+        self.assertNotEqual(self._etag(self.lesson_url), etag)
+
+    def test_progress_is_part_of_user_validator(self):
+        anonymous_etag = self._etag(self.theme_url)
+        self.client.force_login(self.user)
+        user_etag = self._etag(self.theme_url)
+        self.assertNotEqual(user_etag, anonymous_etag)
+        self.profile.completed_lessons.add(self.lesson)
+        self.assertNotEqual(self._etag(self.theme_url), user_etag)
+
+    def test_user_pages_have_no_last_modified(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('Last-Modified', self.client.get(self.theme_url))
+
+    def test_pending_messages_disable_validator(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('mark_lesson_completed', kwargs={'lesson_id': self.lesson.pk}))
+        response = self.client.get(self.lesson_url)
+        self.assertNotIn('ETag', response)
+        self.assertIn('ETag', self.client.get(self.lesson_url))
+
+    def test_collection_pages_use_etag_only(self):
+        response = self.client.get(reverse('research'))
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        ResearchArticle.objects.all().delete()
+        response = self.client.get(reverse('research'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
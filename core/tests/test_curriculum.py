@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import counters, curriculum
+from core.models import Theme, Lesson, Task
+
+
+class CurriculumTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы', order=1)
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Сигналы оповещения', content='Текст', order=1)
+        Lesson.objects.create(theme=cls.theme, title='Укрытия', content='Текст', order=2)
+        Task.objects.create(lesson=cls.lesson, title='Задание', description='Ответить на вопросы')
+        Task.objects.create(lesson=cls.lesson, title='Задание', description='Составить план')
+        other = Theme.objects.create(title='Медицина', description='Первая помощь', order=2)
+        Lesson.objects.create(theme=other, title='Перевязка', content='Текст')
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def export(self):
+        call_command('export_curriculum', output=self.path, stdout=io.StringIO())
+        with open(self.path, encoding='utf-8') as stream:
+            return [json.loads(line) for line in stream]
+
+    def import_(self, records=None, **options):
+        if records is not None:
+            with open(self.path, 'w', encoding='utf-8') as stream:
+                stream.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        out = io.StringIO()
+        call_command('import_curriculum', self.path, stdout=out, **options)
+        return out.getvalue()
+
+    def tree(self):
+        return [
+            (theme.slug, theme.title, theme.lesson_count, [
+                (lesson.slug, lesson.title, lesson.task_count,
+                 sorted((task.slug, task.description) for task in lesson.tasks.all()))
+                for lesson in theme.lessons.order_by('order', 'pk')
+            ])
+            for theme in Theme.objects.order_by('order', 'pk')
+        ]
+
+    def test_slugs_are_assigned_on_save_and_unique_within_parent(self):
+        self.assertEqual(self.theme.slug, 'гражданская-оборона')
+        self.assertEqual(
+            sorted(self.lesson.tasks.values_list('slug', flat=True)), ['задание', 'задание-2']
+        )
+        duplicate = Theme.objects.create(title='Гражданская оборона', description='Копия')
+        self.assertEqual(duplicate.slug, 'гражданская-оборона-2')
+
+    def test_export_streams_parents_before_children(self):
+        records = self.export()
+        self.assertEqual([record['type'] for record in records], [
+            'theme', 'lesson', 'task', 'task', 'lesson', 'theme', 'lesson',
+        ])
+        self.assertEqual(records[2]['lesson'], 'сигналы-оповещения')
+        self.assertEqual(records[2]['theme'], 'гражданская-оборона')
+
+    def test_round_trip_into_empty_catalog(self):
+        expected = self.tree()
+        self.export()
+        Theme.objects.all().delete()
+        output = self.import_(batch_size=2)
+        self.assertIn('строк/с', output)
+        self.assertEqual(self.tree(), expected)
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        records = self.export()
+        records[0]['title'] = 'Гражданская оборона и защита'
+        records.append({
+            'type': 'lesson', 'theme': 'медицина', 'slug': 'шины', 'title': 'Шины',
+            'content': 'Текст', 'order': 2,
+        })
+        self.import_(records)
+        self.import_()
+
+        self.assertEqual(Theme.objects.count(), 2)
+        self.assertEqual(Lesson.objects.count(), 4)
+        self.assertEqual(Task.objects.count(), 2)
+        self.theme.refresh_from_db()
+        self.assertEqual(self.theme.title, 'Гражданская оборона и защита')
+        self.assertEqual(Theme.objects.get(slug='медицина').lesson_count, 2)
+        # Исходный id сохраняется — ссылки на урок (прогресс) не ломаются
+        self.assertTrue(Lesson.objects.filter(pk=self.lesson.pk, slug='сигналы-оповещения').exists())
+
+    def test_recount_touches_only_wrong_counters(self):
+        Theme.objects.filter(pk=self.theme.pk).update(lesson_count=7)
+        untouched = Theme.objects.get(title='Медицина').updated_at
+        self.assertEqual(counters.recount_lesson_counts(), 1)
+        self.assertEqual(Theme.objects.get(pk=self.theme.pk).lesson_count, 2)
+        self.assertEqual(Theme.objects.get(title='Медицина').updated_at, untouched)
+        self.assertEqual(counters.recount_task_counts(), 0)
+
+    def test_import_is_atomic(self):
+        with self.assertRaisesMessage(CommandError, 'тема «нет-такой» не найдена'):
+            self.import_([
+                {'type': 'theme', 'slug': 'новая', 'title': 'Новая', 'description': ''},
+                {'type': 'lesson', 'theme': 'нет-такой', 'slug': 'урок', 'title': 'Урок', 'content': ''},
+            ])
+        self.assertFalse(Theme.objects.filter(slug='новая').exists())
+
+    def test_bulk_created_rows_get_slugs_on_export(self):
+        Lesson.objects.bulk_create([Lesson(theme=self.theme, title='Укрытия', content='Текст', order=3)])
+        slugs = [record['slug'] for record in self.export() if record['type'] == 'lesson']
+        self.assertIn('укрытия-2', slugs)
+
+    def test_malformed_line_is_reported(self):
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            stream.write('{"type": "theme", "slug": "a"}\nне json\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.import_()
+
+    def test_read_jsonl_skips_blank_lines(self):
+        records = list(curriculum.read_jsonl(io.StringIO('\n{"type": "theme", "slug": "a"}\n\n')))
+        self.assertEqual([record['slug'] for record in records], ['a'])
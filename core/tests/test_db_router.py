@@ -0,0 +1,108 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import caching, db_router
+from core.models import Theme, Lesson, UserProfile
+
+PRIMARY_TITLE = 'Гражданская оборона'
+REPLICA_TITLE = 'Гражданская оборона (старое название)'
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Отложенное увеличение поколений сработало бы посреди чужих тестов
+        patcher = mock.patch('core.caching._bump_after_replica_lag')
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title=PRIMARY_TITLE, description='Основы')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Сигналы оповещения', content='Текст')
+        cls.user = User.objects.create_user('learner', password='pass')
+        UserProfile.objects.get_or_create(user=cls.user)
+        # Реплика отстаёт: переименование темы и новый урок до неё ещё не дошли
+        Theme.objects.using('replica').create(pk=cls.theme.pk, title=REPLICA_TITLE, description='Основы')
+
+    def setUp(self):
+        cache.clear()
+
+    def theme_url(self):
+        return reverse('theme_detail', kwargs={'pk': self.theme.pk})
+
+    def lesson_url(self):
+        return reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk})
+
+    def test_catalog_pages_read_from_replica(self):
+        self.assertContains(self.client.get(self.theme_url()), REPLICA_TITLE)
+        self.assertEqual(self.client.get(self.lesson_url()).status_code, 404)
+
+    def test_sessions_and_users_are_read_from_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.theme_url())
+        self.assertContains(response, REPLICA_TITLE)
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+
+    def test_write_pins_user_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('mark_lesson_completed', kwargs={'lesson_id': self.lesson.pk}))
+        cookie = response.cookies[db_router.PRIMARY_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertTrue(cookie['httponly'])
+
+        response = self.client.get(self.lesson_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Пройден')
+        self.assertContains(self.client.get(self.theme_url()), PRIMARY_TITLE)
+
+    def test_reads_do_not_pin(self):
+        response = self.client.get(self.theme_url())
+        self.assertNotIn(db_router.PRIMARY_PIN_COOKIE, response.cookies)
+
+    def test_profile_page_does_not_pin(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(db_router.PRIMARY_PIN_COOKIE, response.cookies)
+
+    def test_pinned_request_bypasses_catalog_cache(self):
+        self.assertContains(self.client.get(self.theme_url()), REPLICA_TITLE)
+        self.client.cookies[db_router.PRIMARY_PIN_COOKIE] = '1'
+        response = self.client.get(self.theme_url())
+        self.assertContains(response, PRIMARY_TITLE)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_writes_go_to_primary(self):
+        router = db_router.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_write(Theme), 'default')
+        # Вне помеченных view чтение каталога тоже идёт с основной базы
+        self.assertEqual(router.db_for_read(Theme), 'default')
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=0.3)
+class DelayedGenerationBumpTests(SimpleTestCase):
+
+    def test_generation_is_bumped_again_after_replica_lag(self):
+        caching.bump_generation(Theme)
+        generation = caching.get_generations(Theme)
+        deadline = time.monotonic() + 2
+        while caching.get_generations(Theme) == generation and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertNotEqual(caching.get_generations(Theme), generation)
+
+
+class RouterWithoutReplicasTests(SimpleTestCase):
+
+    def test_router_is_transparent(self):
+        router = db_router.PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Theme))
+        self.assertEqual(router.db_for_write(Theme), 'default')
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.downloads import parse_range
+from core.models import Theme, Lesson, Task
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 400  # 102 400 байт — больше одного блока
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+
+    def test_unsupported_ranges_are_ignored(self):
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range('bytes=0-1,5-9', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIs(parse_range('bytes=1000-', 1000), False)
+        self.assertIs(parse_range('bytes=5-1', 1000), False)
+        self.assertIs(parse_range('bytes=-0', 1000), False)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TASK_FILES_OFFLOAD='')
+class TaskDownloadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        theme = Theme.objects.create(title='Тема', description='Описание')
+        lesson = Lesson.objects.create(theme=theme, title='Урок', content='Текст')
+        cls.task = Task.objects.create(
+            lesson=lesson, title='Задание', description='Описание',
+            file=SimpleUploadedFile('manual.bin', CONTENT),
+        )
+        cls.user = User.objects.create_user('learner', password='pass')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('task_download', kwargs={'task_id': self.task.pk})
+
+    def test_checksum_is_computed_at_upload(self):
+        self.assertEqual(self.task.file_size, len(CONTENT))
+        self.assertEqual(self.task.file_sha256, hashlib.sha256(CONTENT).hexdigest())
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['ETag'], f'"{self.task.file_sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=70000-70099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[70000:70100])
+        self.assertEqual(response['Content-Range'], f'bytes 70000-70099/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+    def test_resume_from_offset(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), len(CONTENT))
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(TASK_FILES_OFFLOAD='x-accel')
+    def test_x_accel_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.task.file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{self.task.file_sha256}"')
+
+    async def test_asgi_range_request_is_streamed(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=70000-'})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b''.join(chunks), CONTENT[70000:])
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="manual.bin"')
+
+    def test_anonymous_is_redirected_to_login(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_replacing_file_updates_checksum(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.file = SimpleUploadedFile('other.bin', b'new content')
+        task.save()
+        task.refresh_from_db()
+        self.assertEqual(task.file_size, 11)
+        self.assertEqual(task.file_sha256, hashlib.sha256(b'new content').hexdigest())
+        task.title = 'Без нового файла'
+        task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).file_sha256, task.file_sha256)
+
+    def test_saving_does_not_read_existing_file(self):
+        # Задание из старой базы: файла на диске нет, суммы ещё не посчитаны
+        Task.objects.filter(pk=self.task.pk).update(file='tasks/missing.pdf', file_size=None, file_sha256='')
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'Новое название'
+        task.save()
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.file_size, task.file_sha256), ('Новое название', None, ''))
+
+    def test_missing_file_is_404(self):
+        Task.objects.filter(pk=self.task.pk).update(file='tasks/missing.pdf')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        Task.objects.filter(pk=self.task.pk).update(file_size=None, file_sha256='')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_command_fills_missing_checksums(self):
+        Task.objects.filter(pk=self.task.pk).update(file_size=None, file_sha256='')
+        missing = Task.objects.create(lesson=self.task.lesson, title='Пропавший файл', description='Описание')
+        Task.objects.filter(pk=missing.pk).update(file='tasks/missing.pdf')
+        output, errors = io.StringIO(), io.StringIO()
+        call_command('compute_task_checksums', stdout=output, stderr=errors)
+        self.assertIn('Обновлено заданий: 1, файлов не прочитано: 1', output.getvalue())
+        self.assertIn('tasks/missing.pdf', errors.getvalue())
+        self.assertEqual(Task.objects.get(pk=self.task.pk).file_sha256, hashlib.sha256(CONTENT).hexdigest())
@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Theme, Lesson, Task, UserProfile, LessonCompletion, Achievement, UserAchievement
+
+
+class GradebookExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('teacher', password='pass', is_staff=True)
+        cls.defence = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.medicine = Theme.objects.create(title='Медицина', description='Первая помощь')
+        cls.signals = Lesson.objects.create(theme=cls.defence, title='Сигналы', content='Текст')
+        cls.shelters = Lesson.objects.create(theme=cls.defence, title='Укрытия', content='Текст')
+        cls.bandages = Lesson.objects.create(theme=cls.medicine, title='Перевязка', content='Текст')
+        for lesson, tasks in ((cls.signals, 2), (cls.shelters, 1), (cls.bandages, 3)):
+            for number in range(tasks):
+                Task.objects.create(lesson=lesson, title=f'Задание {number}', description='Текст')
+
+        cls.learner = User.objects.create_user('learner', password='pass', email='learner@example.com')
+        profile = UserProfile.objects.create(user=cls.learner)
+        for title in ('Первый урок', 'Неделя подряд'):
+            UserAchievement.objects.create(
+                userprofile=profile, achievement=Achievement.objects.create(slug=title, title=title),
+            )
+        profile.completed_lessons.add(cls.signals, cls.bandages)
+        profile.completed_lessons.add(cls.shelters, through_defaults={
+            'completed_at': timezone.now() - timedelta(days=30),
+        })
+        # Пользователь без профиля и без отметок тоже попадает в ведомость
+        cls.newcomer = User.objects.create_user('newcomer', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.client.get(reverse('gradebook_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def csv_rows(self, **params):
+        _, content = self.export(**params)
+        return {row['username']: row for row in csv.DictReader(io.StringIO(content.lstrip('﻿')))}
+
+    def test_only_staff_can_export(self):
+        self.client.force_login(self.learner)
+        self.assertEqual(self.client.get(reverse('gradebook_export')).status_code, 403)
+
+    def test_csv_matches_profile_figures(self):
+        response, _ = self.export()
+        self.assertIn('attachment; filename="gradebook-', response['Content-Disposition'])
+        rows = self.csv_rows()
+        self.assertEqual(set(rows), {'teacher', 'learner', 'newcomer'})
+        learner = rows['learner']
+        self.assertEqual(learner['completed_lessons'], '3')
+        self.assertEqual(learner['tasks_completed'], '6')
+        self.assertEqual(learner['days_active'], '1')
+        self.assertEqual(learner['achievements'], 'Первый урок; Неделя подряд')
+        self.assertEqual(rows['newcomer']['completed_lessons'], '0')
+        self.assertEqual(rows['newcomer']['tasks_completed'], '0')
+
+    def test_theme_and_date_filters(self):
+        rows = self.csv_rows(theme=self.defence.pk)
+        self.assertEqual((rows['learner']['completed_lessons'], rows['learner']['tasks_completed']), ('2', '3'))
+
+        week_ago = (timezone.localdate() - timedelta(days=7)).isoformat()
+        rows = self.csv_rows(theme=self.defence.pk, date_from=week_ago)
+        self.assertEqual((rows['learner']['completed_lessons'], rows['learner']['tasks_completed']), ('1', '2'))
+
+        rows = self.csv_rows(date_to=week_ago)
+        self.assertEqual(rows['learner']['completed_lessons'], '1')
+        self.assertIn('newcomer', rows)
+
+    def test_csv_escapes_formulas(self):
+        User.objects.create_user('=HYPERLINK("http://evil")', first_name='@SUM(A1)', last_name='-1+2')
+        rows = self.csv_rows()
+        row = rows["'=HYPERLINK(\"http://evil\")"]
+        self.assertEqual((row['first_name'], row['last_name']), ("'@SUM(A1)", "'-1+2"))
+        # В JSONL значения остаются как есть
+        _, content = self.export(format='jsonl')
+        self.assertIn('=HYPERLINK("http://evil")', {json.loads(line)['username'] for line in content.splitlines()})
+
+    def test_jsonl_format(self):
+        response, content = self.export(format='jsonl')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = {row['username']: row for row in map(json.loads, content.splitlines())}
+        self.assertEqual(rows['learner']['achievements'], ['Первый урок', 'Неделя подряд'])
+        self.assertEqual(rows['learner']['completed_lessons'], 3)
+
+    def test_invalid_filters(self):
+        response = self.client.get(reverse('gradebook_export'), {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('gradebook_export'), {'theme': 999999})
+        self.assertEqual(response.status_code, 400)
+        # Крайние даты календаря не помещаются в datetime после перевода в UTC
+        for params in ({'date_to': '9999-12-31'}, {'date_from': '0001-01-01'}):
+            self.assertEqual(self.client.get(reverse('gradebook_export'), params).status_code, 400)
+        rows = self.csv_rows(date_from='0001-01-02', date_to='9999-12-29')
+        self.assertEqual(rows['learner']['completed_lessons'], '3')
+
+    def test_queries_do_not_grow_with_users(self):
+        for number in range(20):
+            user = User.objects.create_user(f'student{number}')
+            profile = UserProfile.objects.create(user=user)
+            profile.completed_lessons.add(self.signals)
+        response = self.client.get(reverse('gradebook_export'))
+        # Строки пользователей и их достижения — два курсора на всю ведомость
+        with self.assertNumQueries(2):
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content.count(b'\n'), 24)
+
+    async def test_asgi_streams_without_collecting_rows(self):
+        # Синхронный итератор Django 4.2 под ASGI собрал бы в список целиком
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        response = await self.async_client.get(reverse('gradebook_export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        rows = {row['username']: row for row in csv.DictReader(io.StringIO(content.lstrip('\ufeff')))}
+        self.assertEqual(rows['learner']['completed_lessons'], '3')
+
+    def test_existing_completions_keep_unknown_time(self):
+        LessonCompletion.objects.filter(lesson=self.signals).update(completed_at=None)
+        rows = self.csv_rows()
+        self.assertEqual(rows['learner']['completed_lessons'], '3')
+        rows = self.csv_rows(date_from=timezone.localdate().isoformat())
+        self.assertEqual(rows['learner']['completed_lessons'], '1')
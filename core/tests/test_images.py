@@ -0,0 +1,88 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import images
+from core.models import Theme
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def _upload(name='photo.png', size=(2000, 1000), mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 50, 50, 128) if mode == 'RGBA' else (200, 50, 50)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def _create_theme(self, **kwargs):
+        # Задача ставится в очередь после фиксации транзакции; в тестах Celery eager
+        with self.captureOnCommitCallbacks(execute=True):
+            theme = Theme.objects.create(title='Тема', description='Описание', image=_upload(**kwargs))
+        theme.refresh_from_db()
+        return theme
+
+    def test_variants_are_built_after_upload(self):
+        theme = self._create_theme()
+        data = theme.image_variants
+        self.assertEqual(data['source'], theme.image.name)
+        self.assertEqual(
+            {name: variant['width'] for name, variant in data['variants'].items()},
+            {'thumb': 320, 'card': 800, 'full': 1600},
+        )
+        card = data['variants']['card']
+        self.assertEqual(card['height'], 400)
+        with default_storage.open(card['webp']) as handle:
+            self.assertEqual(Image.open(handle).format, 'WEBP')
+        with default_storage.open(card['jpeg']) as handle:
+            self.assertEqual(Image.open(handle).mode, 'RGB')
+
+    def test_small_images_are_not_upscaled(self):
+        theme = self._create_theme(size=(500, 250), mode='RGB')
+        widths = sorted(variant['width'] for variant in theme.image_variants['variants'].values())
+        self.assertEqual(widths, [320, 500])
+
+    def test_replacing_image_rebuilds_and_removes_old_variants(self):
+        theme = self._create_theme()
+        old_files = list(images.variant_files(theme.image_variants))
+        theme.image = _upload('other.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            theme.save()
+        theme.refresh_from_db()
+        self.assertEqual(theme.image_variants['source'], theme.image.name)
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+
+    def test_template_falls_back_to_original_until_variants_exist(self):
+        theme = Theme.objects.create(title='Тема', description='Описание', image=_upload())
+        template = Template('{% load images %}{% responsive_image theme.image theme.image_variants alt="x" %}')
+        html = template.render(Context({'theme': theme}))
+        self.assertHTMLEqual(
+            html, f'<img src="{theme.image.url}" alt="x" loading="lazy" decoding="async">'
+        )
+
+    def test_template_renders_srcset(self):
+        theme = self._create_theme()
+        response = self.client.get(reverse('themes'))
+        card = theme.image_variants['variants']['card']
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f'{default_storage.url(card["webp"])} 800w')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, theme.image.url + '"')
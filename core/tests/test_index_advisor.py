@@ -0,0 +1,77 @@
+import io
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core import index_advisor
+from core.models import Theme, Lesson, Task, UserProfile, LessonCompletion, ResearchArticle, UserAchievement
+from core.urls import urlpatterns
+
+
+def sql_with_params(queryset):
+    return queryset.query.sql_with_params()
+
+
+class IndexAdvisorTests(TestCase):
+
+    def test_bare_boolean_filter_becomes_partial_condition(self):
+        sql, params = sql_with_params(ResearchArticle.objects.filter(is_published=True).order_by('-created_at', '-id'))
+        proposal = index_advisor.propose(sql, params, 'core_researcharticle')
+        self.assertEqual(proposal.columns, ('-created_at', '-id'))
+        self.assertEqual(proposal.condition, (('is_published', ('', True)),))
+        self.assertEqual(
+            index_advisor.index_definition(proposal),
+            "core.ResearchArticle: models.Index(fields=['-created_at', '-id'], "
+            "name='core_rese_created_at_id_idx', condition=models.Q(is_published=True))",
+        )
+
+    def test_equality_columns_precede_ordering(self):
+        sql, params = sql_with_params(UserAchievement.objects.filter(userprofile_id=1).order_by('awarded_at', 'pk'))
+        proposal = index_advisor.propose(sql, params, 'core_userachievement')
+        self.assertEqual(proposal.columns, ('userprofile_id', 'awarded_at', 'id'))
+        self.assertEqual(proposal.condition, ())
+
+    def test_substring_search_needs_no_btree(self):
+        sql, _ = sql_with_params(Lesson.objects.filter(title__icontains='защит'))
+        self.assertTrue(index_advisor.substring_search(sql, 'core_lesson'))
+
+    def test_is_covered(self):
+        proposal = index_advisor.Proposal('core_lesson', ('theme_id', 'order'), ())
+        self.assertTrue(index_advisor.is_covered(proposal, [['theme_id', 'order', 'created_at', 'id']]))
+        self.assertFalse(index_advisor.is_covered(proposal, [['order', 'theme_id']]))
+        # По составному индексу с логическим столбцом впереди SQLite не ищет
+        partial = index_advisor.Proposal('core_researcharticle', ('-created_at', '-id'), (('is_published', ('', True)),))
+        self.assertFalse(index_advisor.is_covered(partial, [['is_published', 'created_at', 'id']]))
+        self.assertTrue(index_advisor.is_covered(partial, [['created_at', 'id']]))
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+    def test_sqlite_plan_findings(self):
+        ResearchArticle.objects.create(title='Цифры', content='Статистика')
+        ResearchArticle.objects.create(title='Черновик', content='Скрыто', is_published=False)
+        sql, params = sql_with_params(ResearchArticle.objects.filter(is_published=True).order_by('-created_at', '-id'))
+        plan, findings = index_advisor.explain(connection, sql, params, min_rows=0)
+        self.assertIn('core_research_published_idx', plan)
+        self.assertEqual(findings, [])
+        sql, params = sql_with_params(ResearchArticle.objects.order_by('excerpt'))
+        _, findings = index_advisor.explain(connection, sql, params, min_rows=0)
+        self.assertEqual({finding.kind for finding in findings}, {'seq_scan', 'sort'})
+
+
+class AdviseIndexesCommandTests(TestCase):
+
+    def test_drives_every_view_and_rolls_back(self):
+        theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        lesson = Lesson.objects.create(theme=theme, title='Средства защиты', content='Текст')
+        Task.objects.create(lesson=lesson, title='Задание', description='Текст')
+        UserProfile.objects.create(user=User.objects.create(username='learner'))
+        output = io.StringIO()
+        call_command('advise_indexes', stdout=output)
+        for pattern in urlpatterns:
+            if pattern.name:
+                self.assertIn(f'\n{pattern.name} (', '\n' + output.getvalue())
+        self.assertIn('Новых индексов не требуется', output.getvalue())
+        self.assertFalse(LessonCompletion.objects.exists())
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
@@ -0,0 +1,164 @@
+import io
+import re
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import leaderboard
+from core.tasks import update_leaderboard
+from core.models import Theme, Lesson, UserProfile, LessonCompletion, LeaderboardEntry, LeaderboardBucket
+
+
+def snapshot():
+    entries = set(LeaderboardEntry.objects.filter(score__gt=0).values_list('scope', 'userprofile_id', 'score'))
+    buckets = set(LeaderboardBucket.objects.filter(users__gt=0).values_list('scope', 'score', 'users'))
+    return entries, buckets
+
+
+# Отметки о прохождении пишутся и в журнал аудита; фоновый поток писал бы
+# в тестовую базу параллельно с тестом
+@override_settings(AUDIT_ASYNC=False)
+class LeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.defence = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.medicine = Theme.objects.create(title='Медицина', description='Первая помощь')
+        cls.lessons = [
+            Lesson.objects.create(theme=cls.defence, title=f'Урок {number}', content='Текст', order=number)
+            for number in range(3)
+        ]
+        cls.bandages = Lesson.objects.create(theme=cls.medicine, title='Перевязка', content='Текст')
+        cls.profiles = [
+            UserProfile.objects.create(user=User.objects.create_user(f'learner{number}', password='pass'))
+            for number in range(4)
+        ]
+
+    def complete(self, profile, *lessons):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.completed_lessons.add(*lessons)
+
+    def uncomplete(self, profile, *lessons):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.completed_lessons.remove(*lessons)
+
+    def scores(self, scope=leaderboard.OVERALL):
+        return [(entry.position, entry.userprofile.user.username, entry.score) for entry in leaderboard.top(scope)]
+
+    def test_scores_follow_completions(self):
+        first, second = self.profiles[:2]
+        self.complete(first, *self.lessons, self.bandages)
+        self.complete(second, self.lessons[0])
+        self.assertEqual(self.scores(), [(1, 'learner0', 4), (2, 'learner1', 1)])
+        self.assertEqual(self.scores(self.defence.pk), [(1, 'learner0', 3), (2, 'learner1', 1)])
+        self.assertEqual(self.scores(self.medicine.pk), [(1, 'learner0', 1)])
+
+        # Повторная отметка и снятие неотмеченного урока счёт не меняют
+        self.complete(second, self.lessons[0])
+        self.uncomplete(second, self.bandages)
+        self.uncomplete(first, self.lessons[0], self.bandages)
+        self.assertEqual(self.scores(), [(1, 'learner0', 2), (2, 'learner1', 1)])
+        self.assertEqual(self.scores(self.medicine.pk), [])
+
+    def test_ties_share_a_place(self):
+        first, second, third, _ = self.profiles
+        self.complete(first, *self.lessons)
+        self.complete(second, self.lessons[0], self.lessons[1])
+        self.complete(third, self.lessons[1], self.lessons[2])
+        self.assertEqual([place for place, _, _ in self.scores()], [1, 2, 2])
+        self.assertEqual(leaderboard.rank(third.pk), leaderboard.Rank(position=2, score=2, participants=3))
+        self.assertIsNone(leaderboard.rank(self.profiles[3].pk))
+
+    def test_reverse_side_and_clear(self):
+        first, second = self.profiles[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].userprofile_set.add(first, second)
+        self.complete(first, self.bandages)
+        self.assertEqual(self.scores(), [(1, 'learner0', 2), (2, 'learner1', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].userprofile_set.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.completed_lessons.clear()
+        self.assertEqual(self.scores(), [])
+        self.assertEqual(snapshot(), (set(), set()))
+
+    def test_lesson_delete_and_move(self):
+        first, second = self.profiles[:2]
+        self.complete(first, self.lessons[0], self.lessons[1])
+        self.complete(second, self.lessons[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[1].theme = self.medicine
+            self.lessons[1].save()
+        self.assertEqual(self.scores(self.medicine.pk), [(1, 'learner0', 1), (1, 'learner1', 1)])
+        self.assertEqual(self.scores(self.defence.pk), [(1, 'learner0', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[1].delete()
+        self.assertEqual(self.scores(), [(1, 'learner0', 1)])
+
+    def test_incremental_matches_rebuild(self):
+        first, second, third, fourth = self.profiles
+        self.complete(first, *self.lessons)
+        self.complete(second, self.bandages, self.lessons[2])
+        self.complete(third, self.lessons[0])
+        self.uncomplete(first, self.lessons[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            fourth.delete()
+            self.medicine.delete()
+        incremental = snapshot()
+
+        call_command('rebuild_leaderboard', stdout=io.StringIO())
+        self.assertEqual(snapshot(), incremental)
+
+    def test_locks_follow_scope_and_score_order(self):
+        first, second = self.profiles[:2]
+        self.complete(first, self.lessons[0], self.bandages)
+        self.complete(second, self.lessons[0])
+        with CaptureQueriesContext(connection) as queries:
+            leaderboard.apply([second.pk, first.pk], {self.medicine.pk: 1, self.defence.pk: 1}, 1)
+        bucket = re.compile(r'"scope" = (\d+) AND "core_leaderboardbucket"."score" = (\d+)')
+        buckets = [
+            tuple(map(int, bucket.search(query['sql']).groups()))
+            for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "core_leaderboardbucket"')
+        ]
+        # Взаимной блокировки нет, если все задачи берут корзины в одном порядке
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual(len(buckets), len(set(buckets)))
+        self.assertEqual(snapshot()[1], {
+            (leaderboard.OVERALL, 3, 1), (leaderboard.OVERALL, 4, 1),
+            (self.defence.pk, 2, 2), (self.medicine.pk, 1, 1), (self.medicine.pk, 2, 1),
+        })
+        self.assertIn(OperationalError, update_leaderboard.autoretry_for)
+
+    def test_queries_do_not_grow_with_users(self):
+        LessonCompletion.objects.bulk_create([
+            LessonCompletion(userprofile=profile, lesson=self.lessons[0]) for profile in self.profiles
+        ])
+        leaderboard.rebuild()
+        with self.assertNumQueries(1):
+            leaderboard.top()
+        with self.assertNumQueries(2):
+            leaderboard.rank(self.profiles[0].pk)
+
+    def test_page_shows_top_and_my_rank(self):
+        first, second = self.profiles[:2]
+        self.complete(first, *self.lessons)
+        self.complete(second, self.lessons[0])
+
+        response = self.client.get(reverse('leaderboard'))
+        self.assertContains(response, 'learner0')
+        self.assertIsNone(response.context['my_rank'])
+
+        self.client.force_login(second.user)
+        response = self.client.get(reverse('leaderboard'), {'theme': self.defence.pk})
+        self.assertEqual(response.context['my_rank'].position, 2)
+        self.assertContains(response, 'Ваше место: <strong>2</strong> из 2')
+
+        self.assertEqual(self.client.get(reverse('leaderboard'), {'theme': 999999}).status_code, 400)
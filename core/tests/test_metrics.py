@@ -0,0 +1,89 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.models import Theme
+
+
+def _server_timing(response):
+    return {
+        match.group(1): match.group(0)
+        for match in re.finditer(r'(\w+);[^,]*', response['Server-Timing'])
+    }
+
+
+class PerformanceMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.staff = User.objects.create_user('editor', password='pass', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.REGISTRY.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('themes'))
+        timing = _server_timing(response)
+        self.assertEqual(set(timing), {'total', 'sql', 'tpl', 'cache'})
+        self.assertRegex(timing['sql'], r'desc="[1-9]\d* queries"')
+        self.assertNotRegex(timing['tpl'], r'dur=0\.0$')
+
+    def test_cache_hits_are_counted(self):
+        self.client.get(reverse('themes'))
+        timing = _server_timing(self.client.get(reverse('themes')))
+        # валидатор ETag и страница целиком
+        self.assertIn('hit=2 miss=0', timing['cache'])
+
+    def test_aggregates_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('themes'))
+        self.client.get('/no-such-page/')
+        text = metrics.REGISTRY.render()
+        self.assertIn('serve_ready_requests_total{view="themes",status="2xx"} 3', text)
+        self.assertIn('serve_ready_requests_total{view="unmatched",status="4xx"} 1', text)
+        self.assertIn('serve_ready_request_duration_seconds_count{view="themes"} 3', text)
+        self.assertIn('serve_ready_request_duration_seconds_bucket{view="themes",le="+Inf"} 3', text)
+        self.assertIn('# TYPE serve_ready_sql_queries_per_request histogram', text)
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_only_counted(self):
+        response = self.client.get(reverse('themes'))
+        self.assertNotIn('Server-Timing', response)
+        text = metrics.REGISTRY.render()
+        self.assertIn('serve_ready_requests_total{view="themes",status="2xx"} 1', text)
+        self.assertNotIn('serve_ready_request_duration_seconds_count{view="themes"}', text)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('themes')))
+
+    def test_metrics_endpoint_access(self):
+        url = reverse('metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR='203.0.113.1').status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class PrometheusFormatTests(SimpleTestCase):
+
+    def test_histogram_is_cumulative_and_labels_are_escaped(self):
+        registry = metrics.Registry()
+        request_metrics = metrics.RequestMetrics()
+        request_metrics.sql_count = 3
+        registry.observe('a"b', 200, 0.02, request_metrics)
+        registry.observe('a"b', 200, 0.3, request_metrics)
+        text = registry.render()
+        self.assertIn('serve_ready_request_duration_seconds_bucket{view="a\\"b",le="0.025"} 1', text)
+        self.assertIn('serve_ready_request_duration_seconds_bucket{view="a\\"b",le="0.5"} 2', text)
+        self.assertIn('serve_ready_sql_queries_per_request_sum{view="a\\"b"} 6.0', text)
@@ -0,0 +1,65 @@
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+
+from core.models import Theme, ResearchArticle
+from core.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Одинаковые order и created_at проверяют, что id разрешает ничьи
+        Theme.objects.bulk_create([
+            Theme(title=f'Тема {number}', description='Описание', order=number // 3)
+            for number in range(10)
+        ])
+
+    def walk(self, paginator):
+        page = paginator.get_page()
+        pages = [page]
+        while page.has_next:
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_forward_walk_visits_every_row_once_in_order(self):
+        paginator = KeysetPaginator(Theme.objects.all(), ('order', 'created_at', 'id'), 4)
+        pages = self.walk(paginator)
+        seen = [theme.pk for page in pages for theme in page]
+        expected = list(Theme.objects.order_by('order', 'created_at', 'id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertFalse(pages[0].has_previous)
+        self.assertFalse(pages[-1].has_next)
+
+    def test_previous_cursor_returns_the_same_page(self):
+        paginator = KeysetPaginator(Theme.objects.all(), ('order', 'created_at', 'id'), 4)
+        first, second, third = self.walk(paginator)
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual([theme.pk for theme in back], [theme.pk for theme in second])
+        back = paginator.get_page(back.previous_cursor)
+        self.assertEqual([theme.pk for theme in back], [theme.pk for theme in first])
+        self.assertFalse(back.has_previous)
+
+    def test_descending_ordering(self):
+        ResearchArticle.objects.bulk_create([
+            ResearchArticle(title=f'Статья {number}', content='Текст') for number in range(5)
+        ])
+        paginator = KeysetPaginator(ResearchArticle.objects.all(), ('-created_at', '-id'), 2)
+        seen = [article.pk for page in self.walk(paginator) for article in page]
+        expected = list(ResearchArticle.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Theme.objects.all(), ('order', 'created_at', 'id'), 4)
+        first = paginator.get_page()
+        page = paginator.get_page(first.next_cursor + 'x')
+        self.assertEqual([theme.pk for theme in page], [theme.pk for theme in first])
+
+    async def test_async_page_matches_sync_page(self):
+        paginator = KeysetPaginator(Theme.objects.all(), ('order', 'created_at', 'id'), 4)
+        first = await paginator.aget_page()
+        second = await paginator.aget_page(first.next_cursor)
+        back = await paginator.aget_page(second.previous_cursor)
+        self.assertEqual([theme.pk for theme in back], [theme.pk for theme in first])
+        self.assertEqual(second.next_cursor, (await sync_to_async(paginator.get_page)(first.next_cursor)).next_cursor)
@@ -0,0 +1,121 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Theme, Lesson, Task, UserProfile, LessonCompletion
+
+
+# Отметки о прохождении пишутся и в журнал аудита; фоновый поток писал бы
+# в тестовую базу параллельно с тестом
+@override_settings(AUDIT_ASYNC=False)
+class ProgressSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        theme = Theme.objects.create(title='Гражданская оборона', description='Основы')
+        cls.lessons = [
+            Lesson.objects.create(theme=theme, title=f'Урок {number}', content='Текст', order=number)
+            for number in range(6)
+        ]
+        Task.objects.create(lesson=cls.lessons[0], title='Задание', description='Текст')
+        cls.user = User.objects.create_user('learner', password='pass')
+        cls.profile = UserProfile.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def sync(self, *operations, expected_status=200):
+        response = self.client.post(
+            reverse('progress_sync'), json.dumps({'operations': list(operations)}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, expected_status)
+        return response.json()
+
+    @staticmethod
+    def op(lesson, completed, moment):
+        return {'lesson_id': lesson.pk, 'completed': completed, 'client_ts': moment.isoformat()}
+
+    def completed(self):
+        return set(self.profile.completions.values_list('lesson_id', flat=True))
+
+    def test_batch_is_applied_with_client_time(self):
+        moment = timezone.now() - timedelta(hours=3)
+        result = self.sync(
+            self.op(self.lessons[0], True, moment),
+            self.op(self.lessons[1], True, moment),
+            self.op(self.lessons[2], False, moment),
+        )
+        self.assertEqual(result['added'], [self.lessons[0].pk, self.lessons[1].pk])
+        self.assertEqual(result['removed'], [])
+        self.assertEqual(result['progress'], {'completed_count': 2, 'tasks_completed': 1, 'total_lessons': 6})
+        self.assertEqual(LessonCompletion.objects.get(lesson=self.lessons[0]).completed_at, moment)
+
+    def test_latest_operation_per_lesson_wins(self):
+        now = timezone.now()
+        result = self.sync(
+            self.op(self.lessons[0], False, now - timedelta(minutes=1)),
+            self.op(self.lessons[0], True, now - timedelta(minutes=5)),
+        )
+        self.assertEqual(result['added'], [])
+        self.assertEqual(self.completed(), set())
+
+    def test_removal_older_than_completion_is_a_conflict(self):
+        now = timezone.now()
+        self.profile.completed_lessons.add(self.lessons[0], self.lessons[1], through_defaults={'completed_at': now})
+        result = self.sync(
+            self.op(self.lessons[0], False, now - timedelta(hours=1)),
+            self.op(self.lessons[1], False, now + timedelta(seconds=1)),
+        )
+        self.assertEqual([conflict['lesson_id'] for conflict in result['conflicts']], [self.lessons[0].pk])
+        self.assertEqual(result['removed'], [self.lessons[1].pk])
+        self.assertEqual(self.completed(), {self.lessons[0].pk})
+
+    def test_future_client_time_is_clamped(self):
+        self.sync(self.op(self.lessons[0], True, timezone.now() + timedelta(days=365)))
+        self.assertLessEqual(LessonCompletion.objects.get().completed_at, timezone.now())
+
+    def test_unknown_lessons_are_reported(self):
+        result = self.sync({'lesson_id': 999999, 'completed': True, 'client_ts': 1767225600})
+        self.assertEqual(result['unknown_lessons'], [999999])
+        self.assertEqual(self.completed(), set())
+
+    def test_invalid_payloads(self):
+        url = reverse('progress_sync')
+        self.assertEqual(self.client.post(url, 'не json', content_type='application/json').status_code, 400)
+        self.sync({'lesson_id': '1', 'completed': True, 'client_ts': 0}, expected_status=400)
+        self.sync({'lesson_id': 1, 'completed': True, 'client_ts': 'вчера'}, expected_status=400)
+        # За пределами дат платформы: OverflowError и OSError, а не 500
+        for client_ts in (1e20, 1e18, -1e18):
+            self.sync({'lesson_id': 1, 'completed': True, 'client_ts': client_ts}, expected_status=400)
+        # Вне диапазона bigint: OverflowError драйвера, а не 500
+        for lesson_id in (2 ** 70, 2 ** 63, 0, -1):
+            self.sync({'lesson_id': lesson_id, 'completed': True, 'client_ts': 0}, expected_status=400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.logout()
+        self.sync(expected_status=401)
+
+    def test_queries_do_not_grow_with_batch(self):
+        moment = timezone.now()
+
+        def count(lessons):
+            LessonCompletion.objects.all().delete()
+            self.profile.completed_lessons.add(self.lessons[-1])
+            operations = [self.op(lesson, True, moment) for lesson in lessons]
+            operations.append(self.op(self.lessons[-1], False, moment + timedelta(seconds=1)))
+            with CaptureQueriesContext(connection) as queries:
+                self.sync(*operations)
+            return len(queries)
+
+        self.assertEqual(count(self.lessons[:1]), count(self.lessons[:5]))
+
+    def test_toggle_endpoint_is_post_only(self):
+        url = reverse('mark_lesson_completed', kwargs={'lesson_id': self.lessons[0].pk})
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.assertEqual(self.completed(), {self.lessons[0].pk})
@@ -0,0 +1,179 @@
+"""
+Бюджет SQL-запросов и времени ответа для каждого URL из core/urls.py.
+
+Каждая страница проверяется от имени анонима, обычного пользователя и
+сотрудника. Превышение бюджета означает появление N+1 или лишних запросов —
+такие изменения должны валить сборку. Запуск: ``DB_ENGINE=sqlite python manage.py test core``.
+"""
+import json
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import urls as core_urls
+from core.models import Theme, Lesson, Task, UserProfile
+from core.seeding import generate_dataset
+
+# Потолок времени ответа одной страницы, секунды. Намеренно с запасом:
+# ловим деградации на порядки, а не шум CI
+WALL_TIME_CEILING = 1.0
+
+ANONYMOUS, USER, STAFF = 'anonymous', 'user', 'staff'
+
+# имя URL -> {роль: (ожидаемый статус, максимум SQL-запросов)}
+# Измеряется холодный кеш; страницы каталога тратят один запрос на валидатор ETag
+QUERY_BUDGETS = {
+    'index': {ANONYMOUS: (200, 1), USER: (200, 3), STAFF: (200, 3)},
+    'register': {ANONYMOUS: (200, 0), USER: (200, 2), STAFF: (200, 2)},
+    'login': {ANONYMOUS: (200, 0), USER: (200, 2), STAFF: (200, 2)},
+    'logout': {ANONYMOUS: (302, 0), USER: (302, 4), STAFF: (302, 4)},
+    'profile': {ANONYMOUS: (302, 0), USER: (200, 7), STAFF: (200, 7)},
+    'research': {ANONYMOUS: (200, 2), USER: (200, 4), STAFF: (200, 4)},
+    'search': {ANONYMOUS: (200, 8), USER: (200, 10), STAFF: (200, 10)},
+    # Первые N, список тем; пользователю — ещё его счёт и сумма по гистограмме
+    'leaderboard': {ANONYMOUS: (200, 2), USER: (200, 7), STAFF: (200, 7)},
+    'themes': {ANONYMOUS: (200, 2), USER: (200, 4), STAFF: (200, 4)},
+    'theme_detail': {ANONYMOUS: (200, 3), USER: (200, 6), STAFF: (200, 6)},
+    'lesson_detail': {ANONYMOUS: (200, 4), USER: (200, 7), STAFF: (200, 7)},
+    # Последний запрос — темы отмеченных уроков для рейтинга
+    'mark_lesson_completed': {ANONYMOUS: (302, 0), USER: (302, 7), STAFF: (302, 7)},
+    # Пакет из двух операций; число запросов не зависит от размера пакета (см. test_progress_sync)
+    'progress_sync': {ANONYMOUS: (401, 0), USER: (200, 14), STAFF: (200, 14)},
+    'add_lesson': {ANONYMOUS: (302, 0), USER: (403, 2), STAFF: (200, 3)},
+    'add_task': {ANONYMOUS: (302, 0), USER: (403, 2), STAFF: (200, 4)},
+    'task_download': {ANONYMOUS: (302, 0), USER: (200, 3), STAFF: (200, 3)},
+    # Ответ потоковый: строки ведомости читаются уже при отправке, здесь — только проверки
+    'gradebook_export': {ANONYMOUS: (302, 0), USER: (403, 2), STAFF: (200, 2)},
+    'metrics': {ANONYMOUS: (200, 0), USER: (200, 0), STAFF: (200, 0)},
+}
+
+
+# Строка запроса для страниц, которые без параметров ничего не делают
+URL_QUERY_STRINGS = {
+    'search': '?q=защита',
+}
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def _post_body(name, lesson):
+    """Тело запроса для URL, принимающих только POST; None — запрос GET."""
+    return {
+        'mark_lesson_completed': {},
+        'progress_sync': {
+            'data': json.dumps({'operations': [
+                {'lesson_id': lesson.pk, 'completed': True, 'client_ts': '2026-01-01T10:00:00Z'},
+                {'lesson_id': lesson.pk - 1, 'completed': False, 'client_ts': '2026-01-01T10:00:00Z'},
+            ]}),
+            'content_type': 'application/json',
+        },
+    }.get(name)
+
+
+def _url_kwargs(name, theme, lesson, task):
+    return {
+        'theme_detail': {'pk': theme.pk},
+        'lesson_detail': {'lesson_id': lesson.pk},
+        'mark_lesson_completed': {'lesson_id': lesson.pk},
+        'add_lesson': {'theme_id': theme.pk},
+        'add_task': {'lesson_id': lesson.pk},
+        'task_download': {'task_id': task.pk},
+    }.get(name, {})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    maxDiff = None
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(
+            seed=1, themes=5, lessons_per_theme=8, tasks_per_lesson=3,
+            users=3, max_completed=10, articles=5, content_size=300,
+        )
+        cls.user = User.objects.create_user('learner', password='pass')
+        cls.staff = User.objects.create_user('editor', password='pass', is_staff=True)
+        for user in (cls.user, cls.staff):
+            profile = UserProfile.objects.create(user=user)
+            profile.completed_lessons.add(*Lesson.objects.order_by('id')[:12])
+        cls.theme = Theme.objects.order_by('id').first()
+        cls.lesson = cls.theme.lessons.order_by('order').last()
+        cls.task = Task.objects.create(
+            lesson=cls.lesson, title='С файлом', description='Памятка',
+            file=SimpleUploadedFile('memo.txt', b'memo' * 1000),
+        )
+
+    def _client_for(self, role):
+        if role == USER:
+            self.client.force_login(self.user)
+        elif role == STAFF:
+            self.client.force_login(self.staff)
+        return self.client
+
+    def _measure(self, role, name):
+        client = self._client_for(role)
+        url = reverse(name, kwargs=_url_kwargs(name, self.theme, self.lesson, self.task))
+        url += URL_QUERY_STRINGS.get(name, '')
+        # Меряем худший случай — с холодным кешем
+        cache.clear()
+        started = time.perf_counter()
+        body = _post_body(name, self.lesson)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url) if body is None else client.post(url, **body)
+        elapsed = time.perf_counter() - started
+        return response, queries, elapsed
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in core_urls.urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_query_budgets(self):
+        for name, budgets in QUERY_BUDGETS.items():
+            for role, (status, budget) in budgets.items():
+                with self.subTest(url=name, role=role):
+                    self.client.logout()
+                    response, queries, elapsed = self._measure(role, name)
+                    self.assertEqual(response.status_code, status)
+                    self.assertLessEqual(
+                        len(queries), budget,
+                        f'{name} ({role}): {len(queries)} запросов при бюджете {budget}:\n'
+                        + '\n'.join(query['sql'] for query in queries.captured_queries),
+                    )
+                    self.assertLess(elapsed, WALL_TIME_CEILING, f'{name} ({role}): {elapsed:.3f} с')
+
+    def test_catalog_queries_do_not_grow_with_catalog(self):
+        """Число запросов списков не зависит от количества тем и уроков."""
+        pages = ('index', 'themes', 'theme_detail', 'lesson_detail', 'research')
+
+        def snapshot():
+            result = {}
+            for name in pages:
+                for role in (ANONYMOUS, USER):
+                    self.client.logout()
+                    _, queries, _ = self._measure(role, name)
+                    result[name, role] = len(queries)
+            return result
+
+        before = snapshot()
+        generate_dataset(
+            seed=2, themes=10, lessons_per_theme=3, tasks_per_lesson=2,
+            users=0, articles=10, content_size=100,
+        )
+        for position in range(20):
+            Lesson.objects.create(theme=self.theme, title=f'Дополнительный {position}',
+                                  content='Текст', order=100 + position)
+        self.assertEqual(snapshot(), before)
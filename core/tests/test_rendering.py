@@ -0,0 +1,91 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.curriculum import import_records
+from core.models import Theme, Lesson, ResearchArticle
+from core.rendering import to_excerpt, to_html
+
+LONG_TEXT = 'Первый абзац <b>урока</b>.\n\nВторой абзац, ' + 'очень длинный ' * 100
+
+
+class RenderingTests(SimpleTestCase):
+
+    def test_html_matches_linebreaks_filter(self):
+        self.assertEqual(
+            to_html('Строка\nвторая\n\n<script>'),
+            '<p>Строка<br>вторая</p>\n\n<p>&lt;script&gt;</p>',
+        )
+
+    def test_excerpt_is_plain_text(self):
+        excerpt = to_excerpt(LONG_TEXT, 40)
+        self.assertEqual(len(excerpt), 40)
+        self.assertTrue(excerpt.startswith('Первый абзац урока. Второй абзац'))
+        self.assertTrue(excerpt.endswith('…'))
+        self.assertEqual(to_excerpt('Коротко', 40), 'Коротко')
+
+
+class RenderedFieldsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.theme = Theme.objects.create(title='Гражданская оборона', description=LONG_TEXT)
+        self.lesson = Lesson.objects.create(theme=self.theme, title='Сигналы', content=LONG_TEXT)
+
+    def test_fields_are_filled_on_save(self):
+        self.assertEqual(self.lesson.content_html, to_html(LONG_TEXT))
+        self.assertEqual(self.lesson.excerpt, to_excerpt(LONG_TEXT, 200))
+        self.assertEqual(self.theme.excerpt, to_excerpt(LONG_TEXT, 150))
+        article = ResearchArticle.objects.create(title='Исследование', content=LONG_TEXT)
+        self.assertEqual(len(article.excerpt), 300)
+
+    def test_partial_saves(self):
+        # Текст не загружен — готовые поля не трогаем
+        lesson = Lesson.objects.defer(*Lesson.listing_deferred_fields()).get(pk=self.lesson.pk)
+        lesson.title = 'Сигналы оповещения'
+        lesson.save()
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.excerpt, to_excerpt(LONG_TEXT, 200))
+
+        self.lesson.content = 'Новый текст'
+        self.lesson.save(update_fields=['content'])
+        self.lesson.refresh_from_db()
+        self.assertEqual((self.lesson.content_html, self.lesson.excerpt), ('<p>Новый текст</p>', 'Новый текст'))
+
+    def test_list_pages_do_not_read_full_text(self):
+        for url in (reverse('themes'), reverse('theme_detail', kwargs={'pk': self.theme.pk}), reverse('index')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            # Только списки выбираемых колонок: GROUP BY в SQLite перечисляет все поля
+            columns = ' '.join(query['sql'].split(' FROM ')[0] for query in queries)
+            self.assertNotIn('"content"', columns)
+            self.assertNotIn('"description"', columns)
+            self.assertContains(response, 'Первый абзац урока.')
+
+    def test_detail_page_uses_stored_html(self):
+        Lesson.objects.filter(pk=self.lesson.pk).update(content_html='<p>Готовый HTML</p>')
+        response = self.client.get(reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk}))
+        self.assertContains(response, '<p>Готовый HTML</p>', html=True)
+
+    def test_import_fills_fields(self):
+        import_records([
+            {'type': 'theme', 'slug': 'medicina', 'title': 'Медицина', 'description': 'Первая помощь'},
+            {'type': 'lesson', 'theme': 'medicina', 'slug': 'perevyazka', 'title': 'Перевязка', 'content': LONG_TEXT},
+        ])
+        self.assertEqual(Theme.objects.get(slug='medicina').description_html, '<p>Первая помощь</p>')
+        self.assertEqual(Lesson.objects.get(slug='perevyazka').excerpt, to_excerpt(LONG_TEXT, 200))
+
+    def test_command_backfills_only_stale_rows(self):
+        Lesson.objects.bulk_create([Lesson(theme=self.theme, title='Без выдержки', content='Текст урока')])
+        output = io.StringIO()
+        call_command('render_content', stdout=output)
+        self.assertIn('Уроки: 1', output.getvalue())
+        self.assertEqual(Lesson.objects.get(title='Без выдержки').excerpt, 'Текст урока')
+
+        call_command('render_content', stdout=output)
+        self.assertIn('Уроки: 0', output.getvalue())
@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core import search
+from core.models import Theme, Lesson, Task, ResearchArticle
+
+
+class SimpleSearchBackendTests(TestCase):
+    """Запасной бэкенд, который работает на SQLite."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.theme = Theme.objects.create(title='Гражданская оборона', description='Основы защиты населения')
+        cls.lesson = Lesson.objects.create(theme=cls.theme, title='Средства защиты', content='Противогаз и укрытие')
+        cls.body_lesson = Lesson.objects.create(theme=cls.theme, title='Эвакуация', content='Порядок защиты при эвакуации')
+        cls.task = Task.objects.create(lesson=cls.lesson, title='Надеть противогаз', description='На время')
+        ResearchArticle.objects.create(title='Цифры защиты', content='Статистика')
+        ResearchArticle.objects.create(title='Черновик про защиту', content='Скрыто', is_published=False)
+
+    def test_backend_selection(self):
+        self.assertIsInstance(search.get_backend(), search.SimpleSearchBackend)
+
+    def test_results_cover_all_models_and_rank_title_matches_first(self):
+        results = search.search('защит')
+        kinds = {result.kind for result in results}
+        self.assertEqual(kinds, {'Тема', 'Урок', 'Исследование'})
+        titles = [result.title for result in results]
+        self.assertLess(titles.index('Средства защиты'), titles.index('Эвакуация'))
+        self.assertNotIn('Черновик про защиту', titles)
+
+    def test_task_links_to_its_lesson(self):
+        task_result = [r for r in search.search('противогаз') if r.kind == 'Задание'][0]
+        self.assertEqual(task_result.url, reverse('lesson_detail', kwargs={'lesson_id': self.lesson.pk}))
+
+    def test_short_query_returns_nothing(self):
+        self.assertEqual(search.search('з'), [])
+
+    def test_search_page(self):
+        response = self.client.get(reverse('search'), {'q': 'оборона'})
+        self.assertContains(response, 'Гражданская оборона')
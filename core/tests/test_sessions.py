@@ -0,0 +1,106 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Theme, Lesson, UserProfile
+from core.sessions import SessionStore, MESSAGES_KEY_PREFIX
+
+
+class SessionStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        store = SessionStore()
+        store['_auth_user_id'] = '1'
+        store.create()
+        self.key = store.session_key
+
+    def test_reads_through_cache_with_database_fallback(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.key)['_auth_user_id'], '1')
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(SessionStore(self.key)['_auth_user_id'], '1')
+        with self.assertNumQueries(0):
+            SessionStore(self.key).load()
+
+    def test_unchanged_data_is_not_written(self):
+        store = SessionStore(self.key)
+        store['_auth_user_id'] = '1'
+        self.assertTrue(store.modified)
+        with self.assertNumQueries(0):
+            store.save()
+
+        store['theme'] = 5
+        with self.assertNumQueries(3):  # UPDATE в точке сохранения
+            store.save()
+        self.assertEqual(SessionStore(self.key)['theme'], 5)
+        self.assertEqual(Session.objects.get(session_key=self.key).get_decoded()['theme'], 5)
+
+    @override_settings(SESSION_REFRESH_INTERVAL=3600)
+    def test_expiry_is_refreshed_once_per_interval(self):
+        store = SessionStore(self.key)
+        store.load()
+        self.assertFalse(store.modified)
+
+        stale = timezone.now() + timedelta(seconds=store.get_session_cookie_age() - 7200)
+        Session.objects.filter(session_key=self.key).update(expire_date=stale)
+        cache.clear()
+        store = SessionStore(self.key)
+        store.load()
+        self.assertTrue(store.modified)
+        store.save()
+        self.assertGreater(Session.objects.get(session_key=self.key).expire_date, stale + timedelta(seconds=3600))
+
+    def test_delete_clears_cache(self):
+        store = SessionStore(self.key)
+        store.flush()
+        self.assertFalse(SessionStore().exists(self.key))
+        self.assertEqual(SessionStore(self.key).load(), {})
+
+
+# Отметки о прохождении пишутся и в журнал аудита; фоновый поток писал бы
+# в тестовую базу параллельно с тестом
+@override_settings(AUDIT_ASYNC=False)
+class MessageStorageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('learner', password='pass')
+        UserProfile.objects.create(user=self.user)
+        theme = Theme.objects.create(title='Тема', description='Описание')
+        self.lesson = Lesson.objects.create(theme=theme, title='Урок', content='Текст')
+
+    def test_messages_do_not_touch_session_row(self):
+        self.client.force_login(self.user)
+        session_key = self.client.session.session_key
+        before = Session.objects.get(session_key=session_key).session_data
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('mark_lesson_completed', kwargs={'lesson_id': self.lesson.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNotNone(cache.get(MESSAGES_KEY_PREFIX + session_key))
+        self.assertEqual(Session.objects.get(session_key=session_key).session_data, before)
+
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Урок помечен как пройденный!')
+        self.assertIsNone(cache.get(MESSAGES_KEY_PREFIX + session_key))
+
+    def test_anonymous_messages_use_cookie(self):
+        self.client.get(reverse('logout'))
+        self.assertIn('messages', self.client.cookies)
+
+
+class BenchmarkSessionsTests(TestCase):
+
+    def test_reports_each_backend(self):
+        output = io.StringIO()
+        call_command('benchmark_sessions', sessions=5, requests=50, stdout=output)
+        self.assertIn('  core: SELECT 0', output.getvalue())
+        self.assertFalse(Session.objects.exists())
@@ -0,0 +1,119 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import WHITENOISE_MIDDLEWARE, check_static_serving
+
+STATIC_ROOT = tempfile.mkdtemp()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+PRODUCTION_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+def error_ids():
+    return [error.id for error in check_static_serving(None)]
+
+
+@override_settings(DEBUG=False, STATIC_ROOT=STATIC_ROOT, STORAGES=PRODUCTION_STORAGES)
+class StaticServingTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_collectstatic_fingerprints_and_precompresses(self):
+        url = static('core/css/site.css')
+        self.assertRegex(url, r'^/static/core/css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(STATIC_ROOT, url[len('/static/'):])
+        self.assertTrue(os.path.exists(path + '.gz'))
+        self.assertTrue(os.path.exists(path + '.br'))
+
+    def test_hashed_files_are_immutable_and_precompressed(self):
+        response = self.client.get(static('core/css/site.css'), HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=315360000', response['Cache-Control'])
+
+        response = self.client.get('/static/core/css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_production_settings_pass(self):
+        self.assertEqual(error_ids(), [])
+
+    def test_missing_pieces_fail_the_check(self):
+        middleware = [name for name in settings.MIDDLEWARE if name != WHITENOISE_MIDDLEWARE]
+        with override_settings(MIDDLEWARE=middleware):
+            self.assertEqual(error_ids(), ['core.E001'])
+        with override_settings(WHITENOISE_USE_FINDERS=True):
+            self.assertEqual(error_ids(), ['core.E002'])
+        with override_settings(STORAGES=settings.STORAGES | {
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }):
+            self.assertEqual(error_ids(), ['core.E003'])
+        with override_settings(STATIC_ROOT=MEDIA_ROOT):
+            self.assertEqual(error_ids(), ['core.E005'])
+        with override_settings(DEBUG=True, MIDDLEWARE=middleware):
+            self.assertEqual(error_ids(), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_OFFLOAD='', MEDIA_MAX_AGE=3600)
+class MediaServingTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('themes/photo.card.webp', 'tasks/answers.pdf'):
+            os.makedirs(os.path.join(MEDIA_ROOT, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(MEDIA_ROOT, name), 'wb') as file:
+                file.write(b'RIFF' + bytes(100))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_public_file_is_cached_and_revalidated(self):
+        response = self.client.get('/media/themes/photo.card.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'RIFF' + bytes(100))
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Content-Length'], '104')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        response = self.client.get('/media/themes/photo.card.webp', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    async def test_asgi_streams_file_in_chunks(self):
+        response = await self.async_client.get('/media/themes/photo.card.webp')
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), b'RIFF' + bytes(100))
+
+    def test_offload_to_proxy(self):
+        with override_settings(MEDIA_OFFLOAD='x-accel'):
+            response = self.client.get('/media/themes/photo.card.webp')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/themes/photo.card.webp')
+        self.assertEqual(response.content, b'')
+
+    def test_private_and_missing_files(self):
+        self.assertEqual(self.client.get('/media/tasks/answers.pdf').status_code, 404)
+        self.assertEqual(self.client.get('/media/themes/missing.webp').status_code, 404)
+        self.assertEqual(self.client.get('/media/themes/../tasks/answers.pdf').status_code, 404)
+        self.assertEqual(self.client.get('/media/themes/').status_code, 404)
+        self.assertEqual(self.client.post('/media/themes/photo.card.webp').status_code, 405)
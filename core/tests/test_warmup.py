@@ -0,0 +1,79 @@
+import io
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from gunicorn.workers.gthread import ThreadWorker
+from gunicorn.workers.sync import SyncWorker
+
+from core import caching, metrics, warmup
+from core.models import Theme
+from core.urls import urlpatterns
+from serve_ready import gunicorn_config
+
+
+class WarmupTests(TestCase):
+
+    def test_compiles_every_template(self):
+        root = Path(warmup.__file__).parent / 'templates'
+        with mock.patch('core.warmup.get_template') as get_template:
+            count = warmup.compile_templates()
+        self.assertEqual(count, len(list(root.rglob('*.html'))))
+        get_template.assert_any_call('core/base.html')
+        self.assertEqual(warmup.compile_templates(), count)
+
+    def test_resolves_every_named_url(self):
+        self.assertEqual(warmup.resolve_urls(), len([pattern for pattern in urlpatterns if pattern.name]))
+
+    def test_primes_anonymous_catalog_pages(self):
+        cache.clear()
+        Theme.objects.create(title='Гражданская оборона', description='Основы')
+        metrics.REGISTRY.observe('index', 200, 0.1)
+        # Соединение теста живёт в транзакции — как тестовый клиент, не закрываем его
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            results = warmup.prime_caches('testserver')
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        self.assertEqual(results[reverse('themes')], 200)
+        self.assertFalse(metrics.REGISTRY.requests)
+        self.assertEqual(self.client.get(reverse('themes'))[caching.CACHE_STATUS_HEADER], 'HIT')
+
+
+class GunicornConfigTests(SimpleTestCase):
+
+    def test_sizing(self):
+        self.assertEqual(gunicorn_config.sizing(4), 9)
+        self.assertEqual(gunicorn_config.sizing(4, threads=4), 5)
+        self.assertEqual(gunicorn_config.sizing(32), 12)
+
+    def test_cpu_quota_limits_count(self):
+        cpu_max = mock.Mock(**{'read_text.return_value': '150000 100000\n'})
+        with mock.patch.object(gunicorn_config, 'CGROUP_CPU_MAX', cpu_max), \
+                mock.patch('os.sched_getaffinity', return_value=set(range(8))):
+            self.assertEqual(gunicorn_config.cpu_count(), 2)
+
+    def test_connections_are_opened_only_in_sync_workers(self):
+        with mock.patch.object(gunicorn_config, 'WARMUP', True), \
+                mock.patch('core.warmup.open_connections') as open_connections:
+            for worker_class, opened in ((SyncWorker, True), (ThreadWorker, False)):
+                open_connections.reset_mock()
+                worker = mock.Mock(
+                    spec=worker_class, pid=1, forked_at=0, cfg=mock.Mock(preload_app=True), log=mock.Mock(),
+                )
+                gunicorn_config.post_worker_init(worker)
+                self.assertEqual(open_connections.called, opened)
+
+    def test_serve_prints_config(self):
+        output = io.StringIO()
+        call_command('serve', print_config=True, threads=4, workers=3, stdout=output)
+        self.assertIn('worker_class = gthread', output.getvalue())
+        self.assertIn('workers = 3', output.getvalue())
+        self.assertIn('max_requests_jitter = 200', output.getvalue())
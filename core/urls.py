@@ -1,17 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
-urlpatterns = [
-    path('', views.index, name='index'),
+
+def catalog_urlpatterns(catalog):
+    """Публичные страницы каталога; ``catalog`` — модуль views или async_views."""
+    return [
+        path('', catalog.index, name='index'),
+        path('research/', catalog.research_view, name='research'),
+        path('themes/', catalog.themes_view, name='themes'),
+        path('theme/<int:pk>/', catalog.theme_detail_view, name='theme_detail'),
+        path('lesson/<int:lesson_id>/', catalog.lesson_detail_view, name='lesson_detail'),
+    ]
+
+
+urlpatterns = catalog_urlpatterns(async_views if settings.ASGI_MODE else views) + [
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
-    path('research/', views.research_view, name='research'),
-    path('themes/', views.themes_view, name='themes'),
-    path('theme/<int:pk>/', views.theme_detail_view, name='theme_detail'),
-    path('lesson/<int:lesson_id>/', views.lesson_detail_view, name='lesson_detail'),
+    path('search/', views.search_view, name='search'),
+    path('leaderboard/', views.leaderboard_view, name='leaderboard'),
     path('lesson/<int:lesson_id>/complete/', views.mark_lesson_completed, name='mark_lesson_completed'),
+    path('api/progress/', views.progress_sync_view, name='progress_sync'),
+    path('task/<int:task_id>/download/', views.task_download_view, name='task_download'),
     path('theme/<int:theme_id>/add_lesson/', views.add_lesson_view, name='add_lesson'),
     path('lesson/<int:lesson_id>/add_task/', views.add_task_view, name='add_task'),
+    path('staff/gradebook/', views.gradebook_export_view, name='gradebook_export'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
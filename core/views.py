@@ -1,17 +1,50 @@
+import json
+
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.views.decorators.http import require_POST, require_safe
 from django.utils import timezone
 
 from .models import Theme, Lesson, Task, UserProfile, ResearchArticle
-from .forms import RegisterForm, LoginForm, ProfileUpdateForm, LessonForm, TaskForm, ThemeForm
+from .forms import (
+    RegisterForm, LoginForm, ProfileUpdateForm, LessonForm, TaskForm, ThemeForm, GradebookFilterForm,
+    LeaderboardFilterForm,
+)
+from . import caching, conditional, db_router, downloads, gradebook, leaderboard, metrics, progress, search
+from .pagination import KeysetPaginator
+
+THEMES_PER_PAGE = 24
+LESSONS_PER_PAGE = 30
+ARTICLES_PER_PAGE = 10
+
+# Ключи курсорной пагинации; совпадают с Meta.ordering и индексами моделей
+THEME_ORDERING = ('order', 'created_at', 'id')
+LESSON_ORDERING = ('order', 'created_at', 'id')
+ARTICLE_ORDERING = ('-created_at', '-id')
+
+# Спискам хватает готовых выдержек: полный текст, HTML и поисковый вектор не читаем
+THEME_LIST_DEFERRED = Theme.listing_deferred_fields()
+LESSON_LIST_DEFERRED = Lesson.listing_deferred_fields()
+ARTICLE_LIST_DEFERRED = ResearchArticle.listing_deferred_fields()
+# Страницы темы и урока показывают готовый HTML, исходный текст не нужен
+THEME_PAGE_DEFERRED = ('description', 'search_vector')
+LESSON_PAGE_DEFERRED = (
+    'content', 'search_vector', *(f'theme__{field}' for field in THEME_LIST_DEFERRED),
+)
+SIBLING_LESSONS = 5
 
+@db_router.replica_reads
+@caching.cache_anonymous_page(Theme)
 def index(request):
-    themes = Theme.objects.all()[:4]
+    themes = Theme.objects.defer(*THEME_LIST_DEFERRED)[:4]
     return render(request, 'core/index.html', {'themes': themes})
 
 def register_view(request):
@@ -42,9 +75,20 @@ def login_view(request):
     return render(request, 'core/login.html', {'form': form})
 
 
+def _user_profile(user):
+    """
+    Профиль пользователя; создаётся, только если его нет. get_or_create здесь
+    не подходит: он читает через db_for_write и прикрепил бы пользователя к
+    основной базе (core/db_router.py) на каждом просмотре профиля.
+    """
+    profile = UserProfile.objects.filter(user=user).first()
+    if profile is None:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+    return profile
+
 @login_required
 def profile_view(request):
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    profile = _user_profile(request.user)
 
     if request.method == 'POST':
         form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
@@ -55,18 +99,14 @@ def profile_view(request):
     else:
         form = ProfileUpdateForm(instance=profile)
 
-    completed_count = profile.completed_lessons.count()
-    total_lessons = Lesson.objects.count()
-
-    # Разделяем достижения по запятым для шаблона
-    achievements_list = []
-    if profile.achievements:
-        achievements_list = [a.strip() for a in profile.achievements.split(',') if a.strip()]
+    # Пройденные уроки и задания одним запросом: задания — сумма
+    # денормализованного Lesson.task_count, как в ведомости (core/gradebook.py)
+    totals = progress.summary(profile)
+    recent_lessons = list(profile.completed_lessons.select_related('theme')[:5])
 
-    # Подсчитываем выполненные задания
-    tasks_completed = Task.objects.filter(
-        lesson__in=profile.completed_lessons.all()
-    ).count()
+    achievements_list = list(
+        profile.user_achievements.select_related('achievement').order_by('awarded_at', 'pk')
+    )
 
     # Вычисляем дни активности
     days_active = (timezone.now() - request.user.date_joined).days
@@ -74,19 +114,21 @@ def profile_view(request):
     return render(request, 'core/profile.html', {
         'profile': profile,
         'form': form,
-        'completed_count': completed_count,
-        'total_lessons': total_lessons,
+        'completed_count': totals['completed_count'],
+        'total_lessons': totals['total_lessons'],
+        'recent_lessons': recent_lessons,
         'achievements_list': achievements_list,
-        'tasks_completed': tasks_completed,
+        'tasks_completed': totals['tasks_completed'],
         'days_active': max(days_active, 1),
     })
 
 @login_required
+@require_POST
 def mark_lesson_completed(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
     profile = UserProfile.objects.get(user=request.user)
     
-    if lesson in profile.completed_lessons.all():
+    if progress.is_lesson_completed(request, lesson.id):
         profile.completed_lessons.remove(lesson)
         messages.info(request, 'Урок помечен как непройденный')
     else:
@@ -95,34 +137,120 @@ def mark_lesson_completed(request, lesson_id):
     
     return redirect('lesson_detail', lesson_id=lesson_id)
 
+@require_POST
+def progress_sync_view(request):
+    """
+    Пакетная синхронизация прогресса для мобильных и офлайн-клиентов:
+    POST {"operations": [{"lesson_id", "completed", "client_ts"}, ...]}.
+    Пустой список просто возвращает текущий итог.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется вход'}, status=401)
+    try:
+        operations = progress.parse_operations(json.loads(request.body))
+    except (ValueError, UnicodeDecodeError) as error:
+        # ProgressSyncError и json.JSONDecodeError — подклассы ValueError
+        return JsonResponse({'error': str(error)}, status=400)
+
+    profile = _user_profile(request.user)
+    result = progress.sync(profile, operations)
+    result['server_time'] = timezone.now()
+    return JsonResponse(result)
+
+@db_router.replica_reads
+@conditional.research_page
+@caching.cache_anonymous_page(ResearchArticle)
 def research_view(request):
-    articles = ResearchArticle.objects.filter(is_published=True)
+    articles = KeysetPaginator(
+        ResearchArticle.objects.filter(is_published=True).defer(*ARTICLE_LIST_DEFERRED),
+        ARTICLE_ORDERING, ARTICLES_PER_PAGE,
+    ).get_page(request.GET.get('cursor'))
     return render(request, 'core/research.html', {'articles': articles})
 
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    results = search.search(query)
+    return render(request, 'core/search.html', {
+        'query': query,
+        'results': results,
+        'min_query_length': search.MIN_QUERY_LENGTH,
+    })
+
+@db_router.replica_reads
+@conditional.themes_page
+@caching.cache_anonymous_page(Theme, Lesson)
 def themes_view(request):
-    themes = Theme.objects.all().order_by('order')
+    cursor = request.GET.get('cursor')
+    themes = caching.cached_fragment(
+        'themes', (Theme, Lesson), (cursor,),
+        lambda: KeysetPaginator(
+            Theme.objects.defer(*THEME_LIST_DEFERRED), THEME_ORDERING, THEMES_PER_PAGE,
+        ).get_page(cursor),
+    )
     return render(request, 'core/themes.html', {'themes': themes})
 
+def _theme_with_lessons(pk, cursor):
+    theme = get_object_or_404(Theme.objects.defer(*THEME_PAGE_DEFERRED), pk=pk)
+    lessons = KeysetPaginator(
+        theme.lessons.defer(*LESSON_LIST_DEFERRED), LESSON_ORDERING, LESSONS_PER_PAGE
+    ).get_page(cursor)
+    return theme, lessons
+
+@db_router.replica_reads
+@conditional.theme_page
+@caching.cache_anonymous_page(Theme, Lesson, Task)
 def theme_detail_view(request, pk):
-    theme = get_object_or_404(Theme, pk=pk)
-    lessons = theme.lessons.all().order_by('order')
-    return render(request, 'core/theme_detail.html', {'theme': theme, 'lessons': lessons})
+    # Тема и страница уроков общие для всех; отметки о прохождении — свои
+    cursor = request.GET.get('cursor')
+    theme, lessons = caching.cached_fragment(
+        'theme_lessons', (Theme, Lesson, Task), (pk, cursor),
+        lambda: _theme_with_lessons(pk, cursor),
+    )
+    return render(request, 'core/theme_detail.html', {
+        'theme': theme,
+        'lessons': lessons,
+        'completed_lesson_ids': progress.completed_lesson_ids(request),
+    })
 
+def _lesson_with_tasks(lesson_id):
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('theme').defer(*LESSON_PAGE_DEFERRED), id=lesson_id,
+    )
+    siblings = list(
+        Lesson.objects.filter(theme_id=lesson.theme_id).only('id', 'title', 'order')[:SIBLING_LESSONS]
+    )
+    return lesson, list(lesson.tasks.defer('search_vector')), siblings
+
+@db_router.replica_reads
+@conditional.lesson_page
+@caching.cache_anonymous_page(Theme, Lesson, Task)
 def lesson_detail_view(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
-    tasks = lesson.tasks.all()
-    is_completed = False
-    
-    if request.user.is_authenticated:
-        profile = UserProfile.objects.get(user=request.user)
-        is_completed = lesson in profile.completed_lessons.all()
+    lesson, tasks, siblings = caching.cached_fragment(
+        'lesson_page', (Theme, Lesson, Task), (lesson_id,),
+        lambda: _lesson_with_tasks(lesson_id),
+    )
+    is_completed = progress.is_lesson_completed(request, lesson.id)
     
     return render(request, 'core/lesson_detail.html', {
         'lesson': lesson,
         'tasks': tasks,
+        'sibling_lessons': siblings,
         'is_completed': is_completed,
     })
 
+@login_required
+@require_safe
+def task_download_view(request, task_id):
+    task = get_object_or_404(Task.objects.only('file', 'file_size', 'file_sha256'), id=task_id)
+    if not task.file:
+        raise Http404('У задания нет файла')
+    return downloads.serve_file(request, task.file, size=task.file_size, checksum=task.file_sha256)
+
+@require_safe
+def media_view(request, path):
+    # Подключается в serve_ready/urls.py: публичные файлы MEDIA_ROOT без nginx
+    return downloads.serve_media(request, path)
+
 @login_required
 def add_lesson_view(request, theme_id):
     if not request.user.is_staff:
@@ -163,7 +291,67 @@ def add_task_view(request, lesson_id):
     
     return render(request, 'core/add_task.html', {'form': form, 'lesson': lesson})
 
+@login_required
+@require_safe
+def gradebook_export_view(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Ведомость доступна только сотрудникам")
+    form = GradebookFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain; charset=utf-8')
+
+    # Строки считаются и отправляются по мере чтения, ведомость целиком в памяти не держится
+    data = form.cleaned_data
+    extension = data['format'] or 'csv'
+    render_lines, content_type = gradebook.FORMATS[extension]
+    response = StreamingHttpResponse(
+        render_lines(gradebook.rows(data['theme'], data['date_from'], data['date_to'])),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="gradebook-{timezone.localdate():%Y%m%d}.{extension}"'
+    )
+    return downloads.stream_for_asgi(request, response)
+
+@require_safe
+def leaderboard_view(request):
+    form = LeaderboardFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain; charset=utf-8')
+    theme = form.cleaned_data['theme']
+    scope = theme.pk if theme else leaderboard.OVERALL
+
+    # Первые N и место пользователя читаются из сводной таблицы рейтинга,
+    # число запросов не зависит от числа пользователей
+    my_rank = None
+    if request.user.is_authenticated:
+        profile_id = UserProfile.objects.filter(user=request.user).values_list('pk', flat=True).first()
+        if profile_id is not None:
+            my_rank = leaderboard.rank(profile_id, scope)
+    return render(request, 'core/leaderboard.html', {
+        'themes': Theme.objects.order_by('title').values_list('pk', 'title'),
+        'theme': theme,
+        'entries': leaderboard.top(scope),
+        'my_rank': my_rank,
+    })
+
 def logout_view(request):
     logout(request)
     messages.info(request, 'Вы успешно вышли из системы.')
-    return redirect('index')
\ No newline at end of file
+    return redirect('index')
+
+def _is_metrics_scraper(request):
+    # За прокси REMOTE_ADDR — адрес прокси, поэтому проксированные запросы
+    # (с X-Forwarded-For) доступа по адресу не получают
+    return (
+        request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        and 'HTTP_X_FORWARDED_FOR' not in request.META
+    )
+
+@require_safe
+def metrics_view(request):
+    if not _is_metrics_scraper(request) and not request.user.is_staff:
+        return HttpResponseForbidden("Метрики доступны только сотрудникам")
+    return HttpResponse(
+        metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
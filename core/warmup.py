@@ -0,0 +1,124 @@
+"""
+Прогрев процесса до приёма запросов.
+
+Без прогрева первый запрос каждого воркера платит за компиляцию шаблонов,
+заполнение кешей URL-резолвера, соединение с базой и пустой кеш каталога.
+serve_ready/gunicorn_config.py вызывает ``warm_up`` в мастер-процессе после
+загрузки приложения (preload_app): воркеры получают скомпилированные шаблоны
+и резолвер через fork, а повторно созданные после max_requests — сразу
+готовыми. Соединения с базой через fork не передаются — их открывает
+``open_connections`` в каждом sync-воркере (в gthread и ASGI соединения
+привязаны к потокам запросов).
+"""
+import io
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.apps import apps
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import URLPattern, URLResolver, resolve, reverse
+
+from . import metrics
+
+# Страницы каталога для анонимов: их готовые копии кладутся в кеш (core/caching.py)
+CACHE_PRIMING_URLS = ['index', 'themes', 'research', 'leaderboard']
+
+
+def compile_templates():
+    """Скомпилировать все шаблоны core/templates; вернуть их число."""
+    root = Path(apps.get_app_config('core').path) / 'templates'
+    names = sorted(path.relative_to(root).as_posix() for path in root.rglob('*.html'))
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def _sample_kwargs(pattern):
+    """Аргументы для reverse(): число для <int:…>, слово для остальных конвертеров."""
+    return {
+        name: 1 if converter.regex == '[0-9]+' else 'warmup'
+        for name, converter in pattern.pattern.converters.items()
+    }
+
+
+def resolve_urls(urlconf='core.urls'):
+    """
+    Построить и разобрать адрес каждого именованного маршрута ``urlconf`` —
+    заполняет кеши reverse() и resolve(); вернуть число маршрутов.
+    """
+    patterns = list(import_module(urlconf).urlpatterns)
+    count = 0
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            resolve(reverse(pattern.name, kwargs=_sample_kwargs(pattern)))
+            count += 1
+    return count
+
+
+def open_connections():
+    """Открыть соединение с каждой базой (основной и репликами); вернуть их число."""
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def _get(handler, path, host):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+    }
+    statuses = []
+    body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return int(statuses[0].split(' ', 1)[0])
+
+
+def prime_caches(host):
+    """
+    Запросить анонимные страницы каталога через обработчик Django, как
+    настоящий клиент; вернуть {адрес: код ответа или текст ошибки}. Ошибка
+    (например, база ещё не готова) не мешает старту — страницы соберутся по
+    первым запросам.
+    """
+    handler = WSGIHandler()
+    results = {}
+    for name in CACHE_PRIMING_URLS:
+        path = reverse(name)
+        try:
+            results[path] = _get(handler, path, host)
+        except Exception as exc:
+            results[path] = f'{type(exc).__name__}: {exc}'
+    # Запросы прогрева не попадают в метрики воркеров
+    metrics.REGISTRY.reset()
+    return results
+
+
+def warm_up(host):
+    """
+    Весь прогрев мастер-процесса; вернуть отчёт {этап: (результат, секунды)}.
+    Соединения с базой и кешем, открытые прогревом, закрываются: воркеры
+    откроют свои.
+    """
+    report = {}
+    for stage, step in (
+        ('templates', compile_templates),
+        ('urls', resolve_urls),
+        ('caches', lambda: prime_caches(host)),
+    ):
+        started = time.perf_counter()
+        report[stage] = (step(), time.perf_counter() - started)
+    connections.close_all()
+    caches.close_all()
+    return report
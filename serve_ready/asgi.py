@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'serve_ready.settings')
+# Каталог обслуживают async-views, постоянные соединения с БД выключены
+os.environ.setdefault('ASGI_MODE', 'True')
 
 application = get_asgi_application()
+
+# Без DEBUG не стартуем с несобранной статикой (core/checks.py)
+from core.checks import fail_on_serving_errors  # noqa: E402
+
+fail_on_serving_errors()
@@ -0,0 +1,159 @@
+"""
+Настройки gunicorn для production: ``gunicorn -c python:serve_ready.gunicorn_config
+serve_ready.wsgi:application`` (так запускает ``manage.py serve``).
+
+* Число воркеров и потоков — по доступным процессорам (с учётом cpuset и
+  квоты CPU контейнера) или из переменных окружения.
+* preload_app: Django загружается один раз в мастере, там же прогревается
+  (core/warmup.py) — до открытия сокета, так что балансировщик не шлёт
+  запросы в непрогретый сервер; воркеры получают всё через fork.
+* Воркеры перезапускаются после max_requests ± jitter запросов — не все
+  одновременно.
+* В журнал пишутся холодный старт мастера, готовность каждого воркера и
+  время его первого запроса.
+
+Переменные окружения: GUNICORN_BIND, GUNICORN_WORKERS (или WEB_CONCURRENCY),
+GUNICORN_MAX_WORKERS, GUNICORN_THREADS, GUNICORN_MAX_REQUESTS,
+GUNICORN_MAX_REQUESTS_JITTER, GUNICORN_TIMEOUT, GUNICORN_PRELOAD, GUNICORN_WARMUP.
+"""
+import math
+import os
+import time
+from pathlib import Path
+
+# Время загрузки этого файла — до импорта Django при preload_app
+BOOT_STARTED = time.monotonic()
+
+CGROUP_CPU_MAX = Path('/sys/fs/cgroup/cpu.max')
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, '')
+    return int(value) if value.strip() else default
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)) == 'True'
+
+
+def cpu_count():
+    """Процессоры, доступные процессу: affinity и квота cgroup v2 (docker --cpus)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def sizing(cpus, threads=1, max_workers=12):
+    """
+    Воркеров на ``cpus`` процессоров: 2·CPU+1 для синхронных воркеров (пока
+    один ждёт базу, другой считает), CPU+1 для потоковых — потоки сами
+    перекрывают ожидание. Не больше ``max_workers``: у каждого воркера свои
+    соединения с базой (CONN_MAX_AGE).
+    """
+    workers = 2 * cpus + 1 if threads == 1 else cpus + 1
+    return max(1, min(workers, max_workers))
+
+
+ASGI_MODE = os.environ.get('ASGI_MODE', 'False') == 'True'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+threads = 1 if ASGI_MODE else max(1, _env_int('GUNICORN_THREADS', 1))
+workers = _env_int('GUNICORN_WORKERS', _env_int(
+    'WEB_CONCURRENCY', sizing(cpu_count(), threads, _env_int('GUNICORN_MAX_WORKERS', 12)),
+))
+if ASGI_MODE:
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = _env_flag('GUNICORN_PRELOAD', True)
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = timeout
+# Файлы пульса воркеров — в памяти: запись на overlayfs контейнера может тормозить
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+WARMUP = _env_flag('GUNICORN_WARMUP', True)
+
+
+def _warm_up(log):
+    # Файл читается до загрузки Django — импорт только в хуках
+    from django.conf import settings
+    from core import warmup
+
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')),
+                'localhost')
+    report = warmup.warm_up(host)
+    for stage, (result, seconds) in report.items():
+        log.info('Прогрев %s: %s за %.0f мс', stage, result, seconds * 1000)
+
+
+def on_starting(server):
+    """Мастер: приложение загружено (preload_app), сокет ещё не открыт — прогрев здесь, один раз."""
+    server.loaded_at = time.monotonic()
+    if WARMUP and server.cfg.preload_app:
+        _warm_up(server.log)
+    server.warmed_at = time.monotonic()
+
+
+def when_ready(server):
+    cfg = server.cfg
+    server.log.info(
+        'Холодный старт: загрузка %.0f мс, прогрев %.0f мс, до приёма запросов %.0f мс; '
+        'воркеров %s × потоков %s (%s), перезапуск после %s±%s запросов',
+        (server.loaded_at - BOOT_STARTED) * 1000, (server.warmed_at - server.loaded_at) * 1000,
+        (time.monotonic() - BOOT_STARTED) * 1000,
+        cfg.workers, cfg.threads, cfg.worker_class_str, cfg.max_requests, cfg.max_requests_jitter,
+    )
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+    worker.first_request_started = None
+    worker.first_request_reported = False
+
+
+def _is_sync_worker(worker):
+    """
+    Запросы обрабатываются в главном потоке воркера. Соединения Django
+    привязаны к потоку: в gthread и UvicornWorker открытое здесь соединение
+    ни одному запросу не достанется и только займёт место на сервере базы.
+    """
+    from gunicorn.workers.sync import SyncWorker
+
+    return isinstance(worker, SyncWorker)
+
+
+def post_worker_init(worker):
+    """Воркер загрузил приложение и вот-вот начнёт принимать соединения."""
+    if WARMUP and not worker.cfg.preload_app:
+        _warm_up(worker.log)
+    if WARMUP and _is_sync_worker(worker):
+        from core import warmup
+
+        warmup.open_connections()
+    worker.log.info('Воркер %s готов за %.0f мс', worker.pid, (time.monotonic() - worker.forked_at) * 1000)
+
+
+def pre_request(worker, req):
+    if worker.first_request_started is None:
+        worker.first_request_started = time.monotonic()
+
+
+def post_request(worker, req, environ, resp):
+    if not worker.first_request_reported:
+        worker.first_request_reported = True
+        worker.log.info(
+            'Первый запрос воркера %s: %s %s — %.0f мс',
+            worker.pid, req.method, req.path, (time.monotonic() - worker.first_request_started) * 1000,
+        )
@@ -1,6 +1,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import warnings
 
 from django.core.exceptions import ImproperlyConfigured
 
@@ -25,6 +26,10 @@ DEBUG = get_env_variable('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = get_env_variable('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
+# Запуск через ASGI (uvicorn-воркеры); serve_ready/asgi.py включает его сам.
+# Каталог тогда обслуживают async-views (core/async_views.py)
+ASGI_MODE = get_env_variable('ASGI_MODE', 'False') == 'True'
+
 # Настройки базы данных PostgreSQL
 DATABASES = {
     'default': {
@@ -38,26 +43,106 @@ DATABASES = {
             # Рекомендуемые настройки для производительности
             'connect_timeout': 10,
         },
-        'CONN_MAX_AGE': 600,  # Поддержание соединения 10 минут
+        # Поддержание соединения 10 минут. Под ASGI каждый запрос получает свой
+        # поток sync_to_async, и постоянные соединения копились бы — там 0
+        # (пул соединений — на стороне pgbouncer)
+        'CONN_MAX_AGE': 0 if ASGI_MODE else 600,
     }
 }
 
+# Реплики для чтения каталога: DB_REPLICA_HOSTS=replica1,replica2 (core/db_router.py).
+# Пользователь и пароль — как у основной базы; в тестах реплики зеркалят default
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, get_env_variable('DB_REPLICA_HOSTS', '').split(',')), 1):
+    alias = 'replica' if number == 1 else f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'PORT': get_env_variable('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Локальный запуск и тесты без PostgreSQL: DB_ENGINE=sqlite
+if get_env_variable('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        # Отдельная база для проверки маршрутизации (core/tests/test_db_router.py);
+        # в DATABASE_REPLICAS не входит, чтение идёт из default
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db_replica.sqlite3',
+        },
+    }
+    DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# Сколько секунд после записи пользователь читает каталог с основной базы;
+# должно превышать обычное отставание реплик
+REPLICA_PIN_SECONDS = int(get_env_variable('DB_REPLICA_PIN_SECONDS', '5'))
+
+# Кеш: Redis в production (REDIS_URL), локальная память для разработки и тестов
+REDIS_URL = get_env_variable('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'serve_ready',
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                # Недоступный Redis не должен ронять страницы — работаем мимо кеша
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'serve_ready',
+        }
+    }
+
+# Celery: фоновые задачи (уменьшенные копии изображений и т.п.). Без брокера
+# задачи выполняются синхронно в процессе веб-сервера — для разработки и тестов
+CELERY_BROKER_URL = get_env_variable('CELERY_BROKER_URL', REDIS_URL)
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = 'Europe/Moscow'
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver отдаёт статику через WhiteNoise, как в production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Статика: файлы с хешем в имени — с immutable-кешем на год, заранее
+    # сжатые .br/.gz выбираются по Accept-Encoding
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Замер запроса целиком, включая сессию и аутентификацию (core/metrics.py)
+    'core.middleware.PerformanceMiddleware',
+    # brotli/gzip с защитой от BREACH; выше всех, кто меняет тело ответа
+    'core.middleware.CompressionMiddleware',
+    # Чтение каталога с реплик и прилипание к основной базе после записи
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AuditContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,10 +151,19 @@ ROOT_URLCONF = 'serve_ready.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Стандартный DjangoTemplates с замером времени рендеринга
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Кешируемые загрузчики явно и при DEBUG: шаблон разбирается один раз
+            # на процесс (при DEBUG изменения подхватывает автоперезагрузка).
+            # HTML шаблонов HTML_MINIFY_PREFIXES минифицируется при загрузке
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'core.template_loaders.MinifyingLoader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -82,12 +176,31 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'serve_ready.wsgi.application'
 
-#DATABASES = {
-#    'default': {
-#        'ENGINE': 'django.db.backends.sqlite3',
-#        'NAME': BASE_DIR / 'db.sqlite3',
-#    }
-#}
+# Шаблоны, HTML которых минифицируется при загрузке (core/template_loaders.py)
+HTML_MINIFY_PREFIXES = ['core/']
+# Качество brotli для динамических ответов (0–11): 5 — сжатие лучше gzip
+# при сопоставимом времени; 11 годится только для статики, сжатой заранее
+COMPRESSION_BROTLI_QUALITY = int(get_env_variable('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Журнал аудита (core/audit.py): события пишутся пачками из фонового потока
+AUDIT_ENABLED = get_env_variable('AUDIT_ENABLED', 'True') == 'True'
+AUDIT_ASYNC = get_env_variable('AUDIT_ASYNC', 'True') == 'True'
+AUDIT_DATABASE = 'default'
+AUDIT_BATCH_SIZE = 500            # строк в одном INSERT
+AUDIT_FLUSH_INTERVAL = 2.0        # не реже, чем раз в столько секунд
+AUDIT_QUEUE_SIZE = 10000          # дальше — противодавление
+AUDIT_ENQUEUE_TIMEOUT = 0.05      # сколько запрос ждёт места в очереди, прежде чем писать сам
+# Брать IP из X-Forwarded-For (только за доверенным прокси, который его перезаписывает)
+AUDIT_TRUST_X_FORWARDED_FOR = get_env_variable('AUDIT_TRUST_X_FORWARDED_FOR', 'False') == 'True'
+
+# Метрики производительности (core/middleware.py, /metrics)
+METRICS_ENABLED = get_env_variable('METRICS_ENABLED', 'True') == 'True'
+# Доля запросов с подробным замером SQL/шаблонов/кеша: 1.0 — все, 0.1 — каждый десятый
+METRICS_SAMPLE_RATE = float(get_env_variable('METRICS_SAMPLE_RATE', '1.0'))
+# Заголовок Server-Timing для запросов из выборки (видно в DevTools браузера)
+METRICS_SERVER_TIMING = get_env_variable('METRICS_SERVER_TIMING', 'True') == 'True'
+# Адреса, с которых /metrics доступен без входа сотрудника (сборщик Prometheus)
+METRICS_ALLOWED_IPS = get_env_variable('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,10 +224,53 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # В production имена статики содержат хеш содержимого (site.3f2a….css):
+    # файлы можно кешировать браузером надолго, новая версия получает новое имя.
+    # Манифест и сжатые копии (.gz, .br при установленном brotli) создаёт collectstatic
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                   else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+if DEBUG:
+    # При DEBUG WhiteNoise берёт статику из приложений; STATIC_ROOT появляется
+    # только после collectstatic
+    warnings.filterwarnings('ignore', message='No directory at', module='whitenoise.base')
+# Без DEBUG сервер не стартует, если статика не готова к production
+# (core/checks.py, проверяются и в `manage.py check --deploy`)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Скачивание файлов заданий (core/downloads.py): '' — отдаёт Django,
+# 'x-accel' — nginx по X-Accel-Redirect, 'x-sendfile' — Apache/lighttpd.
+# Для nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+TASK_FILES_OFFLOAD = get_env_variable('TASK_FILES_OFFLOAD', '')
+TASK_FILES_ACCEL_PREFIX = '/protected-media/'
+
+# Публичные медиафайлы (core/downloads.py: serve_media); файлы заданий —
+# только через скачивание с проверкой входа. Прокси указывается так же, как
+# для файлов заданий, через ту же internal-локацию
+MEDIA_PUBLIC_PREFIXES = ['themes/', 'avatars/']
+MEDIA_OFFLOAD = get_env_variable('MEDIA_OFFLOAD', TASK_FILES_OFFLOAD)
+# Копии изображений перезаписываются под прежним именем — кешируем ненадолго
+MEDIA_MAX_AGE = int(get_env_variable('MEDIA_MAX_AGE', '3600'))
+
+# Списки админки (core/admin_performance.py): выше этой оценки числа строк
+# вместо COUNT(*) показывается оценка по статистике PostgreSQL
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Сессии читаются через кеш и пишутся в базу только при изменении данных
+# (core/sessions.py); сообщения — в кеше под ключом сессии
+SESSION_ENGINE = 'core.sessions'
+MESSAGE_STORAGE = 'core.sessions.MessageStorage'
+# Скользящий срок сессии: expire_date в базе продлевается не чаще раза в сутки
+SESSION_REFRESH_INTERVAL = int(get_env_variable('SESSION_REFRESH_INTERVAL', str(24 * 3600)))
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'profile'
 LOGOUT_REDIRECT_URL = 'index'
@@ -13,4 +13,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'serve_ready.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Без DEBUG не стартуем с несобранной статикой (core/checks.py)
+from core.checks import fail_on_serving_errors  # noqa: E402
+
+fail_on_serving_errors()